@@ -0,0 +1,194 @@
+"""
+Admission control
+
+Creating a proposal fans out into several paid LLM calls and a delegate
+vote into one more, so AdmissionMiddleware protects them before any work
+starts:
+
+- token buckets per address (author_address / voter_address from the JSON
+  body) and per client IP; a proposal costs more tokens than a vote,
+- a limit on concurrent expensive requests (proposal creation, delegate
+  votes and delegate recommendations); requests over it are shed rather
+  than queued.
+
+Bodies over ADMISSION_MAX_BODY are refused with 413 before they are read
+in full, since they could not be checked for an address. Refused requests
+otherwise get 429 with a Retry-After header. Bucket tables are
+bounded: an idle bucket refills completely after capacity / rate seconds,
+at which point it is indistinguishable from a new one and is dropped, and
+the least recently used buckets are evicted beyond RATE_LIMIT_MAX_KEYS.
+All state is per worker process.
+"""
+
+import os
+import json
+import math
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from responses import FastJSONResponse
+
+# Load environment variables
+load_dotenv()
+
+RATE_LIMIT_ADDRESS_PER_MINUTE = float(os.getenv("RATE_LIMIT_ADDRESS_PER_MINUTE", "12"))  # Tokens refilled per address
+RATE_LIMIT_ADDRESS_BURST = float(os.getenv("RATE_LIMIT_ADDRESS_BURST", "12"))  # Bucket capacity per address
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "40"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "40"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # Buckets kept per table
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))  # Expensive requests in flight per worker
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))  # Retry-After seconds when shedding load
+ADMISSION_MAX_BODY = 1024 * 1024  # Larger bodies on costly routes are refused with 413
+
+# (method, path) -> token cost; proposals are analyzed with several LLM calls.
+# Routes costing more than one token always count against the concurrency limit.
+ROUTE_COSTS = {
+    ("POST", "/proposals"): 4,
+    ("POST", "/proposals/stream"): 4,
+    ("POST", "/votes"): 1,
+    ("POST", "/delegate-recommendation"): 2,
+    ("POST", "/proposal-revisions"): 4,
+}
+
+
+class BucketTable:
+    """Token buckets keyed by client, bounded in size and expiring once idle buckets are full"""
+
+    def __init__(self, per_minute, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, updated_at), least recently updated first
+
+    def _expire(self, now):
+        # An idle bucket is full again after this long, the same as no bucket
+        idle_limit = self.capacity / self.rate if self.rate > 0 else math.inf
+        while self.buckets:
+            key, (_, updated_at) = next(iter(self.buckets.items()))
+            if now - updated_at < idle_limit and len(self.buckets) <= self.max_keys:
+                break
+            del self.buckets[key]
+
+    def take(self, key, cost=1, now=None):
+        """Take cost tokens from key's bucket; returns seconds to wait, 0 when admitted"""
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self.buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+        wait = 0
+        if tokens >= cost:
+            tokens -= cost
+        elif self.rate > 0:
+            wait = (cost - tokens) / self.rate
+        else:
+            wait = math.inf
+        self.buckets[key] = (tokens, now)
+        self._expire(now)
+        return wait
+
+    def refund(self, key, cost=1):
+        """Give back tokens taken for a request that was then refused elsewhere"""
+        if key in self.buckets:
+            tokens, updated_at = self.buckets[key]
+            self.buckets[key] = (min(self.capacity, tokens + cost), updated_at)
+
+
+def parse_body(body):
+    """JSON object of a request body, or an empty dict"""
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def request_address(data):
+    """Lower-cased author or voter address of a request, if any"""
+    address = data.get("author_address") or data.get("voter_address")
+    return address.lower() if isinstance(address, str) else None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying per-address and per-IP rate limits and a concurrency limit to costly routes"""
+
+    def __init__(self, app, max_concurrent=ADMISSION_MAX_CONCURRENT):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.addresses = BucketTable(RATE_LIMIT_ADDRESS_PER_MINUTE, RATE_LIMIT_ADDRESS_BURST)
+        self.ips = BucketTable(RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)
+        self.stats = {"admitted": 0, "rate_limited": 0, "shed": 0, "too_large": 0}
+
+    async def __call__(self, scope, receive, send):
+        cost = ROUTE_COSTS.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if cost is None:
+            await self.app(scope, receive, send)
+            return
+
+        # An oversized body would have to be read to find its address; refuse it before buffering
+        content_length = dict(scope.get("headers") or []).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > ADMISSION_MAX_BODY:
+            self.stats["too_large"] += 1
+            await self.refuse("Request body too large", scope, receive, send, status_code=413)
+            return
+
+        # Buffer the body to find the address, then replay it to the app
+        messages = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            size += len(message.get("body", b""))
+            if size > ADMISSION_MAX_BODY:
+                # Chunked bodies have no Content-Length; stop reading once past the limit
+                self.stats["too_large"] += 1
+                await self.refuse("Request body too large", scope, receive, send, status_code=413)
+                return
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        body = b"".join(message.get("body", b"") for message in messages)
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        data = parse_body(body) if body else {}
+        address = request_address(data)
+        # Manual votes are cheap; only delegate votes call the LLM
+        expensive = cost > 1 or data.get("delegate_vote") is True
+
+        ip = (scope.get("client") or ("unknown",))[0]
+        wait = self.ips.take(ip, cost)
+        if not wait and address:
+            wait = self.addresses.take(address, cost)
+            if wait:
+                self.ips.refund(ip, cost)
+        if wait:
+            self.stats["rate_limited"] += 1
+            await self.refuse("Rate limit exceeded", scope, receive, send, retry_after=math.ceil(wait))
+            return
+
+        if expensive and self.in_flight >= self.max_concurrent:
+            # Shed requests did no work, so they do not count against the client
+            self.ips.refund(ip, cost)
+            if address:
+                self.addresses.refund(address, cost)
+            self.stats["shed"] += 1
+            await self.refuse("Server busy, try again shortly", scope, receive, send, retry_after=ADMISSION_RETRY_AFTER)
+            return
+
+        self.stats["admitted"] += 1
+        if not expensive:
+            await self.app(scope, replay, send)
+            return
+
+        self.in_flight += 1
+        try:
+            # Held until the response (including a stream) has been sent
+            await self.app(scope, replay, send)
+        finally:
+            self.in_flight -= 1
+
+    async def refuse(self, detail, scope, receive, send, status_code=429, retry_after=None):
+        headers = {"Retry-After": str(max(1, retry_after))} if retry_after is not None else None
+        response = FastJSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
+        await response(scope, receive, send)
@@ -0,0 +1,149 @@
+"""
+AI call recording and replay
+
+With AI_CASSETTE_MODE=record, every Gemini call AIService makes is appended
+to a cassette: model, prompt, response and latency, one JSON line per call
+in a gzip file. With AI_CASSETTE_MODE=replay, calls are answered from the
+cassette without touching the network, so the analysis and delegate paths
+can be benchmarked deterministically on a machine with no network or quota.
+
+Replay matches calls on (model, prompt). A prompt recorded several times is
+answered with its recordings in order, after which the last one repeats; a
+call with no recording raises CassetteMiss. AI_CASSETTE_LATENCY sets how
+long replayed calls take: "none" answers at once, "recorded" waits each
+recording's own latency, and "sampled" draws latencies from everything
+recorded for the model.
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+AI_CASSETTE_MODE = os.getenv("AI_CASSETTE_MODE", "off").lower()  # off, record or replay
+AI_CASSETTE_PATH = os.getenv("AI_CASSETTE_PATH", "cassettes/ai.jsonl.gz")
+AI_CASSETTE_LATENCY = os.getenv("AI_CASSETTE_LATENCY", "none").lower()  # none, recorded or sampled
+
+
+class CassetteMiss(KeyError):
+    """A replayed call has no recording"""
+
+
+class Cassette:
+    def __init__(self, path=AI_CASSETTE_PATH, mode=AI_CASSETTE_MODE, latency=AI_CASSETTE_LATENCY, seed=42):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.recordings = {}  # key -> recorded entries, in recording order
+        self.positions = {}  # key -> index of the next recording to replay
+        self.latencies = {}  # model -> every recorded latency
+        self.rng = random.Random(seed)
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self.load()
+
+    @staticmethod
+    def key(model, prompt, stream=False):
+        return hashlib.sha256(f"{model}\0{'stream' if stream else 'text'}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            print(f"Warning: AI cassette {self.path} not found; every replayed call will miss")
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.recordings.setdefault(entry["key"], []).append(entry)
+                self.latencies.setdefault(entry["model"], []).append(entry["latency"])
+
+    def record(self, model, prompt, response, latency, stream=False):
+        """Append one call; response is the text, or the list of chunks of a stream"""
+        entry = {
+            "key": self.key(model, prompt, stream),
+            "model": model,
+            "prompt": prompt,
+            "response": response,
+            "latency": round(latency, 4)
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Each append is a separate gzip member; gzip readers concatenate them
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.stats["recorded"] += 1
+
+    def compact(self):
+        """Rewrite the cassette as one gzip stream, which compresses far better than per-call members"""
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            lines = f.readlines()
+        temp_path = f"{self.path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+            f.writelines(lines)
+        os.replace(temp_path, self.path)
+
+    def lookup(self, model, prompt, stream=False):
+        key = self.key(model, prompt, stream)
+        entries = self.recordings.get(key)
+        if not entries:
+            self.stats["misses"] += 1
+            raise CassetteMiss(f"No recording of this {model} prompt in {self.path}")
+        position = self.positions.get(key, 0)
+        self.positions[key] = position + 1
+        self.stats["replayed"] += 1
+        return entries[min(position, len(entries) - 1)]
+
+    def delay(self, entry):
+        """Seconds a replayed call takes"""
+        if self.latency == "recorded":
+            return entry["latency"]
+        if self.latency == "sampled":
+            return self.rng.choice(self.latencies[entry["model"]])
+        return 0.0
+
+    async def generate(self, model, prompt, live):
+        """Text of a generation: replayed, or produced by live() and recorded when recording"""
+        if self.mode == "replay":
+            entry = self.lookup(model, prompt)
+            await asyncio.sleep(self.delay(entry))
+            return entry["response"]
+
+        start = time.monotonic()
+        text = await live()
+        if self.mode == "record":
+            self.record(model, prompt, text, time.monotonic() - start)
+        return text
+
+    async def stream(self, model, prompt, live):
+        """Chunks of a streamed generation: replayed, or from the live() iterator and recorded"""
+        if self.mode == "replay":
+            entry = self.lookup(model, prompt, stream=True)
+            chunks = entry["response"]
+            pause = self.delay(entry) / max(1, len(chunks))
+            for chunk in chunks:
+                await asyncio.sleep(pause)
+                yield chunk
+            return
+
+        start = time.monotonic()
+        chunks = []
+        async for chunk in live():
+            chunks.append(chunk)
+            yield chunk
+        if self.mode == "record":
+            self.record(model, prompt, chunks, time.monotonic() - start, stream=True)
+
+
+# Create a singleton instance
+cassette = Cassette()
+
+def get_cassette():
+    """Get the process-wide AI cassette"""
+    return cassette
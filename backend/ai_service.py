@@ -1,9 +1,17 @@
 import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import deque
 import google.generativeai as genai
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.runnables import RunnablePassthrough
+from resilience import get_backend
+from ai_cassette import get_cassette
 
 # Load environment variables
 load_dotenv()
@@ -14,8 +22,81 @@ if not api_key:
     print("Warning: No Gemini API key found. Set OPENAI_API_KEY in your .env file.")
 genai.configure(api_key=api_key)
 
+# Long proposal handling: token estimates use ~4 characters per token
+AI_CHUNK_THRESHOLD_TOKENS = int(os.getenv("AI_CHUNK_THRESHOLD_TOKENS", "4000"))
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", "1500"))
+AI_PROPOSAL_TOKEN_BUDGET = int(os.getenv("AI_PROPOSAL_TOKEN_BUDGET", "24000"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+CHARS_PER_TOKEN = 4
+
+_SECTION_RE = re.compile(r"\n(?=#{1,6}\s)|\n\s*\n")
+_HEADING_RE = re.compile(r"\n(?=#{1,6}\s)")
+
+# Model and prompt version used for new analyses. Stored analyses record both,
+# so changing either marks existing rows as stale for reanalyze.py.
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+PROMPT_VERSION = os.getenv("AI_PROMPT_VERSION", "v1")
+
+# Delegate decisions ask for JSON matching a response schema; models without
+# JSON mode can set this to false and rely on the prompt alone
+AI_STRUCTURED_OUTPUT = os.getenv("AI_STRUCTURED_OUTPUT", "true").lower() == "true"
+DELEGATE_VOTES = ("For", "Against")
+CATEGORIES = ("Finance", "Community", "Protocol", "Governance", "Technical", "Marketing", "Other")
+
+# Model tiers. Tasks listed in AI_TASK_TIERS as fast run on AI_FAST_MODEL and
+# escalate to the large model (GEMINI_MODEL, or the model an analysis is run
+# with) when the call fails, or the answer does not parse, is outside the
+# allowed set, or has a confidence below AI_ESCALATION_CONFIDENCE. Other
+# tasks (summary, explanation, chunk) run on the large model. Analyses
+# record routing_policy(), which names both models when tasks are routed.
+AI_FAST_MODEL = os.getenv("AI_FAST_MODEL", "gemini-1.5-flash")
+AI_TASK_TIERS = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("AI_TASK_TIERS", "category=fast,risk=fast,delegate=fast").split(",") if item.strip()
+)
+AI_ESCALATION_CONFIDENCE = int(os.getenv("AI_ESCALATION_CONFIDENCE", "60"))
+ANALYSIS_TASKS = ("summary", "risk", "category", "explanation", "chunk")
+# USD per million (prompt, output) tokens, for the per-tier cost estimates
+TIER_PRICES = {
+    "fast": tuple(float(p) for p in os.getenv("AI_FAST_PRICE_PER_1M", "0.075,0.30").split(",")),
+    "large": tuple(float(p) for p in os.getenv("AI_LARGE_PRICE_PER_1M", "0.50,1.50").split(",")),
+}
+
+# Analysis prompts by version. Add a new version instead of editing one that
+# has been used to store analyses.
+ANALYSIS_PROMPTS = {
+    "v1": {
+        "summary": """You are an AI assistant for a DAO governance platform. Summarize the following proposal in a concise TL;DR format (max 2 sentences).
+
+Proposal: {proposal}""",
+        "risk": """You are an AI assistant for a DAO governance platform. Analyze the following proposal and assign a risk score from 1-10 (where 1 is lowest risk and 10 is highest risk). Return only the numeric score.
+
+Proposal: {proposal}""",
+        "category": """You are an AI assistant for a DAO governance platform. Categorize the following proposal into one of these categories: Finance, Community, Protocol, Governance, Technical, Marketing, or Other. Return only the category name.
+
+Proposal: {proposal}""",
+        "explanation": """You are an AI assistant for a DAO governance platform. This proposal has been classified as {category} with a risk score of {risk_score}/10. Explain why this classification and risk score are appropriate in 2-3 sentences.
+
+Proposal: {proposal}""",
+        "chunk": """You are an AI assistant for a DAO governance platform. The following is part {part} of {parts} of a long proposal. Summarize its key points, amounts, risks and affected areas in at most 5 bullet points.
+
+Proposal section: {proposal}""",
+    },
+}
+
+# Returned when analysis fails; no prompt version, so the row is picked up again by reanalyze.py
+FALLBACK_ANALYSIS = {
+    "summary": "Failed to generate summary.",
+    "risk_score": 5,  # Neutral risk score
+    "category": "Other",
+    "explanation": "AI analysis failed. Please review the proposal manually.",
+    "prompt_version": None,
+    "model": None,
+    "truncated": False
+}
+
 # Initialize LangChain LLM
-llm = ChatGoogleGenerativeAI(model="gemini-pro", temperature=0.2, google_api_key=api_key)
+llm = ChatGoogleGenerativeAI(model=GEMINI_MODEL, temperature=0.2, google_api_key=api_key)
 
 # Define prompt templates
 summarization_template = PromptTemplate(
@@ -69,125 +150,511 @@ categorization_chain = RunnablePassthrough.assign(prompt=lambda x: categorizatio
 delegate_voting_chain = RunnablePassthrough.assign(prompt=lambda x: delegate_voting_template.format(**x)) | llm
 
 
+def estimate_tokens(text):
+    """Rough token estimate for budgeting prompts"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_sections(text, chunk_tokens=AI_CHUNK_TOKENS):
+    """Split text on headings and blank lines, packing sections into chunks of at most chunk_tokens"""
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for section in _SECTION_RE.split(text):
+        section = section.strip()
+        # Hard-wrap sections that are larger than a whole chunk
+        while len(section) > max_chars:
+            cut = section.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(section[:cut])
+            section = section[cut:].strip()
+        if section:
+            pieces.append(section)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def revision_sections(text, chunk_tokens=AI_CHUNK_TOKENS):
+    """Sections compared between revisions: split at headings, then packed like split_sections within each.
+
+    Packing never crosses a heading, so an edit under one heading leaves the
+    sections of every other heading unchanged.
+    """
+    sections = []
+    for part in _HEADING_RE.split(text):
+        sections.extend(split_sections(part, chunk_tokens))
+    return sections
+
+
+def routing_policy(model=GEMINI_MODEL):
+    """Model recorded on analyses run with model.
+
+    This is the model itself, unless analysis tasks run on the fast tier:
+    then the fast model and those tasks are named too, e.g.
+    "gemini-pro+gemini-1.5-flash[category,risk]". Rerouting tasks or
+    changing either model changes it, so reanalyze.py selects the rows.
+    """
+    fast = [task for task in ANALYSIS_TASKS if AI_TASK_TIERS.get(task) == "fast"]
+    if not fast or AI_FAST_MODEL == model:
+        return model
+    return f"{model}+{AI_FAST_MODEL}[{','.join(sorted(fast))}]"
+
+
+def section_key(section, prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
+    """Cache key of a section summary; a new prompt version or model never reuses old summaries"""
+    return hashlib.sha256(f"{prompt_version}\n{model}\n{section}".encode()).hexdigest()
+
+
+def budget_chunks(chunks, token_budget=AI_PROPOSAL_TOKEN_BUDGET):
+    """Keep chunks within the per-proposal token budget, sampling evenly across the document.
+
+    Chunks left out are never read by the model; callers compare the lengths
+    and flag the analysis as truncated.
+    """
+    total = sum(estimate_tokens(c) for c in chunks)
+    if total <= token_budget:
+        return chunks
+    keep = max(1, len(chunks) * token_budget // total)
+    step = len(chunks) / keep
+    return [chunks[int(i * step)] for i in range(keep)]
+
+
+async def _generate(prompt, model=None, generation_config=None):
+    """Run a single Gemini generation and return the stripped text"""
+    model = model or GEMINI_MODEL
+
+    async def live():
+        generative_model = genai.GenerativeModel(model, generation_config=generation_config)
+        # One breaker per model, so a failing tier does not cut off the others
+        response = await get_backend("llm").call(lambda: generative_model.generate_content_async(prompt), target=model)
+        return response.text.strip()
+
+    # Recorded or replayed when AI_CASSETTE_MODE is set
+    return await get_cassette().generate(model, prompt, live)
+
+
+class Unacceptable(ValueError):
+    """An answer that parsed but cannot be used; reason names why"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def parse_category(text):
+    """Category named by a model answer; raises Unacceptable outside CATEGORIES"""
+    answer = text.strip().strip(".*`'\"").strip()
+    for category in CATEGORIES:
+        if answer.lower() == category.lower():
+            return category
+    raise Unacceptable("out_of_set", f"Unexpected category {text!r}")
+
+
+def parse_risk_score(text):
+    """Risk score of a model answer; raises ValueError without a number and Unacceptable outside 1-10"""
+    match = re.search(r"\d+", text)
+    if not match:
+        raise ValueError(f"No risk score in {text!r}")
+    score = int(match.group())
+    if not 1 <= score <= 10:
+        raise Unacceptable("out_of_set", f"Risk score {score} is outside 1-10")
+    return score
+
+
+class TierMetrics:
+    """Calls, escalations, latency, tokens and estimated cost of one model tier"""
+
+    def __init__(self, tier, samples=1000):
+        self.tier = tier
+        self.counts = {"calls": 0, "failures": 0, "prompt_tokens": 0, "output_tokens": 0}
+        self.escalations = {"error": 0, "unparseable": 0, "out_of_set": 0, "low_confidence": 0}
+        self.models = set()
+        self.latencies = deque(maxlen=samples)
+
+    def record(self, model, latency, prompt, text):
+        self.models.add(model)
+        self.counts["calls"] += 1
+        self.counts["prompt_tokens"] += estimate_tokens(prompt)
+        self.counts["output_tokens"] += estimate_tokens(text)
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(fraction):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1) if ordered else None
+
+        prompt_price, output_price = TIER_PRICES[self.tier]
+        cost = (self.counts["prompt_tokens"] * prompt_price + self.counts["output_tokens"] * output_price) / 1e6
+        return {
+            **self.counts,
+            "models": sorted(self.models),
+            "escalations": dict(self.escalations),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "estimated_cost_usd": round(cost, 6)
+        }
+
+
+_tier_metrics = {tier: TierMetrics(tier) for tier in TIER_PRICES}
+
+
+def tier_metrics():
+    """Metrics of every model tier in this worker"""
+    return {tier: metrics.snapshot() for tier, metrics in _tier_metrics.items()}
+
+
+async def _routed(task, prompt, parse, model=None, confidence=None, generation_config=None):
+    """Run a task on its model tier and return parse(answer), escalating failed calls and unusable answers of the fast tier.
+
+    parse raises ValueError (or Unacceptable) for an answer that cannot be
+    used; confidence, when given, reads a 0-100 confidence from the parsed
+    result. The large tier's answer, or error, is final.
+    """
+    model = model or GEMINI_MODEL
+    tiers = [("large", model)]
+    if AI_TASK_TIERS.get(task) == "fast" and AI_FAST_MODEL != model:
+        tiers.insert(0, ("fast", AI_FAST_MODEL))
+
+    for attempt, (tier, tier_model) in enumerate(tiers):
+        final = attempt == len(tiers) - 1
+        metrics = _tier_metrics[tier]
+        start = time.monotonic()
+        try:
+            text = await _generate(prompt, tier_model, generation_config)
+        except Exception as e:
+            metrics.counts["failures"] += 1
+            if final:
+                raise
+            # Timeouts, an open breaker or exhausted quota on the fast model
+            print(f"Fast model failed on {task}, escalating: {str(e) or type(e).__name__}")
+            metrics.escalations["error"] += 1
+            continue
+        metrics.record(tier_model, time.monotonic() - start, prompt, text)
+
+        try:
+            result = parse(text)
+        except ValueError as e:
+            if final:
+                raise
+            reason = getattr(e, "reason", "unparseable")
+        else:
+            if final or confidence is None or confidence(result) >= AI_ESCALATION_CONFIDENCE:
+                return result
+            reason = "low_confidence"
+        metrics.escalations[reason] += 1
+
+
+def compile_preference_prefix(user_preferences):
+    """Instructions and preferences that open every delegate decision prompt for a user"""
+    preferences_text = f"Risk Tolerance: {user_preferences['risk_tolerance']}/10\n"
+    preferences_text += f"Financial Priority: {user_preferences['prioritize_financial']}/5\n"
+    preferences_text += f"Community Priority: {user_preferences['prioritize_community']}/5\n"
+    preferences_text += f"Protocol Priority: {user_preferences['prioritize_protocol']}/5\n"
+    preferences_text += f"Voting Strategy: {user_preferences['voting_strategy']}\n"
+    if user_preferences.get('custom_rules'):
+        preferences_text += f"Custom Rules: {user_preferences['custom_rules']}\n"
+
+    return (
+        "You are an AI delegate for a DAO governance platform. You vote on behalf of a user "
+        "according to their preferences.\n\n"
+        f"User Preferences:\n{preferences_text}"
+    )
+
+
+def delegate_decision_schema(include_reasoning=True):
+    """Response schema of a delegate decision"""
+    properties = {
+        "vote": {"type": "string", "enum": list(DELEGATE_VOTES)},
+        "confidence": {"type": "integer"},
+    }
+    if include_reasoning:
+        properties["reasoning"] = {"type": "string"}
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+def delegate_decision_prompt(prefix, proposal_text, include_reasoning=True):
+    """Full decision prompt; the per-user prefix comes first so providers can reuse it"""
+    if include_reasoning:
+        task = ("Decide how the user would likely vote on this proposal, how confident you are (0-100), "
+                "and explain the decision in 2-3 sentences based on the user's preferences. "
+                'Respond only with JSON of the form {"vote": "For" or "Against", "confidence": 0-100, "reasoning": "..."}.')
+    else:
+        task = ("Decide how the user would likely vote on this proposal and how confident you are (0-100). "
+                'Respond only with JSON of the form {"vote": "For" or "Against", "confidence": 0-100}.')
+    return f"{prefix}\nProposal:\n{proposal_text}\n\n{task}"
+
+
+def parse_delegate_decision(text, include_reasoning=True):
+    """Vote, confidence and reasoning of a JSON delegate decision; raises ValueError when malformed"""
+    text = text.strip()
+    if text.startswith("```"):
+        # Models without JSON mode tend to fence their JSON
+        text = text.strip("`").strip()
+        text = text[4:] if text.startswith("json") else text
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Delegate decision is not a JSON object")
+
+    vote = str(data.get("vote", "")).strip().capitalize()
+    if vote not in DELEGATE_VOTES:
+        raise Unacceptable("out_of_set", f"Unexpected delegate vote {data.get('vote')!r}")
+    confidence = int(float(str(data.get("confidence", 0)).rstrip("%")))
+    return {
+        "vote": vote,
+        "confidence": max(0, min(100, confidence)),
+        "reasoning": str(data.get("reasoning", "")).strip() if include_reasoning else None
+    }
+
+
 class AIService:
     @staticmethod
-    async def analyze_proposal(proposal_text):
+    async def analyze_proposal(proposal_text, prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
         """Analyze a proposal using Gemini API directly"""
+        if estimate_tokens(proposal_text) > AI_CHUNK_THRESHOLD_TOKENS:
+            return await AIService.analyze_proposal_chunked(proposal_text, prompt_version=prompt_version, model=model)
         try:
+            prompts = ANALYSIS_PROMPTS[prompt_version]
+            
             # Generate summary
-            summary_model = genai.GenerativeModel('gemini-pro')
-            summary_response = await summary_model.generate_content_async(
-                """You are an AI assistant for a DAO governance platform. Summarize the following proposal in a concise TL;DR format (max 2 sentences).
-                
-                Proposal: """ + proposal_text
-            )
-            summary = summary_response.text.strip()
+            summary = await _routed("summary", prompts["summary"].format(proposal=proposal_text), str, model)
             
             # Generate risk score
-            risk_model = genai.GenerativeModel('gemini-pro')
-            risk_response = await risk_model.generate_content_async(
-                """You are an AI assistant for a DAO governance platform. Analyze the following proposal and assign a risk score from 1-10 (where 1 is lowest risk and 10 is highest risk). Return only the numeric score.
-                
-                Proposal: """ + proposal_text
-            )
-            risk_score = int(risk_response.text.strip())
+            risk_score = await _routed("risk", prompts["risk"].format(proposal=proposal_text), parse_risk_score, model)
             
             # Generate category
-            category_model = genai.GenerativeModel('gemini-pro')
-            category_response = await category_model.generate_content_async(
-                """You are an AI assistant for a DAO governance platform. Categorize the following proposal into one of these categories: Finance, Community, Protocol, Governance, Technical, Marketing, or Other. Return only the category name.
-                
-                Proposal: """ + proposal_text
-            )
-            category = category_response.text.strip()
+            category = await _routed("category", prompts["category"].format(proposal=proposal_text), parse_category, model)
             
             # Generate explanation
-            explanation_model = genai.GenerativeModel('gemini-pro')
-            explanation_response = await explanation_model.generate_content_async(
-                f"""You are an AI assistant for a DAO governance platform. This proposal has been classified as {category} with a risk score of {risk_score}/10. Explain why this classification and risk score are appropriate in 2-3 sentences.
-                
-                Proposal: """ + proposal_text
+            explanation = await _routed(
+                "explanation",
+                prompts["explanation"].format(proposal=proposal_text, category=category, risk_score=risk_score),
+                str,
+                model
             )
-            explanation = explanation_response.text.strip()
             
             return {
                 "summary": summary,
                 "risk_score": risk_score,
                 "category": category,
-                "explanation": explanation
+                "explanation": explanation,
+                "prompt_version": prompt_version,
+                "model": routing_policy(model),
+                "truncated": False
             }
             
         except Exception as e:
             print(f"Error in AI analysis: {str(e)}")
             # Provide fallback values in case of API failure
+            return dict(FALLBACK_ANALYSIS)
+
+    @staticmethod
+    async def analyze_proposal_chunked(proposal_text, token_budget=AI_PROPOSAL_TOKEN_BUDGET, max_concurrency=AI_MAX_CONCURRENCY,
+                                       prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
+        """Map-reduce analysis for long proposals: summarize chunks concurrently, then analyze the digest.
+
+        Past the token budget only a sample of the chunks is summarized, and
+        the analysis is returned with "truncated" set.
+        """
+        try:
+            prompts = ANALYSIS_PROMPTS[prompt_version]
+            all_chunks = split_sections(proposal_text)
+            chunks = budget_chunks(all_chunks, token_budget)
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def summarize_chunk(index, chunk):
+                async with semaphore:
+                    return await _routed(
+                        "chunk", prompts["chunk"].format(part=index + 1, parts=len(chunks), proposal=chunk), str, model
+                    )
+
+            # Map: summarize every chunk under the concurrency cap
+            chunk_summaries = await asyncio.gather(*(summarize_chunk(i, c) for i, c in enumerate(chunks)))
+            digest = "\n\n".join(f"Part {i + 1}:\n{s}" for i, s in enumerate(chunk_summaries))
+
+            # Reduce: summary, risk score and category over the digest
+            summary, risk_score, category = await asyncio.gather(
+                _routed("summary", prompts["summary"].format(proposal=digest), str, model),
+                _routed("risk", prompts["risk"].format(proposal=digest), parse_risk_score, model),
+                _routed("category", prompts["category"].format(proposal=digest), parse_category, model),
+            )
+
+            explanation = await _routed(
+                "explanation",
+                prompts["explanation"].format(proposal=digest, category=category, risk_score=risk_score),
+                str,
+                model
+            )
+
             return {
-                "summary": "Failed to generate summary.",
-                "risk_score": 5,  # Neutral risk score
-                "category": "Other",
-                "explanation": "AI analysis failed. Please review the proposal manually."
+                "summary": summary,
+                "risk_score": risk_score,
+                "category": category,
+                "explanation": explanation,
+                "prompt_version": prompt_version,
+                "model": routing_policy(model),
+                "truncated": len(chunks) < len(all_chunks)
             }
-    
+
+        except Exception as e:
+            print(f"Error in chunked AI analysis: {str(e)}")
+            # Provide fallback values in case of API failure
+            return dict(FALLBACK_ANALYSIS)
+
     @staticmethod
-    async def get_delegate_vote(proposal_text, user_preferences):
-        """Determine how an AI delegate should vote based on user preferences"""
+    async def analyze_revision(proposal_text, cached_summaries, max_concurrency=AI_MAX_CONCURRENCY,
+                               prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
+        """Analyze an edited proposal, summarizing only the sections without a cached summary.
+
+        cached_summaries maps section_key()s to the section summaries of the
+        previous revision. The summary, risk score and category are then
+        recomputed over all section summaries, as in analyze_proposal_chunked.
+        Besides the analysis, returns "sections" ({"key", "summary"} in
+        document order, the cache for the next revision) and "summarized",
+        the number of sections sent to the model.
+        """
         try:
-            # Format user preferences for the prompt
-            preferences_text = f"Risk Tolerance: {user_preferences['risk_tolerance']}/10\n"
-            preferences_text += f"Financial Priority: {user_preferences['prioritize_financial']}/5\n"
-            preferences_text += f"Community Priority: {user_preferences['prioritize_community']}/5\n"
-            preferences_text += f"Protocol Priority: {user_preferences['prioritize_protocol']}/5\n"
-            preferences_text += f"Voting Strategy: {user_preferences['voting_strategy']}\n"
-            
-            if user_preferences.get('custom_rules'):
-                preferences_text += f"Custom Rules: {user_preferences['custom_rules']}"
-            
-            # Get vote recommendation
-            vote_model = genai.GenerativeModel('gemini-pro')
-            vote_response = await vote_model.generate_content_async(
-                """You are an AI delegate for a DAO governance platform. Based on the user's preferences and the proposal details, determine how the user would likely vote. Return only 'For' or 'Against'.
-                
-                Proposal:
-                """ + proposal_text + """
-                
-                User Preferences:
-                """ + preferences_text
+            prompts = ANALYSIS_PROMPTS[prompt_version]
+            sections = revision_sections(proposal_text)
+            keys = [section_key(section, prompt_version, routing_policy(model)) for section in sections]
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def summarize_section(index, section):
+                async with semaphore:
+                    return await _routed(
+                        "chunk", prompts["chunk"].format(part=index + 1, parts=len(sections), proposal=section), str, model
+                    )
+
+            # Map: summarize the changed sections once each, even if repeated in the document
+            changed = {}
+            for index, (key, section) in enumerate(zip(keys, sections)):
+                if key not in cached_summaries and key not in changed:
+                    changed[key] = summarize_section(index, section)
+            fresh = dict(zip(changed, await asyncio.gather(*changed.values())))
+            section_summaries = [fresh[key] if key in fresh else cached_summaries[key] for key in keys]
+            digest = "\n\n".join(f"Part {i + 1}:\n{s}" for i, s in enumerate(section_summaries))
+
+            # Reduce: summary, risk score and category over every section's summary
+            summary, risk_score, category = await asyncio.gather(
+                _routed("summary", prompts["summary"].format(proposal=digest), str, model),
+                _routed("risk", prompts["risk"].format(proposal=digest), parse_risk_score, model),
+                _routed("category", prompts["category"].format(proposal=digest), parse_category, model),
             )
-            vote = vote_response.text.strip()
-            
-            # Get confidence level
-            confidence_model = genai.GenerativeModel('gemini-pro')
-            confidence_response = await confidence_model.generate_content_async(
-                """You are an AI delegate for a DAO governance platform. Based on the user's preferences and the proposal details, determine your confidence level (0-100%) in your vote recommendation. Return only the numeric percentage.
-                
-                Proposal:
-                """ + proposal_text + """
-                
-                User Preferences:
-                """ + preferences_text + """
-                
-                Vote: """ + vote
+
+            explanation = await _routed(
+                "explanation",
+                prompts["explanation"].format(proposal=digest, category=category, risk_score=risk_score),
+                str,
+                model
             )
-            confidence = int(confidence_response.text.strip().replace('%', ''))
-            
-            # Get reasoning
-            reasoning_model = genai.GenerativeModel('gemini-pro')
-            reasoning_response = await reasoning_model.generate_content_async(
-                f"""You are an AI delegate for a DAO governance platform. Explain why you recommended voting '{vote}' on this proposal with {confidence}% confidence, based on the user's preferences.
-                
-                Proposal:
-                """ + proposal_text + """
-                
-                User Preferences:
-                """ + preferences_text
+
+            return {
+                "summary": summary,
+                "risk_score": risk_score,
+                "category": category,
+                "explanation": explanation,
+                "prompt_version": prompt_version,
+                "model": routing_policy(model),
+                "truncated": False,
+                "sections": [{"key": key, "summary": s} for key, s in zip(keys, section_summaries)],
+                "summarized": len(fresh)
+            }
+
+        except Exception as e:
+            print(f"Error in revision AI analysis: {str(e)}")
+            # Provide fallback values in case of API failure; no sections, so the next revision starts over
+            return {**FALLBACK_ANALYSIS, "sections": [], "summarized": 0}
+
+    @staticmethod
+    async def stream_summary(proposal_text, prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
+        """Stream the TL;DR summary of a proposal as Gemini generates it"""
+        prompt = ANALYSIS_PROMPTS[prompt_version]["summary"].format(proposal=proposal_text)
+
+        async def live():
+            llm = get_backend("llm")
+            summary_model = genai.GenerativeModel(model)
+            response = await llm.call(lambda: summary_model.generate_content_async(prompt, stream=True))
+            # A stalled stream fails after the LLM deadline instead of hanging the client
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), llm.timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.text:
+                    yield chunk.text
+
+        async for text in get_cassette().stream(model, prompt, live):
+            yield text
+
+    @staticmethod
+    async def assess_proposal(proposal_text, prompt_version=PROMPT_VERSION, model=GEMINI_MODEL):
+        """Risk score, category and explanation for a proposal, without the summary"""
+        try:
+            prompts = ANALYSIS_PROMPTS[prompt_version]
+            risk_score, category = await asyncio.gather(
+                _routed("risk", prompts["risk"].format(proposal=proposal_text), parse_risk_score, model),
+                _routed("category", prompts["category"].format(proposal=proposal_text), parse_category, model),
             )
-            reasoning = reasoning_response.text.strip()
-            
+
+            explanation = await _routed(
+                "explanation",
+                prompts["explanation"].format(proposal=proposal_text, category=category, risk_score=risk_score),
+                str,
+                model
+            )
+
             return {
-                "vote": vote,
-                "confidence": confidence,
-                "reasoning": reasoning
+                "risk_score": risk_score,
+                "category": category,
+                "explanation": explanation,
+                "prompt_version": prompt_version,
+                "model": routing_policy(model),
+                "truncated": False
             }
-            
+
+        except Exception as e:
+            print(f"Error in AI assessment: {str(e)}")
+            # Provide fallback values in case of API failure
+            fallback = dict(FALLBACK_ANALYSIS)
+            del fallback["summary"]
+            return fallback
+    
+    @staticmethod
+    async def get_delegate_vote(proposal_text, user_preferences, include_reasoning=True):
+        """Determine how an AI delegate should vote based on user preferences.
+
+        Vote, confidence and reasoning come from a single schema-constrained
+        call. With include_reasoning=False the model is asked for the vote and
+        confidence only and reasoning is None.
+        """
+        try:
+            prompt = delegate_decision_prompt(
+                compile_preference_prefix(user_preferences), proposal_text, include_reasoning
+            )
+            generation_config = None
+            if AI_STRUCTURED_OUTPUT:
+                generation_config = genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=delegate_decision_schema(include_reasoning)
+                )
+            return await _routed(
+                "delegate",
+                prompt,
+                lambda text: parse_delegate_decision(text, include_reasoning),
+                confidence=lambda decision: decision["confidence"],
+                generation_config=generation_config
+            )
+
         except Exception as e:
             print(f"Error in delegate vote analysis: {str(e)}")
             # Provide fallback values in case of API failure
@@ -197,6 +664,33 @@ class AIService:
                 "reasoning": "AI analysis failed. Please vote manually."
             }
 
+    @staticmethod
+    async def get_delegate_recommendation(title, description, summary, risk_score, category,
+                                          risk_tolerance, category_preferences, voting_strategy,
+                                          include_reasoning=True):
+        """Delegate vote for a stored proposal and analysis, as a yes/no vote with an explanation.
+
+        The vote is None when the model gave no clear For or Against, e.g. the
+        'Abstain' fallback of a failed call; callers must not cast it.
+        """
+        proposal_text = (
+            f"{title}\n\n{description}\n\n"
+            f"Summary: {summary}\nRisk Score: {risk_score}/10\nCategory: {category}"
+        )
+        decision = await AIService.get_delegate_vote(proposal_text, {
+            "risk_tolerance": risk_tolerance,
+            "prioritize_financial": category_preferences.get("Finance"),
+            "prioritize_community": category_preferences.get("Community"),
+            "prioritize_protocol": category_preferences.get("Protocol"),
+            "voting_strategy": voting_strategy
+        }, include_reasoning=include_reasoning)
+        vote = decision["vote"].strip().capitalize()
+        return {
+            "vote": vote == "For" if vote in DELEGATE_VOTES else None,
+            "confidence": decision["confidence"],
+            "explanation": decision["reasoning"]
+        }
+
     @staticmethod
     def analyze_proposal_sync(proposal_text):
         """Synchronous version using LangChain for testing"""
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""
+AI-Gov Historical Proposal Backfill
+
+Imports historical proposals from a JSONL or CSV export. Records stream
+through three stages connected by bounded queues, so pinning, analysis and
+database writes overlap:
+
+    read -> pin to IPFS (parallel) -> AI analysis (bounded batches) -> bulk insert
+
+Each record needs a title and description; records without them (or lines
+that are not valid JSON) are skipped and counted. author/author_address/
+proposer, proposal_id/on_chain_id, status and created_at are picked up when
+present. How far the input has been read is stored in the backfill_checkpoints
+table in the same transaction as each batch, so an interrupted run resumes
+where it stopped without importing a record twice.
+
+Usage: python backfill.py proposals.jsonl [--batch-size 16] [--checkpoint NAME]
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+from database import SessionLocal, init_db, engine, Proposal, ProposalAnalysis, BackfillCheckpoint
+from rollups import record_current_analysis
+from ai_service import AIService
+from ipfs_service import get_ipfs_service
+from similarity_service import get_similarity_index, proposal_text
+
+VALID_STATUSES = {"pending", "active", "executed", "rejected"}
+FAILED_SUMMARY = "Failed to generate summary."
+_DONE = object()
+
+
+def read_records(path):
+    """Yield records from a JSONL or CSV export; None for a line that is not valid JSON"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield None
+
+
+def valid_record(record):
+    """Whether a record has the title and description every proposal needs"""
+    return isinstance(record, dict) and all(
+        isinstance(record.get(field), str) and record[field].strip() for field in ("title", "description")
+    )
+
+
+def load_checkpoint(source):
+    db = SessionLocal()
+    try:
+        checkpoint = db.get(BackfillCheckpoint, source)
+        if checkpoint is None:
+            return {"records_read": 0, "imported": 0, "skipped": 0, "analysis_failures": 0}
+        return {
+            "records_read": checkpoint.records_read,
+            "imported": checkpoint.imported,
+            "skipped": checkpoint.skipped,
+            "analysis_failures": checkpoint.analysis_failures
+        }
+    finally:
+        db.close()
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class Backfill:
+    def __init__(self, path, source, batch_size, ipfs_concurrency, ai_concurrency):
+        self.path = path
+        self.source = source
+        self.batch_size = batch_size
+        self.ipfs_semaphore = asyncio.Semaphore(ipfs_concurrency)
+        self.ai_semaphore = asyncio.Semaphore(ai_concurrency)
+        self.ipfs_service = get_ipfs_service()
+        self.checkpoint = load_checkpoint(source)
+        self.stage_seconds = {"pin": 0.0, "analyze": 0.0, "write": 0.0}
+        self.started = time.perf_counter()
+        self.imported_this_run = 0
+
+    async def pin(self, record):
+        proposal_data = {
+            "title": record["title"],
+            "description": record["description"],
+            "author": record.get("author") or record.get("author_address") or record.get("proposer"),
+            "timestamp": record.get("created_at") or datetime.now().isoformat()
+        }
+        async with self.ipfs_semaphore:
+            ipfs_hash = await self.ipfs_service.add_proposal(proposal_data)
+        if not ipfs_hash:
+            raise RuntimeError(f"Could not pin proposal '{record['title']}' to IPFS")
+        return ipfs_hash
+
+    async def analyze(self, record):
+        async with self.ai_semaphore:
+            return await AIService.analyze_proposal(f"{record['title']}\n\n{record['description']}")
+
+    async def read_stage(self, out_queue):
+        """Queue batches of valid records, each with the input position after it and the records skipped before it"""
+        batch = []
+        skipped = 0
+        records_read = self.checkpoint["records_read"]
+        for index, record in enumerate(read_records(self.path)):
+            if index < records_read:
+                continue
+            if valid_record(record):
+                batch.append(record)
+            else:
+                skipped += 1
+            if len(batch) == self.batch_size:
+                await out_queue.put((batch, index + 1, skipped))
+                batch, skipped = [], 0
+            records_read = index + 1
+        # Also commit trailing skipped records, so they are counted once
+        if batch or skipped:
+            await out_queue.put((batch, records_read, skipped))
+        await out_queue.put(_DONE)
+
+    async def pin_stage(self, in_queue, out_queue):
+        while (item := await in_queue.get()) is not _DONE:
+            batch, *progress = item
+            start = time.perf_counter()
+            hashes = await asyncio.gather(*(self.pin(record) for record in batch))
+            self.stage_seconds["pin"] += time.perf_counter() - start
+            await out_queue.put((list(zip(batch, hashes)), *progress))
+        await out_queue.put(_DONE)
+
+    async def analyze_stage(self, in_queue, out_queue):
+        while (item := await in_queue.get()) is not _DONE:
+            batch, *progress = item
+            start = time.perf_counter()
+            analyses = await asyncio.gather(*(self.analyze(record) for record, _ in batch))
+            self.stage_seconds["analyze"] += time.perf_counter() - start
+            await out_queue.put((
+                [(record, ipfs_hash, analysis) for (record, ipfs_hash), analysis in zip(batch, analyses)],
+                *progress
+            ))
+        await out_queue.put(_DONE)
+
+    async def write_stage(self, in_queue):
+        while (item := await in_queue.get()) is not _DONE:
+            start = time.perf_counter()
+            await asyncio.to_thread(self.write_batch, *item)
+            self.stage_seconds["write"] += time.perf_counter() - start
+            self.report()
+
+    def write_batch(self, batch, records_read, skipped):
+        """Insert one batch of proposals and analyses and advance the checkpoint in the same transaction"""
+        db = SessionLocal()
+        try:
+            proposals = []
+            for record, ipfs_hash, _ in batch:
+                status = record.get("status")
+                proposal = Proposal(
+                    proposal_id=int(record.get("proposal_id") or record.get("on_chain_id") or 0),
+                    title=record["title"],
+                    description=record["description"],
+                    ipfs_hash=ipfs_hash,
+                    proposer=record.get("author") or record.get("author_address") or record.get("proposer"),
+                    status=status if status in VALID_STATUSES else "pending"
+                )
+                # Keep the historical timestamp; otherwise the column default applies
+                created_at = parse_timestamp(record.get("created_at"))
+                if created_at:
+                    proposal.created_at = created_at
+                proposals.append(proposal)
+            db.add_all(proposals)
+            db.flush()  # Assign ids for the analysis rows
+
+            db.add_all([
+                ProposalAnalysis(
+                    proposal_id=proposal.id,
+                    summary=analysis["summary"],
+                    category=analysis["category"],
+                    risk_score=analysis["risk_score"],
+                    ai_explanation=analysis["explanation"],
+                    prompt_version=analysis["prompt_version"],
+                    model=analysis["model"],
+                    truncated=analysis["truncated"]
+                )
+                for proposal, (_, _, analysis) in zip(proposals, batch)
+            ])
+            for _, _, analysis in batch:
+                record_current_analysis(db, analysis["category"], analysis["risk_score"])
+
+            # A crash before this commit leaves neither the batch nor the checkpoint, so nothing is imported twice
+            checkpoint = {
+                "records_read": records_read,
+                "imported": self.checkpoint["imported"] + len(batch),
+                "skipped": self.checkpoint["skipped"] + skipped,
+                "analysis_failures": self.checkpoint["analysis_failures"]
+                + sum(1 for _, _, a in batch if a["summary"] == FAILED_SUMMARY)
+            }
+            db.merge(BackfillCheckpoint(source=self.source, **checkpoint))
+            db.commit()
+
+            get_similarity_index().add_many(
+                (proposal.id, proposal_text(record["title"], record["description"]))
+                for proposal, (record, _, _) in zip(proposals, batch)
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.imported_this_run += len(batch)
+        self.checkpoint = checkpoint
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.imported_this_run / elapsed if elapsed else 0.0
+        print(
+            f"[backfill] {self.checkpoint['imported']} imported "
+            f"({self.imported_this_run} this run, {rate:.1f} proposals/s, "
+            f"{self.checkpoint['skipped']} skipped, {self.checkpoint['analysis_failures']} analysis failures)"
+        )
+
+    async def run(self):
+        if self.checkpoint["records_read"]:
+            print(f"[backfill] Resuming after record {self.checkpoint['records_read']}")
+
+        # Bounded queues keep at most a couple of batches in flight per stage
+        to_pin, to_analyze, to_write = (asyncio.Queue(maxsize=2) for _ in range(3))
+        await asyncio.gather(
+            self.read_stage(to_pin),
+            self.pin_stage(to_pin, to_analyze),
+            self.analyze_stage(to_analyze, to_write),
+            self.write_stage(to_write),
+        )
+
+        elapsed = time.perf_counter() - self.started
+        print(f"[backfill] Done: {self.imported_this_run} proposals in {elapsed:.1f}s "
+              f"({self.imported_this_run / elapsed if elapsed else 0.0:.1f} proposals/s)")
+        busy = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in self.stage_seconds.items())
+        print(f"[backfill] Stage busy time: {busy}")
+
+
+async def run_backfill(args):
+    # Created inside the event loop so its semaphores bind to it
+    backfill = Backfill(
+        args.input,
+        args.checkpoint or os.path.abspath(args.input),
+        args.batch_size,
+        args.ipfs_concurrency,
+        args.ai_concurrency
+    )
+    await backfill.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical proposals from a JSONL or CSV export")
+    parser.add_argument("input", help="Path to a .jsonl or .csv export")
+    parser.add_argument("--checkpoint", help="Checkpoint name (default: the input's absolute path)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Records per analysis batch and insert")
+    parser.add_argument("--ipfs-concurrency", type=int, default=16, help="Concurrent IPFS pins")
+    parser.add_argument("--ai-concurrency", type=int, default=4, help="Concurrent AI analysis calls")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}")
+        sys.exit(1)
+
+    if engine.url.database in (None, "", ":memory:"):
+        print("Refusing to backfill into an in-memory database. Set DATABASE_URL.")
+        sys.exit(1)
+
+    init_db()
+    asyncio.run(run_backfill(args))
+
+
+if __name__ == "__main__":
+    main()
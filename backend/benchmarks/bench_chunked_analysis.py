@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Latency vs. document size for proposal analysis.
+
+Compares the single-pass analysis (four sequential prompts over the full
+text) against the chunked map-reduce mode. Gemini is replaced by a simulated
+model whose latency grows with prompt and output size, so the benchmark runs
+offline and measures how each pipeline scales. Past the token budget the
+chunked mode reads a sample of the document; those sizes are marked
+truncated.
+
+Usage: python benchmarks/bench_chunked_analysis.py [--scale 0.01]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_service
+from ai_service import AIService, estimate_tokens
+
+# Simulated model characteristics (seconds)
+FIRST_TOKEN_LATENCY = 0.4
+PREFILL_PER_1K_TOKENS = 0.08
+DECODE_PER_TOKEN = 0.01
+OUTPUT_TOKENS = 60
+CONTEXT_LIMIT_TOKENS = 30000
+
+WORDS = "treasury grant protocol upgrade community vote budget audit risk timeline milestone".split()
+
+
+def make_proposal(tokens):
+    """Build a markdown proposal of roughly the given token count"""
+    sections = []
+    while estimate_tokens("\n\n".join(sections)) < tokens:
+        body = " ".join(random.choice(WORDS) for _ in range(120))
+        sections.append(f"## Section {len(sections) + 1}\n\n{body}")
+    return "\n\n".join(sections)
+
+
+class SimulatedModel:
+    def __init__(self, scale):
+        self.scale = scale
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def generate(self, prompt, model=None, generation_config=None):
+        tokens = estimate_tokens(prompt)
+        self.calls += 1
+        self.prompt_tokens += tokens
+        if tokens > CONTEXT_LIMIT_TOKENS:
+            raise ValueError("prompt exceeds model context window")
+        latency = FIRST_TOKEN_LATENCY + PREFILL_PER_1K_TOKENS * tokens / 1000 + DECODE_PER_TOKEN * OUTPUT_TOKENS
+        await asyncio.sleep(latency * self.scale)
+        return "5" if "risk score" in prompt and "numeric" in prompt else "Finance"
+
+
+async def run_single_pass(model, text):
+    """Four sequential full-text prompts, as analyze_proposal does for short proposals"""
+    for _ in range(4):
+        await model.generate(text)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark proposal analysis latency against document size")
+    parser.add_argument("--scale", type=float, default=0.01, help="Multiply simulated latencies by this factor")
+    parser.add_argument("--sizes", default="1000,4000,16000,64000,256000", help="Comma-separated document sizes in tokens")
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'tokens':>8} | {'single-pass s':>13} {'prompt tok':>10} | {'chunked s':>9} {'prompt tok':>10} {'calls':>5} {'truncated':>9}")
+    print("-" * 80)
+    for size in (int(s) for s in args.sizes.split(",")):
+        text = make_proposal(size)
+
+        single = SimulatedModel(args.scale)
+        start = time.perf_counter()
+        try:
+            await run_single_pass(single, text)
+            single_time = f"{(time.perf_counter() - start) / args.scale:13.2f}"
+        except ValueError:
+            single_time = f"{'failed':>13}"
+
+        chunked = SimulatedModel(args.scale)
+        ai_service._generate = chunked.generate
+        start = time.perf_counter()
+        analysis = await AIService.analyze_proposal_chunked(text)
+        chunked_time = (time.perf_counter() - start) / args.scale
+
+        print(f"{size:>8} | {single_time} {single.prompt_tokens:>10} | {chunked_time:9.2f} {chunked.prompt_tokens:>10} {chunked.calls:>5} {str(analysis['truncated']):>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
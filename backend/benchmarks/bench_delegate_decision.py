@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Latency and tokens of AI delegate decisions.
+
+Compares the previous three-call flow (vote, then confidence, then
+reasoning, each resending the proposal and preferences) against the single
+schema-constrained call of AIService.get_delegate_vote, with and without
+reasoning. Gemini is replaced by a simulated model whose latency grows with
+prompt and output size, so the benchmark runs offline.
+
+Usage: python benchmarks/bench_delegate_decision.py [--scale 0.01] [--decisions 20]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_service
+from ai_service import AIService, estimate_tokens, compile_preference_prefix
+
+# Simulated model characteristics (seconds)
+FIRST_TOKEN_LATENCY = 0.4
+PREFILL_PER_1K_TOKENS = 0.08
+DECODE_PER_TOKEN = 0.01
+
+REASONING = ("The proposal requests a moderate treasury allocation with monthly milestones, which fits the "
+             "user's balanced strategy. Its risk score is within the user's tolerance and it advances the "
+             "financial priorities they rank highest, so the delegate votes in favour.")
+WORDS = "treasury grant protocol upgrade community vote budget audit risk timeline milestone".split()
+STRATEGIES = ["conservative", "balanced", "progressive"]
+
+
+class SimulatedModel:
+    def __init__(self, scale):
+        self.scale = scale
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def respond(self, prompt):
+        if "Respond only with JSON" in prompt:
+            decision = {"vote": "For", "confidence": 80}
+            if '"reasoning"' in prompt:
+                decision["reasoning"] = REASONING
+            return json.dumps(decision)
+        if "Return only 'For' or 'Against'" in prompt:
+            return "For"
+        if "numeric percentage" in prompt:
+            return "80"
+        return REASONING
+
+    async def generate(self, prompt, model=None, generation_config=None):
+        text = self.respond(prompt)
+        prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        latency = FIRST_TOKEN_LATENCY + PREFILL_PER_1K_TOKENS * prompt_tokens / 1000 + DECODE_PER_TOKEN * output_tokens
+        await asyncio.sleep(latency * self.scale)
+        return text
+
+
+async def three_call_decision(model, proposal_text, user_preferences):
+    """The previous flow: vote, confidence and reasoning as separate sequential prompts"""
+    preferences_text = compile_preference_prefix(user_preferences).split("User Preferences:\n", 1)[1]
+    context = f"\n\nProposal:\n{proposal_text}\n\nUser Preferences:\n{preferences_text}"
+    vote = await model.generate(
+        "You are an AI delegate for a DAO governance platform. Based on the user's preferences and the proposal "
+        "details, determine how the user would likely vote. Return only 'For' or 'Against'." + context
+    )
+    confidence = await model.generate(
+        "You are an AI delegate for a DAO governance platform. Based on the user's preferences and the proposal "
+        "details, determine your confidence level (0-100%) in your vote recommendation. Return only the numeric "
+        "percentage." + context + f"\n\nVote: {vote}"
+    )
+    reasoning = await model.generate(
+        f"You are an AI delegate for a DAO governance platform. Explain why you recommended voting '{vote}' on "
+        f"this proposal with {confidence}% confidence, based on the user's preferences." + context
+    )
+    return {"vote": vote, "confidence": int(confidence), "reasoning": reasoning}
+
+
+def make_workload(decisions, rng):
+    workload = []
+    for n in range(decisions):
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(150, 400)))
+        proposal_text = (f"Proposal {n}\n\n{body}\n\nSummary: A treasury request.\n"
+                         f"Risk Score: {rng.randrange(1, 11)}/10\nCategory: Finance")
+        # A few delegators, each voting on many proposals with the same preferences
+        user = n % 4
+        preferences = {
+            "risk_tolerance": user * 3 + 1,
+            "prioritize_financial": user + 1,
+            "prioritize_community": (user + 2) % 5 + 1,
+            "prioritize_protocol": (user + 4) % 5 + 1,
+            "voting_strategy": STRATEGIES[user % len(STRATEGIES)],
+            "custom_rules": "Never fund proposals without milestones." if user % 2 else None
+        }
+        workload.append((proposal_text, preferences, "0x" + format(user + 1, "040x")))
+    return workload
+
+
+async def run(label, decide, model, workload, scale):
+    start = time.perf_counter()
+    for proposal_text, preferences, address in workload:
+        decision = await decide(proposal_text, preferences, address)
+        assert decision["vote"] == "For", decision
+    per_decision = (time.perf_counter() - start) / scale / len(workload)
+    print(f"{label:<24} {per_decision * 1e3:10.0f}ms {model.calls / len(workload):6.1f} "
+          f"{model.prompt_tokens / len(workload):10.0f} {model.output_tokens / len(workload):10.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark delegate decision latency and tokens")
+    parser.add_argument("--scale", type=float, default=0.01, help="Multiply simulated latencies by this factor")
+    parser.add_argument("--decisions", type=int, default=20, help="Decisions made per flow")
+    args = parser.parse_args()
+
+    workload = make_workload(args.decisions, random.Random(42))
+
+    print(f"{'flow':<24} {'per decision':>12} {'calls':>6} {'prompt tok':>10} {'output tok':>10}")
+    print("-" * 66)
+
+    model = SimulatedModel(args.scale)
+    await run("three calls", lambda text, prefs, _: three_call_decision(model, text, prefs),
+              model, workload, args.scale)
+
+    for label, include_reasoning in (("single call", True), ("single call, vote only", False)):
+        model = SimulatedModel(args.scale)
+        ai_service._generate = model.generate
+        await run(label, lambda text, prefs, _: AIService.get_delegate_vote(
+            text, prefs, include_reasoning=include_reasoning
+        ), model, workload, args.scale)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
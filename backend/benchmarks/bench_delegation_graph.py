@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Delegation graph at scale.
+
+Builds a DelegationGraph from synthetic DelegateSet events over a million
+addresses, then measures effective-delegate lookups (cached vs. walking the
+chain each time), incremental re-delegation latency and the top-delegates
+query. Most users delegate to a small set of popular delegates, some
+delegate to other users, which produces multi-hop chains and a few cycles.
+
+Usage: python benchmarks/bench_delegation_graph.py [--accounts 1000000]
+"""
+
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from delegation_graph import DelegationGraph, ZERO_ADDRESS, _NONE
+
+
+def address(n):
+    return "0x" + format(n, "040x")
+
+
+def make_events(accounts, delegate_share, rng):
+    """Initial DelegateSet events: popular delegates plus user-to-user chains"""
+    popular = max(1, accounts // 100)
+    events = []
+    for user in range(accounts):
+        if rng.random() >= delegate_share:
+            continue
+        if rng.random() < 0.8:
+            # Power-law popularity: a few delegates attract most delegators
+            target = min(popular, int(rng.paretovariate(1.0))) - 1
+        else:
+            target = rng.randrange(accounts)
+        if target != user:
+            events.append((len(events) + 1, address(user), address(target)))
+
+    # A few delegation cycles among ordinary users
+    for _ in range(3):
+        members = rng.sample(range(popular, accounts), 3)
+        for user, target in zip(members, members[1:] + members[:1]):
+            events.append((len(events) + 1, address(user), address(target)))
+    return events
+
+
+def walk(graph, addr):
+    """Effective delegate and chain length by following parents every time (no caching)"""
+    account = graph.ids.get(addr)
+    if account is None:
+        return addr, 0
+    seen = set()
+    while graph.parent[account] != _NONE and account not in seen:
+        seen.add(account)
+        account = graph.parent[account]
+    return graph.addresses[account], len(seen)
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the delegation graph at scale")
+    parser.add_argument("--accounts", type=int, default=1_000_000, help="Number of addresses")
+    parser.add_argument("--delegate-share", type=float, default=0.9, help="Fraction of accounts that delegate")
+    parser.add_argument("--lookups", type=int, default=200_000, help="Random effective-delegate lookups")
+    parser.add_argument("--updates", type=int, default=10_000, help="Incremental re-delegations")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    events = make_events(args.accounts, args.delegate_share, rng)
+    graph = DelegationGraph()
+
+    start = time.perf_counter()
+    graph.apply_events(events)
+    build = time.perf_counter() - start
+    stats = graph.stats()
+    print(f"Built graph over {args.accounts:,} addresses: {stats['accounts']:,} in delegations, "
+          f"{stats['delegations']:,} delegations, {stats['cycle_members']} accounts in cycles")
+    print(f"  {build:.1f}s ({len(events) / build:,.0f} events/s)")
+
+    sample = [address(rng.randrange(args.accounts)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for addr in sample:
+        graph.effective_delegate(addr)
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hops = [walk(graph, addr)[1] for addr in sample]
+    uncached = time.perf_counter() - start
+    print(f"Lookups: cached {args.lookups / cached:,.0f}/s, walking the chain {args.lookups / uncached:,.0f}/s "
+          f"(mean chain {sum(hops) / len(hops):.2f} hops, longest {max(hops)})")
+
+    latencies, subtree_sizes = [], []
+    for n in range(args.updates):
+        user = address(rng.randrange(args.accounts))
+        target = ZERO_ADDRESS if rng.random() < 0.2 else address(rng.randrange(args.accounts))
+        if user in graph.ids:
+            subtree_sizes.append(len(graph._subtree(graph.ids[user])))
+        start = time.perf_counter()
+        graph.apply_events([(len(events) + n + 1, user, target)])
+        latencies.append(time.perf_counter() - start)
+    print(f"Re-delegations: p50 {percentile(latencies, 0.5) * 1e6:.0f}us, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:.0f}us, max {max(latencies) * 1e3:.1f}ms "
+          f"(largest subtree {max(subtree_sizes, default=0):,} accounts)")
+
+    # Worst case: the most popular delegate re-delegates, moving its whole subtree
+    whale = graph.top_delegates(1)[0]
+    start = time.perf_counter()
+    graph.set_delegate(whale["address"], address(args.accounts))
+    print(f"Top delegate re-delegating ({whale['voting_power']:,} votes move): "
+          f"{(time.perf_counter() - start) * 1e3:.0f}ms")
+
+    assert sum(graph.power) == len(graph.addresses), "voting power must sum to the number of accounts"
+
+    start = time.perf_counter()
+    top = graph.top_delegates(20)
+    print(f"Top 20 delegates in {(time.perf_counter() - start) * 1e3:.0f}ms; "
+          f"largest holds {top[0]['voting_power']:,} votes")
+
+    # ru_maxrss is in KiB on Linux
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
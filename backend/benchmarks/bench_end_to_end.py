@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+End-to-end latency of proposal creation and AI delegate votes.
+
+Drives POST /proposals and delegate POST /votes through the full FastAPI
+app (database, similarity index, mock IPFS and chain, AI analysis) against
+a fresh SQLite database. Gemini calls go through the AI cassette: run once
+with --record against the real API to capture every prompt, response and
+latency, then replay offline, e.g. in CI, with no network or quota. The
+workload is generated from a fixed seed, so a replay issues exactly the
+prompts that were recorded.
+
+The committed cassette was recorded with --synthetic, which answers every
+call from a deterministic stand-in model with a long-tailed latency instead
+of Gemini, so the default replay works as shipped. Re-record with --record
+for real model answers and latencies.
+
+Usage:
+    python benchmarks/bench_end_to_end.py --record       # real Gemini calls, writes the cassette
+    python benchmarks/bench_end_to_end.py --synthetic    # stand-in model, writes the cassette
+    python benchmarks/bench_end_to_end.py                # offline replay, no model latency
+    python benchmarks/bench_end_to_end.py --latency recorded
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_CASSETTE = os.path.join(BACKEND_DIR, "benchmarks", "cassettes", "end_to_end.jsonl.gz")
+
+TOPICS = ["treasury diversification", "grant program", "protocol fee change", "validator incentives",
+          "community events budget", "governance quorum", "security audit", "marketing campaign"]
+STRATEGIES = ["conservative", "balanced", "progressive"]
+
+
+def address(n):
+    return "0x" + format(n, "040x")
+
+
+def make_proposal(n, rng):
+    topic = rng.choice(TOPICS)
+    amount = rng.randrange(10, 500) * 1000
+    months = rng.randrange(1, 24)
+    return {
+        "title": f"Proposal {n}: {topic}",
+        "description": (
+            f"This proposal requests {amount} tokens from the treasury for a {topic} initiative "
+            f"running for {months} months. Milestones are reported monthly to the community, "
+            f"and unspent funds return to the treasury. Reference {rng.getrandbits(32):08x}."
+        ),
+        "author_address": address(n % 7 + 1)
+    }
+
+
+class SyntheticResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SyntheticModel:
+    """Stand-in for genai.GenerativeModel: plausible answers derived from a hash of the prompt"""
+
+    def __init__(self, model_name, generation_config=None):
+        self.model_name = model_name
+
+    @staticmethod
+    def answer(prompt):
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        if "Respond only with JSON" in prompt:
+            decision = {"vote": ("For", "Against")[seed % 2], "confidence": 60 + seed % 36}
+            if '"reasoning"' in prompt:
+                decision["reasoning"] = "The proposal's risk and category fit the user's stated priorities."
+            return json.dumps(decision)
+        if "Return only the numeric score" in prompt:
+            return str(seed % 10 + 1)
+        if "Return only the category name" in prompt:
+            return ("Finance", "Community", "Protocol", "Governance", "Technical", "Marketing")[seed % 6]
+        if "Explain why this classification" in prompt:
+            return "The proposal moves treasury funds with monthly milestones, which sets its category and risk."
+        proposal = prompt.rsplit("Proposal: ", 1)[-1]
+        return "TL;DR: " + proposal.split(". ")[0].strip() + "."
+
+    async def generate_content_async(self, prompt, stream=False):
+        # Mostly quick answers with a slow tail, like a hosted model
+        rng = random.Random(prompt)
+        await asyncio.sleep(0.3 if rng.random() < 0.05 else rng.uniform(0.02, 0.06))
+        return SyntheticResponse(self.answer(prompt))
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def timed(client, path, bodies, concurrency):
+    """POST each body, concurrency at a time; returns (latencies, responses, wall seconds)"""
+    def post(body):
+        start = time.perf_counter()
+        response = client.post(path, json=body)
+        return time.perf_counter() - start, response
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(post, bodies))
+    return [latency for latency, _ in results], [response for _, response in results], time.perf_counter() - start
+
+
+def report(label, latencies, responses, wall, fallback=lambda body: False):
+    """Print latency percentiles; failed requests and fallback answers of a failed model call count as errors"""
+    errors = sum(1 for response in responses if response.status_code >= 300 or fallback(response.json()))
+    print(f"  {label:<16} {len(latencies):>4} requests  p50 {percentile(latencies, 0.5) * 1e3:7.1f}ms  "
+          f"p95 {percentile(latencies, 0.95) * 1e3:7.1f}ms  max {max(latencies) * 1e3:7.1f}ms  "
+          f"{len(latencies) / wall:6.1f} req/s  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark proposal creation and delegate votes end to end")
+    parser.add_argument("--record", action="store_true", help="Call Gemini and record the cassette")
+    parser.add_argument("--synthetic", action="store_true", help="Record the cassette from a stand-in model")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE, help="Cassette file")
+    parser.add_argument("--latency", choices=["none", "recorded", "sampled"], default="none",
+                        help="Replayed model latency")
+    parser.add_argument("--proposals", type=int, default=10, help="Proposals created")
+    parser.add_argument("--delegators", type=int, default=5, help="Delegators voting on every proposal")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight")
+    args = parser.parse_args()
+    args.record = args.record or args.synthetic
+
+    if args.record and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+
+    # Everything the app writes goes to a scratch directory; limits are lifted for the load
+    workdir = tempfile.mkdtemp(prefix="aigov-bench-")
+    os.environ.update({
+        "ENVIRONMENT": "development",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "SHARED_STATE_PATH": os.path.join(workdir, "shared_state.db"),
+        "SIMILARITY_INDEX_PATH": os.path.join(workdir, "similarity_index.log"),
+        "IPFS_SPOOL_DIR": os.path.join(workdir, "ipfs_spool"),
+        "RATE_LIMIT_ADDRESS_BURST": "1000000",
+        "RATE_LIMIT_IP_BURST": "1000000",
+        "ADMISSION_MAX_CONCURRENT": "1000",
+        "AI_CASSETTE_MODE": "record" if args.record else "replay",
+        "AI_CASSETTE_PATH": args.cassette,
+        "AI_CASSETTE_LATENCY": args.latency,
+    })
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from ai_cassette import get_cassette
+    import ai_service
+    from ai_service import FALLBACK_ANALYSIS
+    if args.synthetic:
+        ai_service.genai.GenerativeModel = SyntheticModel
+
+    rng = random.Random(42)
+    proposals = [make_proposal(n, rng) for n in range(args.proposals)]
+    delegators = [address(1000 + n) for n in range(args.delegators)]
+
+    print(f"{'Recording' if args.record else 'Replaying'} {args.cassette} "
+          f"({args.proposals} proposals, {args.delegators} delegators, concurrency {args.concurrency})")
+    with TestClient(app_main.app) as client:
+        for n, delegator in enumerate(delegators):
+            client.post("/delegate-preferences", json={
+                "user_address": delegator,
+                "risk_tolerance": n % 10 + 1,
+                "category_preferences": {"Finance": n % 5 + 1, "Community": (n + 2) % 5 + 1, "Protocol": (n + 4) % 5 + 1},
+                "voting_strategy": STRATEGIES[n % len(STRATEGIES)]
+            })
+
+        latencies, responses, wall = timed(client, "/proposals", proposals, args.concurrency)
+        report("POST /proposals", latencies, responses, wall,
+               fallback=lambda body: body["summary"] == FALLBACK_ANALYSIS["summary"])
+
+        ids = [response.json()["id"] for response in responses if response.status_code == 201]
+        votes = [
+            {"proposal_id": proposal_id, "voter_address": delegator, "delegate_vote": True}
+            for proposal_id in ids for delegator in delegators
+        ]
+        if votes:
+            latencies, responses, wall = timed(client, "/votes", votes, args.concurrency)
+            report("delegate votes", latencies, responses, wall)
+
+    if args.record:
+        get_cassette().compact()
+    stats = get_cassette().stats
+    print(f"Cassette: {stats['recorded']} recorded, {stats['replayed']} replayed, {stats['misses']} missed")
+    if stats["misses"]:
+        print("Replay missed recorded prompts; re-record with --record after changing prompts or the workload")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
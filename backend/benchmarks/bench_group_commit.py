@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Vote write throughput with and without group commit.
+
+Concurrent clients each write one vote with its rollup updates, as
+POST /votes does, against a fresh SQLite database (or DATABASE_URL when
+given). Without group commit every write is its own transaction and fsync;
+with the GroupCommitWriter, writes arriving together share one. Throughput
+of the first is flat in concurrency, the second grows with it.
+
+Usage: python benchmarks/bench_group_commit.py [--votes 2000] [--concurrency 1,8,32,128] [--window-ms 5]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aigov-bench-'), 'bench.db')}"
+
+from database import SessionLocal, init_db, Vote
+from rollups import record_vote
+from group_commit import GroupCommitWriter
+
+
+def vote_writer(proposal_id, voter):
+    def write(db):
+        db.add(Vote(proposal_id=proposal_id, voter_address=voter, vote=True, delegate_vote=False,
+                    explanation="User manual vote"))
+        record_vote(db, False)
+    return write
+
+
+def commit_alone(write):
+    db = SessionLocal()
+    try:
+        write(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(writes, concurrency, submit):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(write):
+        async with semaphore:
+            await submit(write)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(write) for write in writes))
+    return len(writes) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark vote write throughput with group commit")
+    parser.add_argument("--votes", type=int, default=2000, help="Votes written per run")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="Comma-separated concurrent clients")
+    parser.add_argument("--window-ms", type=float, default=5, help="Group commit collection window")
+    parser.add_argument("--max-batch", type=int, default=64, help="Largest group commit batch")
+    args = parser.parse_args()
+
+    init_db()
+    proposal_id = 1
+    run_number = 0
+
+    def workload():
+        nonlocal run_number
+        run_number += 1
+        return [vote_writer(proposal_id, "0x" + format(run_number * 10**7 + n, "040x")) for n in range(args.votes)]
+
+    print(f"{'clients':>7} | {'per-request commits':>19} | {'group commit':>12} {'mean batch':>10}")
+    print("-" * 58)
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        alone = await run(workload(), concurrency, lambda write: asyncio.to_thread(commit_alone, write))
+
+        writer = GroupCommitWriter(args.window_ms, args.max_batch, enabled=True)
+        writer.start()
+        grouped = await run(workload(), concurrency, writer.submit)
+        await writer.stop()
+        mean_batch = writer.stats["writes"] / max(1, writer.stats["batches"])
+
+        print(f"{concurrency:>7} | {alone:>13.0f} vote/s | {grouped:>6.0f} vote/s {mean_batch:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+Outbound call resilience under injected latency and failures.
+
+Runs the resilience layer against local stand-in backends instead of real
+IPFS gateways, RPC nodes or the LLM. Each stand-in answers after a latency
+drawn from a long-tailed distribution and can be told to fail or hang, so
+the script shows:
+
+  - hedging: tail latency of reads against one slow-tailed endpoint vs.
+    hedged across several,
+  - circuit breaking: an endpoint that starts failing is skipped after the
+    failure threshold and calls fail fast instead of waiting for it, then
+    gets a single trial call once the breaker turns half-open and is used
+    again when that succeeds,
+  - deadlines: a hanging backend costs at most its timeout.
+
+Each scenario asserts its expected outcome, so the script exits non-zero
+when the resilience layer regresses.
+
+Usage: python benchmarks/bench_resilience.py [--requests 500]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from resilience import Backend, CircuitOpenError
+
+
+class StandIn:
+    """Local backend answering after a latency with a slow tail, optionally failing or hanging"""
+
+    def __init__(self, name, rng, median=0.02, tail_share=0.05, tail=0.5):
+        self.name = name
+        self.rng = rng
+        self.median = median
+        self.tail_share = tail_share
+        self.tail = tail
+        self.failing = False
+        self.hanging = False
+        self.requests = 0
+
+    async def __call__(self):
+        self.requests += 1
+        if self.hanging:
+            await asyncio.sleep(3600)
+        slow = self.rng.random() < self.tail_share
+        await asyncio.sleep(self.tail if slow else self.rng.uniform(0.5, 1.5) * self.median)
+        if self.failing:
+            raise ConnectionError(f"{self.name} is down")
+        return self.name
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def timed(backend, request, count, concurrency=20):
+    """Latencies of count requests, concurrency at a time, and the number that failed"""
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await request(backend)
+            except (Exception, asyncio.TimeoutError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return latencies, errors
+
+
+def report(label, latencies, errors):
+    print(f"  {label:<28} p50 {percentile(latencies, 0.5) * 1e3:6.1f}ms  "
+          f"p99 {percentile(latencies, 0.99) * 1e3:6.1f}ms  max {max(latencies) * 1e3:6.1f}ms  errors {errors}")
+
+
+async def run(args):
+    rng = random.Random(42)
+    nodes = [StandIn(f"node{n}", rng) for n in range(3)]
+
+    print(f"Hedging ({args.requests} reads, 5% of responses take 500ms)")
+    single = Backend("rpc", timeout=2.0)
+    single_latencies, single_errors = await timed(single, lambda b: b.call(nodes[0], target=nodes[0].name), args.requests)
+    report("single endpoint", single_latencies, single_errors)
+
+    hedged = Backend("rpc", timeout=2.0, hedge_delay=args.hedge_delay)
+    latencies, errors = await timed(
+        hedged, lambda b: b.hedged([(node.name, node) for node in nodes]), args.requests
+    )
+    report(f"hedged over 3 after {args.hedge_delay * 1e3:.0f}ms", latencies, errors)
+    counts = hedged.metrics.counts
+    print(f"  {counts['hedges']} hedges sent ({counts['hedges'] / args.requests:.1%} extra load), "
+          f"{counts['hedge_wins']} won")
+    assert errors == 0, f"hedged reads failed: {errors}"
+    assert counts["hedges"] > 0 and counts["hedge_wins"] > 0, "no hedge ever won"
+    assert percentile(latencies, 0.99) < percentile(single_latencies, 0.99) / 2, "hedging did not cut the tail"
+
+    print("Circuit breaking (node0 starts failing)")
+    nodes[0].failing = True
+    before = nodes[0].requests
+    latencies, errors = await timed(
+        hedged, lambda b: b.hedged([(node.name, node) for node in nodes]), args.requests
+    )
+    report("hedged, node0 failing", latencies, errors)
+    print(f"  node0 received {nodes[0].requests - before} of {args.requests} reads before its breaker opened "
+          f"(state: {hedged.breaker('node0').state})")
+    assert errors == 0, f"reads failed although node1 and node2 are healthy: {errors}"
+    assert hedged.breaker("node0").state == "open", "node0's breaker did not open"
+    assert nodes[0].requests - before < args.requests / 2, "node0 kept receiving reads"
+
+    solo = Backend("ipfs", timeout=2.0)
+    breaker = solo.breaker("node0")
+    breaker.reset_timeout = args.reset_timeout
+    _, errors = await timed(solo, lambda b: b.call(nodes[0], target="node0"), breaker.failure_threshold, concurrency=1)
+    assert errors == breaker.failure_threshold and breaker.state == "open", "solo breaker did not open"
+    requests = nodes[0].requests
+    start = time.perf_counter()
+    try:
+        await solo.call(nodes[0], target="node0")
+        raise AssertionError("call went through an open breaker")
+    except CircuitOpenError:
+        elapsed = time.perf_counter() - start
+    print(f"  single-endpoint call with open breaker fails in {elapsed * 1e6:.0f}us")
+    assert nodes[0].requests == requests and elapsed < nodes[0].median, "open breaker did not fail fast"
+
+    await asyncio.sleep(args.reset_timeout)
+    assert breaker.state == "half_open", f"breaker is {breaker.state} after its reset timeout"
+    nodes[0].failing = False
+    nodes[0].tail_share = 0
+    trial = asyncio.create_task(solo.call(nodes[0], target="node0"))
+    await asyncio.sleep(0)
+    try:
+        await solo.call(nodes[0], target="node0")
+        raise AssertionError("half-open breaker admitted a second call")
+    except CircuitOpenError:
+        pass
+    assert await trial == "node0"
+    print(f"  after {args.reset_timeout * 1e3:.0f}ms the breaker turns half-open, admits one trial call "
+          f"and is {breaker.state} once it succeeds")
+    assert breaker.state == "closed", f"breaker is {breaker.state} after a successful trial"
+
+    print("Deadlines (the LLM stand-in hangs)")
+    llm_node = StandIn("llm", rng)
+    llm_node.hanging = True
+    llm = Backend("llm", timeout=args.llm_timeout)
+    latencies, errors = await timed(llm, lambda b: b.call(llm_node), 10, concurrency=10)
+    report(f"timeout {args.llm_timeout * 1e3:.0f}ms", latencies, errors)
+    assert errors == 10, f"only {errors} of 10 calls to the hanging backend failed"
+    assert max(latencies) < args.llm_timeout + 0.1, "a call outlived its deadline"
+
+    print("Metrics")
+    for name, backend in (("single", single), ("hedged", hedged), ("solo", solo), ("llm", llm)):
+        print(f"  {name:<7} {backend.metrics.snapshot()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedging, circuit breakers and deadlines")
+    parser.add_argument("--requests", type=int, default=500, help="Reads per scenario")
+    parser.add_argument("--hedge-delay", type=float, default=0.05, help="Seconds before hedging to the next endpoint")
+    parser.add_argument("--llm-timeout", type=float, default=0.2, help="Deadline for the hanging backend")
+    parser.add_argument("--reset-timeout", type=float, default=0.2, help="Seconds before the solo breaker turns half-open")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
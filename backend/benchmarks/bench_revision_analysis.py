@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Cost of re-analyzing an edited proposal.
+
+A long proposal is edited in a growing number of sections. Each edit is
+analyzed from scratch with analyze_proposal, and incrementally with
+analyze_revision, which reuses the section summaries of the previous
+revision and only summarizes the changed sections. Gemini is replaced by
+a simulated model whose latency grows with prompt and output size, so the
+benchmark runs offline.
+
+Usage: python benchmarks/bench_revision_analysis.py [--scale 0.01] [--tokens 16000] [--edits 1,2,4,8]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ai_service
+from ai_service import AIService, estimate_tokens
+
+# Simulated model characteristics (seconds)
+FIRST_TOKEN_LATENCY = 0.4
+PREFILL_PER_1K_TOKENS = 0.08
+DECODE_PER_TOKEN = 0.01
+OUTPUT_TOKENS = 60
+
+WORDS = "treasury grant protocol upgrade community vote budget audit risk timeline milestone".split()
+
+
+def make_sections(tokens, rng):
+    """Markdown sections of a proposal of roughly the given token count"""
+    sections = []
+    while estimate_tokens("\n\n".join(sections)) < tokens:
+        body = " ".join(rng.choice(WORDS) for _ in range(120))
+        sections.append(f"## Section {len(sections) + 1}\n\n{body}")
+    return sections
+
+
+class SimulatedModel:
+    def __init__(self, scale):
+        self.scale = scale
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def generate(self, prompt, model=None, generation_config=None):
+        tokens = estimate_tokens(prompt)
+        self.calls += 1
+        self.prompt_tokens += tokens
+        latency = FIRST_TOKEN_LATENCY + PREFILL_PER_1K_TOKENS * tokens / 1000 + DECODE_PER_TOKEN * OUTPUT_TOKENS
+        await asyncio.sleep(latency * self.scale)
+        return "5" if "risk score" in prompt and "numeric" in prompt else "Finance"
+
+
+async def measure(analyze, scale):
+    model = SimulatedModel(scale)
+    ai_service._generate = model.generate
+    start = time.perf_counter()
+    result = await analyze()
+    return result, (time.perf_counter() - start) / scale, model
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs. incremental analysis of proposal edits")
+    parser.add_argument("--scale", type=float, default=0.01, help="Multiply simulated latencies by this factor")
+    parser.add_argument("--tokens", type=int, default=16000, help="Proposal size in tokens")
+    parser.add_argument("--edits", default="1,2,4,8", help="Comma-separated numbers of edited sections")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    sections = make_sections(args.tokens, rng)
+    original = "Proposal\n\n" + "\n\n".join(sections)
+
+    # The first revision summarizes every section and seeds the cache
+    primed, _, _ = await measure(lambda: AIService.analyze_revision(original, {}), args.scale)
+    cached = {section["key"]: section["summary"] for section in primed["sections"]}
+    print(f"{len(sections)} sections, ~{estimate_tokens(original)} tokens")
+
+    print(f"{'edited':>6} | {'full s':>7} {'calls':>5} {'prompt tok':>10} | {'incremental s':>13} {'calls':>5} {'prompt tok':>10} {'summarized':>10}")
+    print("-" * 82)
+    for edited in (int(e) for e in args.edits.split(",")):
+        revised = list(sections)
+        for index in rng.sample(range(len(sections)), min(edited, len(sections))):
+            revised[index] += " Amended: the milestone timeline is extended by one month."
+        text = "Proposal\n\n" + "\n\n".join(revised)
+
+        _, full_time, full = await measure(lambda: AIService.analyze_proposal(text), args.scale)
+        result, incremental_time, incremental = await measure(lambda: AIService.analyze_revision(text, cached), args.scale)
+
+        print(f"{edited:>6} | {full_time:7.2f} {full.calls:>5} {full.prompt_tokens:>10} | {incremental_time:13.2f} "
+              f"{incremental.calls:>5} {incremental.prompt_tokens:>10} {result['summarized']:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
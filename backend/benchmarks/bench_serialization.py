@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Response serialization throughput.
+
+Encodes a page of proposal list rows and a proposal vote list the way
+FastAPI does by default (a pydantic model per row, jsonable_encoder, then
+json.dumps) and the way the fast path does (SQL row tuples as dicts encoded
+by FastJSONResponse), then measures gzip and brotli (if installed) on the
+encoded body. Results are reported as bytes encoded or compressed per second.
+
+Usage: python benchmarks/bench_serialization.py [--rows 1000] [--votes 20000]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import ProposalResponse
+from responses import FastJSONResponse, compress, brotli
+
+CATEGORIES = ["Finance", "Community", "Protocol", "Other"]
+
+
+def make_rows(count):
+    """Proposal list rows as projected from SQL"""
+    now = datetime.now()
+    return [(
+        i, f"Proposal {i}: fund the {random.choice(CATEGORIES).lower()} working group",
+        f"Qm{i:044d}", "Allocates treasury funds to a working group for the next quarter. " * 3,
+        random.randint(1, 10), random.choice(CATEGORIES), False, "0x" + format(i, "040x"), now - timedelta(minutes=i)
+    ) for i in range(count)]
+
+
+def make_votes(count):
+    now = datetime.now()
+    return [("0x" + format(i, "040x"), random.random() < 0.5, i % 3 == 0, "User manual vote", now)
+            for i in range(count)]
+
+
+def row_dict(row):
+    id, title, ipfs_hash, summary, risk_score, category, truncated, author_address, created_at = row
+    return {
+        "id": id, "title": title, "ipfs_hash": ipfs_hash, "ipfs_url": f"https://ipfs.io/ipfs/{ipfs_hash}",
+        "summary": summary, "risk_score": risk_score, "category": category,
+        "author_address": author_address, "created_at": created_at, "on_chain_id": None,
+        "tx_hash": None, "similar_proposals": [], "analysis_reused_from": None, "analysis_truncated": truncated
+    }
+
+
+def list_default(rows):
+    models = [ProposalResponse(**row_dict(row)) for row in rows]
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+def list_fast(rows):
+    return FastJSONResponse([row_dict(row) for row in rows]).body
+
+
+def vote_payload(votes):
+    return {"id": 1, "votes": {"total": len(votes), "details": [{
+        "voter_address": voter_address, "vote": vote, "delegate_vote": delegate_vote,
+        "explanation": explanation, "timestamp": timestamp
+    } for voter_address, vote, delegate_vote, explanation, timestamp in votes]}}
+
+
+def votes_default(votes):
+    return json.dumps(jsonable_encoder(vote_payload(votes))).encode()
+
+
+def votes_fast(votes):
+    return FastJSONResponse(vote_payload(votes)).body
+
+
+def measure(fn, arg, repeat):
+    """Best-of-repeat seconds and output size"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def report(label, seconds, size, processed=None):
+    """Throughput is over the bytes produced, or over processed bytes for compression"""
+    processed = size if processed is None else processed
+    print(f"{label:<28} {seconds * 1000:9.2f} ms {size:>11,} B {processed / seconds / 1e6:9.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression")
+    parser.add_argument("--rows", type=int, default=1000, help="Proposal rows per list page")
+    parser.add_argument("--votes", type=int, default=20000, help="Votes in the full proposal response")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    random.seed(42)
+    rows, votes = make_rows(args.rows), make_votes(args.votes)
+    print(f"{'path':<28} {'time':>12} {'output':>13} {'throughput':>14}")
+    print("-" * 70)
+    for name, default_fn, fast_fn, data in (("list", list_default, list_fast, rows),
+                                             ("full", votes_default, votes_fast, votes)):
+        seconds, body = measure(default_fn, data, args.repeat)
+        report(f"{name}: pydantic + json", seconds, len(body))
+        seconds, body = measure(fast_fn, data, args.repeat)
+        report(f"{name}: rows + orjson", seconds, len(body))
+        for encoding in ("gzip", "br") if brotli else ("gzip",):
+            seconds, compressed = measure(lambda b: compress(b, encoding), body, args.repeat)
+            report(f"{name}: {encoding} ({len(body) / len(compressed):.1f}x)", seconds, len(compressed), len(body))
+    if brotli is None:
+        print("brotli not installed; install it to measure brotli compression")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,123 @@
 import os
 import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
 from web3 import Web3
 from dotenv import load_dotenv
+from shared_state import get_shared_store, shared_dict
+from resilience import get_backend
 
 # Load environment variables
 load_dotenv()
 
 # Get blockchain configuration from environment
 RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
+# Reads are hedged across every URL here; transactions always go to the first
+RPC_URLS = [url.strip() for url in (os.getenv("RPC_URLS") or RPC_URL).split(",") if url.strip()]
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
 CONTRACT_ABI_PATH = os.getenv("CONTRACT_ABI_PATH", "../contracts/artifacts/contracts/AIGov.sol/AIGov.json")
+WALLET_PRIVATE_KEY = os.getenv("WALLET_PRIVATE_KEY")
+
+# Contract reads are cached until a new block head is seen
+CHAIN_HEAD_POLL_INTERVAL = float(os.getenv("CHAIN_HEAD_POLL_INTERVAL", "1"))  # Seconds between eth_blockNumber polls
+CHAIN_CACHE_SIZE = int(os.getenv("CHAIN_CACHE_SIZE", "10000"))  # Cached reads kept per worker
+CHAIN_CACHE_STALE_WHILE_REVALIDATE = os.getenv("CHAIN_CACHE_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+
+# Nonces of the service wallet are allocated through the shared store, so workers never send two transactions with one nonce
+CHAIN_NONCE_TTL = float(os.getenv("CHAIN_NONCE_TTL", "60"))  # Seconds the allocated nonce is trusted over the node's pending count
+WALLET_NONCES = "wallet_nonces"
+
+
+class BlockCache:
+    """Contract reads keyed by (method, args), valid until the head moves past the block they were read at.
+
+    With stale_while_revalidate, an entry one block behind the head is
+    returned immediately while a background read refreshes it, so callers
+    never wait on RPC for data at most one block old. Concurrent misses for
+    the same key share one RPC call.
+    """
+
+    def __init__(self, max_entries=CHAIN_CACHE_SIZE, stale_while_revalidate=CHAIN_CACHE_STALE_WHILE_REVALIDATE):
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self.entries = OrderedDict()  # key -> (block, value)
+        self.inflight = {}  # key -> task reading the key at the head
+        self.head = None
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    async def get(self, key, load):
+        """Return the value for key; load(block) is a coroutine function reading at a block number"""
+        head = self.head
+        if head is None:
+            self.stats["misses"] += 1
+            return await load("latest")
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            block, value = entry
+            if block >= head:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            if self.stale_while_revalidate and block >= head - 1:
+                self.stats["stale_hits"] += 1
+                self._refresh(key, load, head)
+                return value
+
+        self.stats["misses"] += 1
+        # The read is shared with other waiters; a cancelled caller must not cancel it for them
+        return await asyncio.shield(self._refresh(key, load, head))
+
+    def _refresh(self, key, load, head):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, load, head))
+            # Background revalidations may fail with nobody awaiting them
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.inflight[key] = task
+        return task
+
+    async def _load(self, key, load, head):
+        try:
+            value = await load(head)
+            current = self.entries.get(key)
+            if current is None or current[0] <= head:
+                self.entries[key] = (head, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
 
 class BlockchainService:
     def __init__(self):
         self.w3 = None
         self.contract = None
+        self.readers = []  # (rpc url, contract) for hedged reads
         self.connected = False
+        self.cache = BlockCache()
+        self.store = get_shared_store()
+        self.head_polled_at = 0.0
+        self.head_tracker = None
+        # On-chain ids and transaction hashes of submitted proposals, keyed by database id
+        self.submissions = shared_dict("chain_submissions")
     
     def connect(self):
         """Connect to blockchain and initialize contract"""
         try:
-            # Connect to Ethereum node
-            self.w3 = Web3(Web3.HTTPProvider(RPC_URL))
-            
-            # Check connection
-            if not self.w3.is_connected():
-                print("Failed to connect to Ethereum node")
+            # Connect to the Ethereum nodes; the first reachable one also sends transactions
+            nodes = []
+            for url in RPC_URLS:
+                w3 = Web3(Web3.HTTPProvider(url))
+                if w3.is_connected():
+                    nodes.append((url, w3))
+                else:
+                    print(f"Failed to connect to Ethereum node {url}")
+            if not nodes:
                 return False
             
             # Load contract ABI
@@ -42,7 +134,9 @@ class BlockchainService:
                 return False
             
             # Initialize contract
-            self.contract = self.w3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)
+            self.readers = [(url, w3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)) for url, w3 in nodes]
+            self.w3 = nodes[0][1]
+            self.contract = self.readers[0][1]
             self.connected = True
             return True
         except Exception as e:
@@ -50,63 +144,272 @@ class BlockchainService:
             self.connected = False
             return False
     
+    async def _read(self, read, block="latest"):
+        """Run read(contract, block) hedged across the RPC endpoints"""
+        return await get_backend("rpc").hedged([
+            (url, lambda contract=contract: asyncio.to_thread(read, contract, block))
+            for url, contract in self.readers
+        ])
+    
+    async def poll_head(self):
+        """Read the latest block number; a new head invalidates every cached read"""
+        block = await self._read(lambda contract, _: contract.w3.eth.block_number)
+        # A lagging endpoint may answer first; never move the head backwards
+        block = max(block, self.cache.head or 0)
+        self.cache.head = block
+        self.head_polled_at = time.monotonic()
+        return block
+    
+    async def run_head_tracker(self):
+        """Poll eth_blockNumber until cancelled"""
+        while True:
+            try:
+                if self.connected or self.connect():
+                    await self.poll_head()
+            except Exception as e:
+                print(f"Error polling block head: {str(e)}")
+            await asyncio.sleep(CHAIN_HEAD_POLL_INTERVAL)
+    
+    def start_head_tracker(self):
+        """Track the block head in the background of the running event loop"""
+        if self.head_tracker is None:
+            self.head_tracker = asyncio.get_running_loop().create_task(self.run_head_tracker())
+    
+    async def stop_head_tracker(self):
+        if self.head_tracker is not None:
+            self.head_tracker.cancel()
+            try:
+                await self.head_tracker
+            except asyncio.CancelledError:
+                pass
+            self.head_tracker = None
+    
+    async def cached_call(self, key, read):
+        """read(contract, block) through the block cache, polling the head on demand when no tracker runs"""
+        if not self.connected and not self.connect():
+            raise ConnectionError("Blockchain node unavailable")
+        if self.head_tracker is None and time.monotonic() - self.head_polled_at > CHAIN_HEAD_POLL_INTERVAL:
+            await self.poll_head()
+        return await self.cache.get(key, lambda block: self._read(read, block))
+    
     async def get_proposal_count(self):
         """Get the total number of proposals"""
-        if not self.connected and not self.connect():
-            return 0
-        
         try:
-            return self.contract.functions.proposalCount().call()
+            return await self.cached_call(
+                ("proposalCount",),
+                lambda contract, block: contract.functions.proposalCount().call(block_identifier=block)
+            )
         except Exception as e:
             print(f"Error getting proposal count: {str(e)}")
             return 0
     
+    def _read_proposal(self, contract, proposal_id, block):
+        proposal = contract.functions.proposals(proposal_id).call(block_identifier=block)
+        
+        # Format proposal data (the public getter omits the voted mapping)
+        return {
+            "id": proposal[0],
+            "proposer": proposal[1],
+            "ipfsHash": proposal[2],
+            "summary": proposal[3],
+            "riskScore": proposal[4],
+            "category": proposal[5],
+            "votesFor": proposal[6],
+            "votesAgainst": proposal[7],
+            "executed": proposal[8],
+        }
+    
     async def get_proposal(self, proposal_id):
         """Get proposal details from the smart contract"""
-        if not self.connected and not self.connect():
-            return None
-        
         try:
-            proposal = self.contract.functions.proposals(proposal_id).call()
-            
-            # Format proposal data
-            return {
-                "id": proposal_id,
-                "title": proposal[0],  # Assuming title is the first field
-                "proposer": proposal[1],  # Assuming proposer is the second field
-                "votesFor": proposal[2],  # Assuming votesFor is the third field
-                "votesAgainst": proposal[3],  # Assuming votesAgainst is the fourth field
-                "executed": proposal[4],  # Assuming executed is the fifth field
-                # Add other fields as needed
-            }
+            return await self.cached_call(
+                ("proposals", proposal_id),
+                lambda contract, block: self._read_proposal(contract, proposal_id, block)
+            )
         except Exception as e:
             print(f"Error getting proposal {proposal_id}: {str(e)}")
             return None
     
-    async def get_vote(self, proposal_id, voter):
-        """Get a voter's vote on a proposal"""
-        if not self.connected and not self.connect():
+    async def get_proposal_data(self, proposal_id):
+        """On-chain id, transaction and current state of a proposal, by database id"""
+        submission = self.submissions.get(proposal_id)
+        if not submission:
             return None
         
+        data = {"on_chain_id": submission["on_chain_id"], "tx_hash": submission["tx_hash"]}
+        chain_proposal = await self.get_proposal(submission["on_chain_id"])
+        if chain_proposal:
+            data.update(
+                votes_for=chain_proposal["votesFor"],
+                votes_against=chain_proposal["votesAgainst"],
+                executed=chain_proposal["executed"]
+            )
+        return data
+    
+    async def get_vote(self, proposal_id, voter):
+        """Get a voter's vote on a proposal"""
         try:
             # Assuming there's a function to get a vote
-            vote = self.contract.functions.getVote(proposal_id, voter).call()
-            return vote
+            return await self.cached_call(
+                ("getVote", proposal_id, voter),
+                lambda contract, block: contract.functions.getVote(proposal_id, voter).call(block_identifier=block)
+            )
         except Exception as e:
             print(f"Error getting vote for proposal {proposal_id} by {voter}: {str(e)}")
             return None
     
     async def is_delegate_active(self, user):
         """Check if a user has an active delegate"""
-        if not self.connected and not self.connect():
-            return False
-        
         try:
-            # Assuming there's a function to check delegate status
-            return self.contract.functions.delegates(user).call() != '0x0000000000000000000000000000000000000000'
+            delegate = await self.cached_call(
+                ("delegates", user),
+                lambda contract, block: contract.functions.delegates(user).call(block_identifier=block)
+            )
+            return delegate != '0x0000000000000000000000000000000000000000'
         except Exception as e:
             print(f"Error checking delegate status for {user}: {str(e)}")
             return False
+    
+    async def get_block_number(self):
+        """Latest block number"""
+        if not self.connected and not self.connect():
+            raise ConnectionError("Blockchain node unavailable")
+        return await self.poll_head()
+    
+    def _read_delegate_events(self, contract, from_block, to_block):
+        event = contract.events.DelegateSet()
+        try:
+            logs = event.get_logs(from_block=from_block, to_block=to_block)
+        except TypeError:
+            # web3 < 7 spells the range arguments in camelCase
+            logs = event.get_logs(fromBlock=from_block, toBlock=to_block)
+        logs = sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+        return [(log["blockNumber"], log["args"]["user"], log["args"]["delegate"]) for log in logs]
+    
+    async def get_delegate_events(self, from_block, to_block):
+        """DelegateSet events in a block range as (block, user, delegate), in chain order"""
+        if not self.connected and not self.connect():
+            raise ConnectionError("Blockchain node unavailable")
+        return await self._read(lambda contract, _: self._read_delegate_events(contract, from_block, to_block))
+    
+    def _allocate_nonce(self, address):
+        """Next nonce of the wallet, unique across workers.
+
+        The node's pending count lags transactions other workers have just
+        sent, so the next nonce is also kept in the shared store. It expires
+        after CHAIN_NONCE_TTL idle seconds and the node's count is used again.
+        """
+        pending = self.w3.eth.get_transaction_count(address, "pending")
+        with self.store.lock():
+            nonce = max(pending, self.store.get(WALLET_NONCES, address, 0))
+            self.store.set(WALLET_NONCES, address, nonce + 1, ttl=CHAIN_NONCE_TTL)
+        return nonce
+    
+    def _release_nonce(self, address, nonce):
+        """Give back a nonce whose transaction was never sent"""
+        with self.store.lock():
+            if self.store.get(WALLET_NONCES, address) == nonce + 1:
+                self.store.set(WALLET_NONCES, address, nonce, ttl=CHAIN_NONCE_TTL)
+            else:
+                # Later nonces are taken; resync with the node rather than leave a gap that blocks them
+                self.store.delete(WALLET_NONCES, address)
+    
+    def _transact(self, function):
+        """Sign and send a contract call from the service wallet and wait for its receipt"""
+        account = self.w3.eth.account.from_key(WALLET_PRIVATE_KEY)
+        nonce = self._allocate_nonce(account.address)
+        try:
+            tx = function.build_transaction({"from": account.address, "nonce": nonce})
+            signed = account.sign_transaction(tx)
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            tx_hash = self.w3.eth.send_raw_transaction(raw)
+        except Exception:
+            self._release_nonce(account.address, nonce)
+            raise
+        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+    
+    async def submit_proposal(self, proposal_id, ipfs_hash, summary, risk_score, category, author_address):
+        """Submit a proposal to the contract and record its on-chain id"""
+        if not self.connected and not self.connect():
+            return None
+        
+        try:
+            receipt = await asyncio.to_thread(
+                self._transact,
+                self.contract.functions.submitProposal(ipfs_hash, summary, risk_score, category)
+            )
+            event = self.contract.events.ProposalSubmitted().process_receipt(receipt)[0]
+            submission = {
+                "on_chain_id": event["args"]["id"],
+                "tx_hash": receipt["transactionHash"].hex(),
+                "author": author_address
+            }
+            self.submissions[proposal_id] = submission
+            return submission
+        except Exception as e:
+            print(f"Error submitting proposal {proposal_id}: {str(e)}")
+            return None
+    
+    async def submit_vote(self, proposal_id, voter, vote):
+        """Cast a vote on behalf of a user who made the service wallet their delegate"""
+        submission = self.submissions.get(proposal_id)
+        if not submission or (not self.connected and not self.connect()):
+            return None
+        
+        try:
+            receipt = await asyncio.to_thread(
+                self._transact,
+                self.contract.functions.delegateVote(submission["on_chain_id"], vote, voter)
+            )
+            return receipt["transactionHash"].hex()
+        except Exception as e:
+            print(f"Error submitting vote on proposal {proposal_id} for {voter}: {str(e)}")
+            return None
+    
+    async def submit_votes(self, proposal_id, votes):
+        """Cast many delegated votes on one proposal in one transaction.
+
+        votes is a list of (voter, vote). Returns the transaction hash and the
+        voters the contract counted (it skips users who revoked the delegation
+        or already voted), or None if the transaction failed.
+        """
+        submission = self.submissions.get(proposal_id)
+        if not submission or (not self.connected and not self.connect()):
+            return None
+        
+        try:
+            receipt = await asyncio.to_thread(
+                self._transact,
+                self.contract.functions.batchDelegateVote(
+                    submission["on_chain_id"],
+                    [Web3.to_checksum_address(voter) for voter, _ in votes],
+                    [vote for _, vote in votes]
+                )
+            )
+            cast = {event["args"]["voter"].lower() for event in self.contract.events.Voted().process_receipt(receipt)}
+            return {
+                "tx_hash": receipt["transactionHash"].hex(),
+                "voters": [voter for voter, _ in votes if voter.lower() in cast]
+            }
+        except Exception as e:
+            print(f"Error submitting {len(votes)} votes on proposal {proposal_id}: {str(e)}")
+            return None
+    
+    async def publish_vote_root(self, proposal_id, root, vote_count):
+        """Store the Merkle root of a proposal's first vote_count votes in the contract"""
+        submission = self.submissions.get(proposal_id)
+        if not submission or (not self.connected and not self.connect()):
+            return None
+        
+        try:
+            receipt = await asyncio.to_thread(
+                self._transact,
+                self.contract.functions.publishVoteRoot(submission["on_chain_id"], bytes.fromhex(root), vote_count)
+            )
+            return receipt["transactionHash"].hex()
+        except Exception as e:
+            print(f"Error publishing vote root of proposal {proposal_id}: {str(e)}")
+            return None
 
 # Create a singleton instance
 blockchain_service = BlockchainService()
@@ -114,10 +417,22 @@ blockchain_service = BlockchainService()
 # Mock implementation for development without blockchain
 class MockBlockchainService:
     def __init__(self):
-        self.proposals = {}
-        self.votes = {}
-        self.delegates = {}
-        self.proposal_count = 0
+        # Shared between worker processes so every worker sees the same mock chain
+        self.store = get_shared_store()
+        self.proposals = shared_dict("mock_chain_proposals")
+        self.votes = shared_dict("mock_chain_votes")
+        self.delegates = shared_dict("mock_chain_delegates")
+        self.submissions = shared_dict("mock_chain_submissions")
+        self.delegate_events = shared_dict("mock_chain_delegate_events")  # block -> [user, delegate]
+        self.vote_roots = shared_dict("mock_chain_vote_roots")
+    
+    @property
+    def proposal_count(self):
+        return self.store.get("mock_chain", "proposal_count", 0)
+    
+    @proposal_count.setter
+    def proposal_count(self, value):
+        self.store.set("mock_chain", "proposal_count", value)
     
     async def get_proposal_count(self):
         """Mock getting the total number of proposals"""
@@ -141,6 +456,80 @@ class MockBlockchainService:
         self.proposals[proposal_id] = mock_proposal
         return mock_proposal
     
+    async def get_proposal_data(self, proposal_id):
+        """Mock on-chain id, transaction and state of a proposal, by database id"""
+        submission = self.submissions.get(proposal_id)
+        if not submission:
+            return None
+        
+        chain_proposal = await self.get_proposal(submission["on_chain_id"])
+        return {
+            "on_chain_id": submission["on_chain_id"],
+            "tx_hash": submission["tx_hash"],
+            "votes_for": chain_proposal["votesFor"],
+            "votes_against": chain_proposal["votesAgainst"],
+            "executed": chain_proposal["executed"]
+        }
+    
+    async def submit_proposal(self, proposal_id, ipfs_hash, summary, risk_score, category, author_address):
+        """Mock submitting a proposal"""
+        with self.store.lock():
+            on_chain_id = self.proposal_count
+            self.proposals[on_chain_id] = {
+                "id": on_chain_id,
+                "title": summary[:80],
+                "proposer": author_address,
+                "votesFor": 0,
+                "votesAgainst": 0,
+                "executed": False,
+            }
+            self.proposal_count = on_chain_id + 1
+            submission = {
+                "on_chain_id": on_chain_id,
+                "tx_hash": "0x" + hashlib.sha256(f"proposal:{proposal_id}:{ipfs_hash}".encode()).hexdigest(),
+                "author": author_address
+            }
+            self.submissions[proposal_id] = submission
+        return submission
+    
+    async def submit_vote(self, proposal_id, voter, vote):
+        """Mock casting a vote"""
+        submission = self.submissions.get(proposal_id)
+        if not submission:
+            return None
+        self.add_mock_vote(submission["on_chain_id"], voter, vote)
+        return "0x" + hashlib.sha256(f"vote:{proposal_id}:{voter}".encode()).hexdigest()
+    
+    async def submit_votes(self, proposal_id, votes):
+        """Mock casting a batch of delegated votes"""
+        submission = self.submissions.get(proposal_id)
+        if not submission:
+            return None
+        cast = []
+        for voter, vote in votes:
+            if f"{submission['on_chain_id']}:{voter}" not in self.votes:
+                self.add_mock_vote(submission["on_chain_id"], voter, vote)
+                cast.append(voter)
+        batch = ",".join(voter for voter, _ in votes)
+        return {
+            "tx_hash": "0x" + hashlib.sha256(f"votes:{proposal_id}:{batch}".encode()).hexdigest(),
+            "voters": cast
+        }
+    
+    async def publish_vote_root(self, proposal_id, root, vote_count):
+        """Mock storing a proposal's vote Merkle root"""
+        submission = self.submissions.get(proposal_id)
+        if not submission:
+            return None
+        self.vote_roots[submission["on_chain_id"]] = {"root": root, "vote_count": vote_count}
+        return "0x" + hashlib.sha256(f"vote_root:{proposal_id}:{root}".encode()).hexdigest()
+    
+    def start_head_tracker(self):
+        """The mock chain has no blocks to track"""
+    
+    async def stop_head_tracker(self):
+        pass
+    
     async def get_vote(self, proposal_id, voter):
         """Mock getting a voter's vote on a proposal"""
         key = f"{proposal_id}:{voter}"
@@ -154,26 +543,49 @@ class MockBlockchainService:
         """Mock checking if a user has an active delegate"""
         return user in self.delegates and self.delegates[user]
     
+    async def get_block_number(self):
+        """Mock block number: one block per delegation event"""
+        return len(self.delegate_events)
+    
+    async def get_delegate_events(self, from_block, to_block):
+        """Mock DelegateSet events in a block range"""
+        return [
+            (block, *self.delegate_events[block])
+            for block in range(max(from_block, 1), to_block + 1)
+            if block in self.delegate_events
+        ]
+    
     def add_mock_proposal(self, proposal_id, proposal_data):
         """Add a mock proposal for testing"""
-        self.proposals[proposal_id] = proposal_data
-        self.proposal_count = max(self.proposal_count, proposal_id + 1)
+        with self.store.lock():
+            self.proposals[proposal_id] = proposal_data
+            self.proposal_count = max(self.proposal_count, proposal_id + 1)
     
     def add_mock_vote(self, proposal_id, voter, vote_type):
         """Add a mock vote for testing"""
         key = f"{proposal_id}:{voter}"
-        self.votes[key] = vote_type
-        
-        # Update proposal vote counts
-        if proposal_id in self.proposals:
-            if vote_type:
-                self.proposals[proposal_id]["votesFor"] += 1
-            else:
-                self.proposals[proposal_id]["votesAgainst"] += 1
+        with self.store.lock():
+            self.votes[key] = vote_type
+            
+            # Update proposal vote counts (values are copies, so write the proposal back)
+            if proposal_id in self.proposals:
+                proposal = self.proposals[proposal_id]
+                if vote_type:
+                    proposal["votesFor"] += 1
+                else:
+                    proposal["votesAgainst"] += 1
+                self.proposals[proposal_id] = proposal
     
     def set_mock_delegate(self, user, is_active):
         """Set a mock delegate status for testing"""
         self.delegates[user] = is_active
+    
+    def add_mock_delegation(self, user, delegate):
+        """Record a mock DelegateSet event in a new block"""
+        with self.store.lock():
+            block = len(self.delegate_events) + 1
+            self.delegate_events[block] = [user, delegate]
+            self.delegates[user] = delegate != "0x0000000000000000000000000000000000000000"
 
 # Create a mock instance for development
 mock_blockchain_service = MockBlockchainService()
@@ -0,0 +1,95 @@
+"""
+Local CID computation
+
+Computes the CIDv1 that an IPFS node assigns to a file added with
+`ipfs add --cid-version=1` and the default importer settings: 256 KiB
+fixed-size chunks stored as raw leaves, joined by a balanced tree of
+dag-pb/UnixFS nodes with at most 174 links each. A file that fits in one
+chunk is a single raw block.
+"""
+
+import base64
+import hashlib
+
+CHUNK_SIZE = 256 * 1024
+MAX_LINKS = 174
+
+RAW_CODEC = 0x55
+DAG_PB_CODEC = 0x70
+SHA2_256 = 0x12
+UNIXFS_FILE = 2
+
+
+def varint(n):
+    """Unsigned LEB128, as used by protobuf and multiformats"""
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, value):
+    """Length-delimited protobuf field"""
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+
+def _varint_field(number, value):
+    return varint(number << 3) + varint(value)
+
+
+def cid_bytes(codec, block):
+    """Binary CIDv1 of a block: version, codec, sha2-256 multihash"""
+    digest = hashlib.sha256(block).digest()
+    return varint(1) + varint(codec) + varint(SHA2_256) + varint(len(digest)) + digest
+
+
+def cid_string(binary_cid):
+    """Multibase base32 (lowercase, unpadded) form of a binary CID"""
+    return "b" + base64.b32encode(binary_cid).decode("ascii").lower().rstrip("=")
+
+
+def file_node(children):
+    """dag-pb node linking (cid, tsize, filesize) children; returns (block, tsize, filesize)"""
+    filesize = sum(size for _, _, size in children)
+    unixfs = _varint_field(1, UNIXFS_FILE) + _varint_field(3, filesize)
+    unixfs += b"".join(_varint_field(4, size) for _, _, size in children)
+
+    # dag-pb writes Links before Data; every link carries an empty Name
+    block = b"".join(
+        _field(2, _field(1, child_cid) + _field(2, b"") + _varint_field(3, tsize))
+        for child_cid, tsize, _ in children
+    ) + _field(1, unixfs)
+    return block, len(block) + sum(tsize for _, tsize, _ in children), filesize
+
+
+def iter_blocks(data):
+    """Yield (binary cid, block) for every block of the file, root last"""
+    level = []
+    for offset in range(0, max(len(data), 1), CHUNK_SIZE):
+        chunk = data[offset:offset + CHUNK_SIZE]
+        leaf_cid = cid_bytes(RAW_CODEC, chunk)
+        yield leaf_cid, chunk
+        level.append((leaf_cid, len(chunk), len(chunk)))
+
+    # Group each level into parents of up to MAX_LINKS until one root remains
+    while len(level) > 1:
+        parents = []
+        for start in range(0, len(level), MAX_LINKS):
+            block, tsize, filesize = file_node(level[start:start + MAX_LINKS])
+            node_cid = cid_bytes(DAG_PB_CODEC, block)
+            yield node_cid, block
+            parents.append((node_cid, tsize, filesize))
+        level = parents
+
+
+def compute_cid(data):
+    """CIDv1 string of data as added by an IPFS node"""
+    root = None
+    for root, _ in iter_blocks(data):
+        pass
+    return cid_string(root)
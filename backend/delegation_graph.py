@@ -0,0 +1,226 @@
+"""
+AI-Gov Delegation Graph
+
+In-memory index of the contract's `delegates` mapping, built from
+DelegateSet events and updated incrementally as new blocks arrive.
+
+Each account's effective delegate is the end of its delegation chain. It is
+resolved once and cached for every account on the walked path (path
+compression), so repeated lookups are O(1). When an account changes its
+delegate, only the accounts whose chains pass through it (its delegator
+subtree) are invalidated and re-resolved.
+
+Voting power is one vote per account, as in AIGov.sol. An account's power
+is the number of accounts whose effective delegate it is, itself included.
+Chains that end in a delegation cycle are ignored: every account on such a
+chain keeps its own vote, and the cycle's members are reported.
+"""
+
+import os
+import heapq
+import asyncio
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DELEGATION_SYNC_INTERVAL = float(os.getenv("DELEGATION_SYNC_INTERVAL", "5"))  # Seconds between event polls
+DELEGATION_LOG_CHUNK = int(os.getenv("DELEGATION_LOG_CHUNK", "5000"))  # Blocks per eth_getLogs request
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+_NONE = -1  # No delegate
+_UNRESOLVED = -2  # Effective delegate not cached
+_CYCLIC = -3  # Chain ends in a cycle; the account keeps its own vote
+
+
+class DelegationGraph:
+    def __init__(self):
+        self.ids = {}  # address -> account id
+        self.addresses = []  # account id -> address
+        self.parent = []  # account id -> direct delegate id or _NONE
+        self.root = []  # account id -> cached effective delegate id, _UNRESOLVED or _CYCLIC
+        self.power = []  # account id -> accounts whose effective delegate this is
+        self.delegators = {}  # account id -> ids of accounts delegating directly to it
+        self.cycle_members = set()
+        self.delegations = 0
+        self.last_block = -1
+        self.syncer = None
+
+    def _id(self, address):
+        """Account id of an address, adding it as a self-delegating account if new"""
+        account = self.ids.get(address)
+        if account is None:
+            account = len(self.addresses)
+            self.ids[address] = account
+            self.addresses.append(address)
+            self.parent.append(_NONE)
+            self.root.append(account)
+            self.power.append(1)
+        return account
+
+    def _resolve(self, account):
+        """Effective delegate id of an account, caching it along the walked path"""
+        cached = self.root[account]
+        if cached >= 0:
+            return cached
+        if cached == _CYCLIC:
+            return account
+
+        path = []
+        on_path = {}
+        node = account
+        while True:
+            cached = self.root[node]
+            if cached >= 0:
+                end = cached
+                break
+            if cached == _CYCLIC:
+                end = _CYCLIC
+                break
+            if node in on_path:
+                # Cycle: members are the path from the first visit of node onwards
+                self.cycle_members.update(path[on_path[node]:])
+                end = _CYCLIC
+                break
+            on_path[node] = len(path)
+            path.append(node)
+            parent = self.parent[node]
+            if parent == _NONE:
+                end = node
+                break
+            node = parent
+
+        for node in path:
+            self.root[node] = end
+        return account if end == _CYCLIC else end
+
+    def _subtree(self, account):
+        """The account and every account whose chain passes through it"""
+        seen = {account}
+        stack = [account]
+        while stack:
+            for delegator in self.delegators.get(stack.pop(), ()):
+                if delegator not in seen:
+                    seen.add(delegator)
+                    stack.append(delegator)
+        return seen
+
+    def set_delegate(self, user, delegate):
+        """Apply one DelegateSet event; the zero address clears the delegation"""
+        account = self._id(user)
+        new_parent = _NONE if delegate in (None, ZERO_ADDRESS) or delegate == user else self._id(delegate)
+        old_parent = self.parent[account]
+        if new_parent == old_parent:
+            return
+
+        # Only accounts whose chains pass through this one can change effective delegate
+        affected = self._subtree(account)
+        for node in affected:
+            self.power[self._resolve(node)] -= 1
+        for node in affected:
+            self.root[node] = _UNRESOLVED
+        self.cycle_members.difference_update(affected)
+
+        if old_parent != _NONE:
+            self.delegators[old_parent].discard(account)
+            if not self.delegators[old_parent]:
+                del self.delegators[old_parent]
+            self.delegations -= 1
+        if new_parent != _NONE:
+            self.delegators.setdefault(new_parent, set()).add(account)
+            self.delegations += 1
+        self.parent[account] = new_parent
+
+        for node in affected:
+            self.power[self._resolve(node)] += 1
+
+    def apply_events(self, events):
+        """Apply (block, user, delegate) events in chain order"""
+        for block, user, delegate in events:
+            self.set_delegate(user, delegate)
+            self.last_block = max(self.last_block, block)
+
+    def effective_delegate(self, address):
+        """Address that votes for this account (itself when it has not delegated)"""
+        account = self.ids.get(address)
+        return address if account is None else self.addresses[self._resolve(account)]
+
+    def voting_power(self, address):
+        account = self.ids.get(address)
+        return 1 if account is None else self.power[account]
+
+    def describe(self, address):
+        """Delegation state of one account"""
+        account = self.ids.get(address)
+        if account is None:
+            return {"address": address, "delegate": None, "effective_delegate": address,
+                    "voting_power": 1, "direct_delegators": 0, "in_cycle": False}
+        parent = self.parent[account]
+        effective = self._resolve(account)
+        return {
+            "address": address,
+            "delegate": None if parent == _NONE else self.addresses[parent],
+            "effective_delegate": self.addresses[effective],
+            "voting_power": self.power[account],
+            "direct_delegators": len(self.delegators.get(account, ())),
+            "in_cycle": account in self.cycle_members
+        }
+
+    def top_delegates(self, limit=20):
+        """Accounts holding the most voting power"""
+        top = heapq.nlargest(limit, range(len(self.power)), key=self.power.__getitem__)
+        return [{"address": self.addresses[account], "voting_power": self.power[account]} for account in top]
+
+    def cycles(self):
+        """Addresses of accounts in delegation cycles"""
+        return sorted(self.addresses[account] for account in self.cycle_members)
+
+    def stats(self):
+        return {
+            "accounts": len(self.addresses),
+            "delegations": self.delegations,
+            "cycle_members": len(self.cycle_members),
+            "last_block": self.last_block
+        }
+
+    async def sync(self, blockchain_service):
+        """Apply DelegateSet events from the blocks after last_block up to the head"""
+        head = await blockchain_service.get_block_number()
+        while self.last_block < head:
+            to_block = min(head, self.last_block + DELEGATION_LOG_CHUNK)
+            events = await blockchain_service.get_delegate_events(self.last_block + 1, to_block)
+            self.apply_events(events)
+            self.last_block = to_block
+        return head
+
+    async def run_sync(self, blockchain_service):
+        """Follow new DelegateSet events until cancelled"""
+        while True:
+            try:
+                await self.sync(blockchain_service)
+            except Exception as e:
+                print(f"Error syncing delegation graph: {str(e)}")
+            await asyncio.sleep(DELEGATION_SYNC_INTERVAL)
+
+    def start_sync(self, blockchain_service):
+        """Follow DelegateSet events in the background of the running event loop"""
+        if self.syncer is None:
+            self.syncer = asyncio.get_running_loop().create_task(self.run_sync(blockchain_service))
+
+    async def stop_sync(self):
+        if self.syncer is not None:
+            self.syncer.cancel()
+            try:
+                await self.syncer
+            except asyncio.CancelledError:
+                pass
+            self.syncer = None
+
+
+# Create a singleton instance
+delegation_graph = DelegationGraph()
+
+def get_delegation_graph():
+    """Get the process-wide delegation graph"""
+    return delegation_graph
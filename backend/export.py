@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""
+AI-Gov Analytics Export
+
+Streams the proposals, proposal_analysis, votes and delegate_voting_history
+tables as Parquet or Arrow IPC (when pyarrow is installed) or gzip-compressed
+CSV. Rows are read through a server-side cursor in batches of
+EXPORT_BATCH_ROWS and each batch is encoded and handed on before the next is
+fetched, so memory stays flat however large the table is.
+
+Exports are incremental. Each table is ordered by its change column
+(updated_at for proposals and analyses, which are updated in place,
+created_at for the append-only vote tables), and an export covers the rows
+changed after the `since` watermark up to a cut-off EXPORT_SETTLE_SECONDS
+in the past, so rows of transactions still in flight are left for the next
+run. The cut-off is returned as the next watermark.
+
+Usage:
+    python export.py [--format parquet|arrow|csv] [--out exports] [--tables votes,...] [--full]
+
+The CLI keeps the watermark of each table in <out>/watermarks.json and
+exports only what changed since its previous run unless --full is given.
+"""
+
+import os
+import csv
+import io
+import sys
+import json
+import zlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, Boolean, Integer, Float, DateTime
+from dotenv import load_dotenv
+
+from database import SessionLocal, Proposal, ProposalAnalysis, Vote, DelegateVotingHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Load environment variables
+load_dotenv()
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))  # Rows fetched and encoded at a time
+EXPORT_SETTLE_SECONDS = float(os.getenv("EXPORT_SETTLE_SECONDS", "60"))  # Rows newer than this wait for the next export
+
+# Exported tables and the column that changes whenever a row is written
+EXPORT_TABLES = {
+    "proposals": (Proposal, "updated_at"),
+    "proposal_analysis": (ProposalAnalysis, "updated_at"),
+    "votes": (Vote, "created_at"),
+    "delegate_voting_history": (DelegateVotingHistory, "created_at"),
+}
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "csv": ("application/gzip", "csv.gz"),
+}
+
+
+def available_formats():
+    return [name for name in EXPORT_FORMATS if pa is not None or name == "csv"]
+
+
+def export_window(since=None, now=None):
+    """(since, until) datetimes of an export; until becomes the next watermark"""
+    now = now or datetime.now(timezone.utc)
+    until = now - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    if isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since, until
+
+
+def iter_batches(db, table, since, until, batch_rows=EXPORT_BATCH_ROWS):
+    """Yield lists of row tuples changed in (since, until], in (change column, id) order"""
+    model, change_column = EXPORT_TABLES[table]
+    changed = model.__table__.c[change_column]
+    query = select(*model.__table__.columns).where(changed <= until)
+    if since is not None:
+        query = query.where(changed > since)
+    query = query.order_by(changed, model.__table__.c.id)
+
+    result = db.execute(query.execution_options(stream_results=True, yield_per=batch_rows))
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+
+class _ChunkSink:
+    """Write-only file that collects output until it is drained"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _encode_arrow(columns, batches, export_format):
+    schema = pa.schema([pa.field(column.name, _arrow_type(column)) for column in columns])
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    for rows in batches:
+        arrays = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)]
+        # Each batch becomes one Parquet row group or Arrow record batch
+        write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _encode_csv(columns, batches):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for rows in batches:
+        writer.writerows(rows)
+        yield compressor.compress(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    yield compressor.compress(buffer.getvalue().encode("utf-8")) + compressor.flush()
+
+
+def stream_export(db, table, export_format, since, until):
+    """Yield the encoded bytes of one table's export, one batch at a time"""
+    if export_format not in available_formats():
+        raise ValueError(f"Unsupported export format {export_format}; available: {', '.join(available_formats())}")
+    columns = list(EXPORT_TABLES[table][0].__table__.columns)
+    batches = iter_batches(db, table, since, until)
+    if export_format == "csv":
+        encoded = _encode_csv(columns, batches)
+    else:
+        encoded = _encode_arrow(columns, batches, export_format)
+    for data in encoded:
+        if data:
+            yield data
+
+
+def load_watermarks(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_watermarks(path, watermarks):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Export governance tables for analytics")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet" if pa is not None else "csv")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--tables", default=",".join(EXPORT_TABLES), help="Comma-separated tables")
+    parser.add_argument("--full", action="store_true", help="Ignore saved watermarks and export everything")
+    args = parser.parse_args()
+
+    if args.format not in available_formats():
+        print(f"The {args.format} format needs pyarrow; install it or use --format csv")
+        sys.exit(1)
+
+    os.makedirs(args.out, exist_ok=True)
+    watermarks_path = os.path.join(args.out, "watermarks.json")
+    watermarks = {} if args.full else load_watermarks(watermarks_path)
+    extension = EXPORT_FORMATS[args.format][1]
+
+    db = SessionLocal()
+    try:
+        for table in args.tables.split(","):
+            since, until = export_window(watermarks.get(table))
+            path = os.path.join(args.out, f"{table}-{until.strftime('%Y%m%dT%H%M%SZ')}.{extension}")
+            size = 0
+            with open(path, "wb") as f:
+                for data in stream_export(db, table, args.format, since, until):
+                    f.write(data)
+                    size += len(data)
+            watermarks[table] = until.isoformat()
+            save_watermarks(watermarks_path, watermarks)
+            print(f"Exported {table} changed since {since.isoformat() if since else 'the beginning'} "
+                  f"to {path} ({size / 1024:.0f} KiB)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,167 @@
+"""
+Group commit
+
+Near the end of a vote, every POST /votes commits its own transaction and
+the database's fsync rate caps throughput. With GROUP_COMMIT_ENABLED=true,
+vote writes (the vote row, delegate history and rollup counters) are handed
+to a GroupCommitWriter instead. It collects the writes that arrive within
+GROUP_COMMIT_WINDOW_MS of the first, up to GROUP_COMMIT_MAX_BATCH, and
+commits them in one transaction, so one fsync covers the whole batch. A
+lone writer (the previous batch had a single write) does not wait. The
+rollup increments of a batch are summed, so each hot counter row is
+updated once per batch rather than once per vote. The next batch is
+collected while the current one commits, so batches grow with
+concurrency.
+
+The writes of a batch share one transaction, without savepoints: on SQLite,
+pysqlite releases a savepoint opened outside an explicit transaction as a
+full commit, which would defeat the grouping. If any write fails (for
+example a duplicate vote that lost a race), the batch is rolled back and
+its writes are rerun one transaction each, so only the failing request
+gets the exception. Writes must therefore be safe to run again in a fresh
+session. A request's submit() returns only after its commit has completed.
+"""
+
+import os
+import asyncio
+from dotenv import load_dotenv
+
+from database import SessionLocal, mark_recent_write
+from rollups import defer_rollups, apply_rollups
+
+# Load environment variables
+load_dotenv()
+
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))  # Longest a write waits for others to join its batch
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))  # Writes committed per transaction at most
+
+
+class GroupCommitWriter:
+    def __init__(self, window_ms=GROUP_COMMIT_WINDOW_MS, max_batch=GROUP_COMMIT_MAX_BATCH, session_factory=SessionLocal,
+                 enabled=GROUP_COMMIT_ENABLED):
+        self.enabled = enabled
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.session_factory = session_factory
+        self.queue = None
+        self.task = None
+        self.last_batch = 0
+        self.stats = {"batches": 0, "writes": 0, "failed_writes": 0, "largest_batch": 0, "split_batches": 0}
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    def start(self):
+        """Start collecting batches in the background of the running event loop, when enabled"""
+        if self.enabled and self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Commit the writes already submitted, then stop"""
+        if self.task is not None:
+            await self.queue.put(None)
+            await self.task
+            self.task = None
+
+    async def submit(self, write, client=None):
+        """Run write(db) in the next group transaction and return its result once committed.
+
+        write must only use the session it is given. client, when given, is
+        pinned to the primary for reads after the commit.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((write, client, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self.queue.get()
+            if first is None:
+                break
+            batch = [first]
+            # Like PostgreSQL's commit_delay, only wait for company when the last batch had some
+            deadline = loop.time() + (self.window if self.last_batch > 1 else 0)
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    entry = self.queue.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self.last_batch = len(batch)
+
+            # The commit blocks on the database; the next batch gathers meanwhile
+            outcomes = await asyncio.to_thread(self.commit, batch)
+            for (_, _, future), (error, result) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def run_writes(self, writes):
+        """Run writes in one transaction and commit it; returns their results, or rolls back and raises"""
+        db = self.session_factory()
+        try:
+            # Rollup increments of all the writes are summed and written once per row
+            defer_rollups(db)
+            results = [write(db) for write in writes]
+            apply_rollups(db)
+            db.commit()
+            return results
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def commit(self, batch):
+        """Commit a batch's writes together; returns (error, result) per write"""
+        writes = [write for write, _, _ in batch]
+        try:
+            outcomes = [(None, result) for result in self.run_writes(writes)]
+        except Exception as e:
+            if len(batch) == 1:
+                outcomes = [(e, None)]
+            else:
+                # Some write failed (for example a duplicate vote that lost a race); rerun each alone to find it
+                print(f"Group of {len(batch)} writes failed, committing them one by one: {str(e)}")
+                self.stats["split_batches"] += 1
+                outcomes = []
+                for write in writes:
+                    try:
+                        outcomes.append((None, self.run_writes([write])[0]))
+                    except Exception as error:
+                        outcomes.append((error, None))
+
+        for (_, client, _), (error, _) in zip(batch, outcomes):
+            if client is not None and error is None:
+                mark_recent_write(client)
+
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        self.stats["failed_writes"] += sum(1 for error, _ in outcomes if error is not None)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        return outcomes
+
+
+# Create a singleton instance
+group_writer = GroupCommitWriter()
+
+def get_group_writer():
+    """Get the process-wide group commit writer"""
+    return group_writer
@@ -0,0 +1,171 @@
+"""
+Idempotency keys
+
+Clients that retry POST /proposals, POST /proposals/stream or POST /votes
+send the same Idempotency-Key header with every attempt. The first request
+with a key claims it by inserting an in-progress row into idempotency_keys,
+runs, and stores its response; later requests with that key get the stored
+response (marked with an Idempotent-Replayed header) without running again. A
+duplicate arriving while the first request is still running waits for it
+to finish instead of starting another execution. Reusing a key for a
+different request body is rejected with 422.
+
+If the first request fails, its claim is removed so that a retry runs
+again. Claims held by a worker that died mid-request lapse after
+IDEMPOTENCY_LEASE seconds, and completed keys expire after
+IDEMPOTENCY_KEY_TTL seconds.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal, IdempotencyKey
+
+# Load environment variables
+load_dotenv()
+
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))  # Seconds a stored response is replayed
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", "300"))  # Seconds before an unfinished claim lapses
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "120"))  # Longest a duplicate waits for the first request
+IDEMPOTENCY_POLL_INTERVAL = 0.25  # Seconds between checks on a request running in another worker
+IDEMPOTENCY_PURGE_INTERVAL = 300  # Seconds between deletions of expired keys
+
+# (route, key) -> future resolved when this worker finishes executing the request
+_inflight = {}
+_last_purge = 0.0
+
+
+def request_hash(payload):
+    """SHA-256 of a request model's JSON"""
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def _key_filter(query, route, key):
+    return query.filter(IdempotencyKey.route == route, IdempotencyKey.key == key)
+
+
+def _purge_expired(db, now):
+    global _last_purge
+    if now - _last_purge >= IDEMPOTENCY_PURGE_INTERVAL:
+        _last_purge = now
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < now).delete(synchronize_session=False)
+
+
+def _claim(route, key, digest):
+    """Claim a key; returns (True, None), or (False, stored state) when it is already taken"""
+    db = SessionLocal()
+    try:
+        now = time.time()
+        _purge_expired(db, now)
+        # Expired results and lapsed claims no longer hold the key
+        _key_filter(db.query(IdempotencyKey), route, key).filter(
+            IdempotencyKey.expires_at < now
+        ).delete(synchronize_session=False)
+        db.add(IdempotencyKey(
+            route=route,
+            key=key,
+            request_hash=digest,
+            status="in_progress",
+            expires_at=now + IDEMPOTENCY_LEASE
+        ))
+        try:
+            db.commit()
+            return True, None
+        except IntegrityError:
+            db.rollback()
+
+        row = _key_filter(db.query(IdempotencyKey), route, key).first()
+        if row is None:
+            # Released between our insert and this read
+            return False, None
+        return False, {
+            "request_hash": row.request_hash,
+            "status": row.status,
+            "status_code": row.status_code,
+            "response": row.response
+        }
+    finally:
+        db.close()
+
+
+def _complete(route, key, status_code, content):
+    db = SessionLocal()
+    try:
+        _key_filter(db.query(IdempotencyKey), route, key).update({
+            IdempotencyKey.status: "completed",
+            IdempotencyKey.status_code: status_code,
+            IdempotencyKey.response: json.dumps(content),
+            IdempotencyKey.expires_at: time.time() + IDEMPOTENCY_KEY_TTL
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(route, key):
+    db = SessionLocal()
+    try:
+        _key_filter(db.query(IdempotencyKey), route, key).filter(
+            IdempotencyKey.status == "in_progress"
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_idempotent(route, key, payload, response, execute, status_code=201):
+    """Run execute() once per Idempotency-Key, replaying its stored result to duplicates.
+
+    Without a key, execute() simply runs. response is the endpoint's
+    Response, used to set the replayed status code and header.
+    """
+    if not key:
+        return await execute()
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+    digest = request_hash(payload)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        claimed, existing = _claim(route, key, digest)
+        if claimed:
+            break
+        if existing is None:
+            continue
+        if existing["request_hash"] != digest:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if existing["status"] == "completed":
+            response.status_code = existing["status_code"]
+            response.headers["Idempotent-Replayed"] = "true"
+            return json.loads(existing["response"])
+
+        # The first request is still running; wait for it to finish
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        waiter = _inflight.get((route, key))
+        if waiter is not None:
+            await asyncio.wait([waiter], timeout=remaining)
+        else:
+            await asyncio.sleep(min(remaining, IDEMPOTENCY_POLL_INTERVAL))
+
+    waiter = asyncio.get_running_loop().create_future()
+    _inflight[(route, key)] = waiter
+    try:
+        result = await execute()
+    except BaseException:
+        _release(route, key)
+        raise
+    else:
+        _complete(route, key, status_code, jsonable_encoder(result))
+        return result
+    finally:
+        _inflight.pop((route, key), None)
+        waiter.set_result(None)
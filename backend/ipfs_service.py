@@ -1,7 +1,13 @@
 import os
 import json
+import time
+import asyncio
+import urllib.request
 import ipfshttpclient
 from dotenv import load_dotenv
+from shared_state import get_shared_store, shared_dict
+from cid import compute_cid
+from resilience import get_backend
 
 # Load environment variables
 load_dotenv()
@@ -9,71 +15,207 @@ load_dotenv()
 # Get IPFS API URL from environment or use default
 IPFS_API_URL = os.getenv("IPFS_API_URL", "/ip4/127.0.0.1/tcp/5001")
 
+# Public gateways raced against the node for reads (comma-separated URL prefixes ending in /ipfs/)
+IPFS_GATEWAYS = [url.strip() for url in os.getenv("IPFS_GATEWAYS", "").split(",") if url.strip()]
+
+# Write-behind pinning: content is spooled locally and pinned from a durable queue
+IPFS_SPOOL_DIR = os.getenv("IPFS_SPOOL_DIR", "ipfs_spool")
+IPFS_PIN_INTERVAL = float(os.getenv("IPFS_PIN_INTERVAL", "2"))  # Seconds between queue polls
+IPFS_PIN_BATCH = int(os.getenv("IPFS_PIN_BATCH", "16"))  # Entries claimed per poll
+IPFS_PIN_LEASE = float(os.getenv("IPFS_PIN_LEASE", "120"))  # Seconds a claimed entry is hidden from other workers
+IPFS_PIN_MAX_BACKOFF = float(os.getenv("IPFS_PIN_MAX_BACKOFF", "300"))  # Cap on the retry delay
+
+PIN_QUEUE = "ipfs_pin_queue"
+PIN_MISMATCHES = "ipfs_pin_mismatches"
+
+
+def encode_proposal(proposal_data):
+    """Bytes stored on IPFS for a proposal, or any other JSON document"""
+    return json.dumps(proposal_data).encode()
+
 class IPFSService:
-    def __init__(self):
-        self.client = None
-        self.connected = False
-    
-    def connect(self):
-        """Connect to IPFS daemon"""
-        try:
-            self.client = ipfshttpclient.connect(IPFS_API_URL)
-            self.connected = True
-            return True
-        except Exception as e:
-            print(f"Error connecting to IPFS: {str(e)}")
-            self.connected = False
-            return False
+    def __init__(self, spool_dir=IPFS_SPOOL_DIR):
+        self.spool_dir = spool_dir
+        self.store = get_shared_store()
+        self.pinner = None
     
-    def disconnect(self):
-        """Disconnect from IPFS daemon"""
-        if self.client:
-            try:
-                self.client.close()
-                self.connected = False
-            except Exception as e:
-                print(f"Error disconnecting from IPFS: {str(e)}")
+    def spool_path(self, cid):
+        return os.path.join(self.spool_dir, cid)
     
     async def add_proposal(self, proposal_data):
-        """Add proposal data to IPFS"""
-        if not self.connected and not self.connect():
+        """Spool proposal data, queue it for pinning and return its CID without waiting for IPFS"""
+        return await self.add_json(proposal_data)
+    
+    async def add_json(self, document):
+        """Spool a JSON document, queue it for pinning and return its CID without waiting for IPFS"""
+        try:
+            # The fsync and the shared-store lock block, so they run off the event loop
+            return await asyncio.to_thread(self.spool, encode_proposal(document))
+        except Exception as e:
+            print(f"Error spooling document for IPFS: {str(e)}")
             return None
+    
+    def spool(self, data):
+        """Write content to the spool, queue it for pinning and return its CID"""
+        cid = compute_cid(data)
         
+        # Persist before queueing so a queued entry always has its content
+        path = self.spool_path(cid)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        
+        with self.store.lock():
+            if self.store.get(PIN_QUEUE, cid) is None:
+                self.store.set(PIN_QUEUE, cid, {"attempts": 0, "next_attempt": time.time()})
+        return cid
+    
+    def _read_spool(self, cid):
         try:
-            # Convert proposal data to JSON string
-            json_data = json.dumps(proposal_data)
-            
-            # Add to IPFS
-            result = self.client.add_str(json_data)
-            
-            # Return the IPFS hash
-            return result
-        except Exception as e:
-            print(f"Error adding proposal to IPFS: {str(e)}")
+            with open(self.spool_path(cid), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
             return None
-        finally:
-            # Disconnect after operation
-            self.disconnect()
     
     async def get_proposal(self, ipfs_hash):
-        """Get proposal data from IPFS"""
-        if not self.connected and not self.connect():
-            return None
+        """Get proposal data, from the spool while it is still waiting to be pinned"""
+        data = await asyncio.to_thread(self._read_spool, ipfs_hash)
+        if data is not None:
+            return json.loads(data)
         
+        # Content the node stored under another CID can only be fetched by that CID
+        fetch_cid = await asyncio.to_thread(self.store.get, PIN_MISMATCHES, ipfs_hash) or ipfs_hash
+        
+        # Race the node against the configured gateways; the first good answer wins
+        targets = [("api", lambda: asyncio.to_thread(self._cat, fetch_cid))]
+        targets += [
+            (gateway, lambda gateway=gateway: asyncio.to_thread(self._fetch_gateway, gateway, fetch_cid, ipfs_hash))
+            for gateway in IPFS_GATEWAYS
+        ]
         try:
-            # Get data from IPFS
-            data = self.client.cat(ipfs_hash)
-            
-            # Parse JSON data
-            proposal_data = json.loads(data)
-            
-            return proposal_data
+            return json.loads(await get_backend("ipfs").hedged(targets))
         except Exception as e:
-            print(f"Error getting proposal from IPFS: {str(e)}")
+            print(f"Error getting proposal from IPFS: {str(e) or type(e).__name__}")
             return None
+    
+    def _cat(self, ipfs_hash):
+        # A client per call: hedged reads and the pinner run in separate threads
+        client = ipfshttpclient.connect(IPFS_API_URL)
+        try:
+            return client.cat(ipfs_hash)
         finally:
-            # Disconnect after operation
-            self.disconnect()
+            client.close()
+    
+    def _fetch_gateway(self, gateway, fetch_cid, ipfs_hash):
+        with urllib.request.urlopen(f"{gateway}{fetch_cid}", timeout=get_backend("ipfs").timeout) as response:
+            data = response.read()
+        # Gateways are untrusted; content addressed by a CIDv1 we can recompute is checked
+        if ipfs_hash.startswith("b") and compute_cid(data) != ipfs_hash:
+            raise ValueError(f"Gateway {gateway} returned content that does not match {ipfs_hash}")
+        return data
+    
+    def claim_due(self):
+        """Claim queued CIDs that are due, leasing them so other workers skip them"""
+        now = time.time()
+        claimed = []
+        with self.store.lock():
+            for cid in self.store.keys(PIN_QUEUE):
+                entry = self.store.get(PIN_QUEUE, cid)
+                if entry is None or entry["next_attempt"] > now:
+                    continue
+                entry["next_attempt"] = now + IPFS_PIN_LEASE
+                self.store.set(PIN_QUEUE, cid, entry)
+                claimed.append((cid, entry))
+                if len(claimed) == IPFS_PIN_BATCH:
+                    break
+        return claimed
+    
+    def pin(self, cid):
+        """Add spooled content to the node and return the node's CID for it"""
+        with open(self.spool_path(cid), "rb") as f:
+            data = f.read()
+        client = ipfshttpclient.connect(IPFS_API_URL)
+        try:
+            # CIDv1 implies raw leaves, the layout compute_cid reproduces
+            return client.add_bytes(data, opts={"cid-version": 1, "pin": "true"})
+        finally:
+            client.close()
+    
+    async def pin_one(self, cid, entry):
+        try:
+            node_cid = await get_backend("ipfs").call(lambda: asyncio.to_thread(self.pin, cid))
+        except Exception as e:
+            delay = await asyncio.to_thread(self.retry_later, cid, entry)
+            print(f"Error pinning {cid} (attempt {entry['attempts']}, retrying in {delay:.0f}s): {str(e) or type(e).__name__}")
+            return False
+        
+        if node_cid != cid:
+            # Our records use a CID the node does not serve. Keep the spooled content so
+            # reads still work, and retry: the node's add options may be fixed meanwhile.
+            await asyncio.to_thread(self.record_mismatch, cid, node_cid, entry)
+            print(f"ERROR: CID mismatch: computed {cid}, IPFS node returned {node_cid}; "
+                  f"keeping the spooled content, attempt {entry['attempts']}")
+            return False
+        
+        await asyncio.to_thread(self.finish, cid)
+        return True
+    
+    def retry_later(self, cid, entry):
+        """Back off a failed entry; returns the delay"""
+        entry["attempts"] += 1
+        delay = min(IPFS_PIN_MAX_BACKOFF, IPFS_PIN_INTERVAL * 2 ** entry["attempts"])
+        entry["next_attempt"] = time.time() + delay
+        self.store.set(PIN_QUEUE, cid, entry)
+        return delay
+    
+    def record_mismatch(self, cid, node_cid, entry):
+        self.store.set(PIN_MISMATCHES, cid, node_cid)
+        entry["attempts"] += 1
+        entry["next_attempt"] = time.time() + IPFS_PIN_MAX_BACKOFF
+        self.store.set(PIN_QUEUE, cid, entry)
+    
+    def finish(self, cid):
+        """Drop a pinned entry and its spooled content"""
+        self.store.delete(PIN_MISMATCHES, cid)
+        self.store.delete(PIN_QUEUE, cid)
+        os.remove(self.spool_path(cid))
+    
+    async def run_pinner(self):
+        """Pin queued content until cancelled"""
+        while True:
+            try:
+                for cid, entry in await asyncio.to_thread(self.claim_due):
+                    await self.pin_one(cid, entry)
+            except Exception as e:
+                print(f"Error in IPFS pin queue: {str(e)}")
+            await asyncio.sleep(IPFS_PIN_INTERVAL)
+    
+    def start_pinner(self):
+        """Start pinning in the background of the running event loop"""
+        if self.pinner is None:
+            self.pinner = asyncio.get_running_loop().create_task(self.run_pinner())
+    
+    async def stop_pinner(self):
+        if self.pinner is not None:
+            self.pinner.cancel()
+            try:
+                await self.pinner
+            except asyncio.CancelledError:
+                pass
+            self.pinner = None
+    
+    def pending_pins(self):
+        """Number of CIDs waiting to be pinned"""
+        return len(self.store.keys(PIN_QUEUE))
+    
+    def pin_mismatches(self):
+        """Our CID -> the node's CID for content the node stores under another CID"""
+        return {cid: self.store.get(PIN_MISMATCHES, cid) for cid in self.store.keys(PIN_MISMATCHES)}
 
 # Create a singleton instance
 ipfs_service = IPFSService()
@@ -88,24 +230,39 @@ def get_ipfs_gateway_url(ipfs_hash):
 # Mock implementation for development without IPFS daemon
 class MockIPFSService:
     def __init__(self):
-        self.storage = {}
+        # Shared between worker processes so every worker can read what another added
+        self.storage = shared_dict("mock_ipfs")
     
     async def add_proposal(self, proposal_data):
         """Mock adding proposal data to IPFS"""
+        return await self.add_json(proposal_data)
+    
+    async def add_json(self, document):
+        """Mock adding a JSON document to IPFS"""
         try:
-            # Generate a fake IPFS hash (for development only)
-            import hashlib
-            json_data = json.dumps(proposal_data)
-            fake_hash = "Qm" + hashlib.sha256(json_data.encode()).hexdigest()[:44]
+            # Same CID a real node would assign
+            cid = compute_cid(encode_proposal(document))
             
             # Store in memory
-            self.storage[fake_hash] = proposal_data
+            self.storage[cid] = document
             
-            return fake_hash
+            return cid
         except Exception as e:
             print(f"Error in mock IPFS add: {str(e)}")
             return None
     
+    def start_pinner(self):
+        """Nothing to pin in development"""
+    
+    async def stop_pinner(self):
+        pass
+    
+    def pending_pins(self):
+        return 0
+    
+    def pin_mismatches(self):
+        return {}
+    
     async def get_proposal(self, ipfs_hash):
         """Mock getting proposal data from IPFS"""
         try:
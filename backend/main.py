@@ -1,18 +1,38 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import os
+import json
+import asyncio
 import logging
 from datetime import datetime
 
 # Import our services
-from database import get_db, init_db, User, DelegatePreferences, Proposal as DBProposal, ProposalAnalysis, Vote, DelegateVotingHistory
-from ai_service import AIService
+from database import get_read_db, get_write_db, write_session, read_session, client_key, init_db, User, DelegatePreferences, Proposal as DBProposal, ProposalAnalysis, ProposalRevision, Vote, DelegateVotingHistory
+from ai_service import AIService, estimate_tokens, tier_metrics, AI_CHUNK_THRESHOLD_TOKENS
 from ipfs_service import get_ipfs_service, get_ipfs_gateway_url
 from blockchain_service import get_blockchain_service
+from similarity_service import (
+    get_similarity_index, reconcile_similarity_index, proposal_text as indexed_text, content_hash,
+    SIMILARITY_REUSE_THRESHOLD
+)
+from rollups import record_delegate_outcome, get_delegate_accuracy, record_current_analysis, record_vote, get_governance_stats
+from responses import FastJSONResponse, CompressionMiddleware
+from delegation_graph import get_delegation_graph
+from resilience import backend_metrics
+from admission import AdmissionMiddleware
+from idempotency import run_idempotent
+from group_commit import get_group_writer
+from shared_state import get_shared_store
+from vote_batcher import ChainVoteBatcher
+from vote_merkle import VoteRootPublisher, append_vote, get_inclusion_proof
+from export import EXPORT_TABLES, EXPORT_FORMATS, available_formats, export_window, stream_export
 
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
@@ -31,12 +51,17 @@ app = FastAPI(
     title="AI-Gov API",
     description="API for AI-powered DAO governance platform",
     version="0.1.0",
+    default_response_class=FastJSONResponse,
 )
 
 # Initialize database tables
 from database import init_db
 init_db()
 
+# Rate limit costly writes per address and IP, and shed load beyond the concurrency limit.
+# Each added middleware wraps the ones before it, so CORS headers reach its 429s.
+app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -44,8 +69,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],  # Lets the frontend back off after a 429
 )
 
+# Compress large JSON responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware)
+
 # Get services
 ipfs_service = get_ipfs_service()
 blockchain_service = get_blockchain_service()
@@ -53,10 +82,51 @@ blockchain_service = get_blockchain_service()
 # Initialize AI service
 ai_service = AIService()
 
+# Batches vote writes into shared transactions when GROUP_COMMIT_ENABLED is set
+group_writer = get_group_writer()
+
+# Casts votes on-chain, in batches per proposal when CHAIN_VOTE_BATCHING is set
+vote_batcher = ChainVoteBatcher(blockchain_service)
+
+# Publishes the vote Merkle roots of proposals that received votes
+vote_root_publisher = VoteRootPublisher(ipfs_service, blockchain_service)
+
+# Near-duplicate proposal index
+similarity_index = get_similarity_index()
+
+# Who votes for whom, built from DelegateSet events
+delegation_graph = get_delegation_graph()
+
 # Initialize database
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # Delete expired read-your-writes markers and other shared state now and then
+    get_shared_store().start_purger()
+    # Drop or recompute similarity entries that no longer match the proposals table
+    await asyncio.to_thread(reconcile_similarity_index)
+    # Pin spooled proposal content to IPFS in the background
+    ipfs_service.start_pinner()
+    # Follow the chain head so cached contract reads expire once per block
+    blockchain_service.start_head_tracker()
+    # Build and follow the delegation graph
+    delegation_graph.start_sync(blockchain_service)
+    # Group-commit vote writes
+    group_writer.start()
+    # Publish vote Merkle roots to IPFS (and the contract, when enabled)
+    vote_root_publisher.start_publisher()
+    # Cast queued votes on-chain in batches
+    vote_batcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_shared_store().stop_purger()
+    await ipfs_service.stop_pinner()
+    await blockchain_service.stop_head_tracker()
+    await delegation_graph.stop_sync()
+    await group_writer.stop()
+    await vote_root_publisher.stop_publisher()
+    await vote_batcher.stop()
 
 # Pydantic models for API
 class ProposalCreate(BaseModel):
@@ -64,6 +134,11 @@ class ProposalCreate(BaseModel):
     description: str
     author_address: str
 
+class SimilarProposal(BaseModel):
+    id: int
+    title: str
+    similarity: float
+
 class ProposalResponse(BaseModel):
     id: int
     title: str
@@ -76,13 +151,28 @@ class ProposalResponse(BaseModel):
     created_at: datetime
     on_chain_id: Optional[int] = None
     tx_hash: Optional[str] = None
+    similar_proposals: List[SimilarProposal] = []
+    analysis_reused_from: Optional[int] = None
+    analysis_truncated: bool = False  # The analysis covers a sample of a proposal too long for the token budget
 
 class VoteCreate(BaseModel):
     proposal_id: int
     voter_address: str
-    vote: bool  # True for yes, False for no
+    vote: Optional[bool] = None  # True for yes, False for no; for delegate votes, the user's own view if they give one
     delegate_vote: bool = False
 
+class DelegateRecommendationRequest(BaseModel):
+    proposal_id: int
+    voter_address: str
+    include_reasoning: bool = True
+
+class ProposalRevisionCreate(BaseModel):
+    proposal_id: int
+    title: Optional[str] = None  # Unchanged when omitted
+    description: str
+    author_address: str
+    base_revision: Optional[int] = None  # Revision the edit was made against; rejected if no longer current
+
 class DelegatePreferencesCreate(BaseModel):
     user_address: str
     risk_tolerance: int = Field(..., ge=1, le=10)
@@ -108,43 +198,131 @@ async def error_handler(request: Request, call_next):
 async def create_proposal(
     proposal: ProposalCreate, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_write_db),
+    idempotency_key: Optional[str] = Header(None)
 ):
+    # A retry with the same Idempotency-Key gets the first result instead of a second proposal
+    return await run_idempotent(
+        "POST /proposals", idempotency_key, proposal, response,
+        lambda: _create_proposal(proposal, background_tasks, db)
+    )
+
+async def _store_proposal_document(proposal: ProposalCreate):
+    """Store the full proposal content on IPFS and return its hash"""
+    proposal_data = {
+        "title": proposal.title,
+        "description": proposal.description,
+        "author": proposal.author_address,
+        "timestamp": datetime.now().isoformat()
+    }
+    return await ipfs_service.add_proposal(proposal_data)
+
+def _similar_proposals(db: Session, proposal_text: str):
+    """Near-duplicates of a proposal's text among the stored proposals, most similar first"""
+    matches = similarity_index.query(proposal_text)
+    similar_proposals = []
+    if matches:
+        rows = {row.id: row for row in db.query(DBProposal.id, DBProposal.title, DBProposal.description).filter(
+            DBProposal.id.in_([m["id"] for m in matches])
+        )}
+        for m in matches:
+            row = rows.get(m["id"])
+            if row is None:
+                continue
+            # An entry computed from other text (a reused id, a revised proposal) must not be trusted
+            stored_text = indexed_text(row.title, row.description)
+            if content_hash(stored_text) != m["content_hash"]:
+                similarity_index.add(row.id, stored_text)
+                continue
+            similar_proposals.append(SimilarProposal(id=m["id"], title=row.title, similarity=m["similarity"]))
+    return similar_proposals
+
+def _reusable_analysis(db: Session, similar_proposals: List[SimilarProposal]):
+    """Analysis of a near-identical proposal to reuse instead of calling the LLM, and that proposal's id, or (None, None)"""
+    if not similar_proposals or similar_proposals[0].similarity < SIMILARITY_REUSE_THRESHOLD:
+        return None, None
+    previous = db.query(ProposalAnalysis).filter(
+        ProposalAnalysis.proposal_id == similar_proposals[0].id,
+        ProposalAnalysis.is_current == True
+    ).first()
+    if not previous:
+        return None, None
+    return {
+        "summary": previous.summary,
+        "risk_score": previous.risk_score,
+        "category": previous.category,
+        "explanation": previous.explanation,
+        "prompt_version": previous.prompt_version,
+        "model": previous.model,
+        "truncated": previous.truncated
+    }, similar_proposals[0].id
+
+def _store_proposal(db: Session, proposal: ProposalCreate, ipfs_hash: str, ai_analysis: Dict[str, Any], proposal_text: str):
+    """Persist a proposal with its analysis, update the rollups and index its text; returns the stored proposal"""
+    db_proposal = DBProposal(
+        title=proposal.title,
+        description=proposal.description,
+        ipfs_hash=ipfs_hash,
+        author_address=proposal.author_address,
+        status="pending"
+    )
+    db.add(db_proposal)
+    db.flush()  # Get the ID without committing
+
+    db.add(ProposalAnalysis(
+        proposal_id=db_proposal.id,
+        summary=ai_analysis["summary"],
+        risk_score=ai_analysis["risk_score"],
+        category=ai_analysis["category"],
+        explanation=ai_analysis["explanation"],
+        prompt_version=ai_analysis["prompt_version"],
+        model=ai_analysis["model"],
+        truncated=ai_analysis["truncated"]
+    ))
+    record_current_analysis(db, ai_analysis["category"], ai_analysis["risk_score"])
+    db.commit()
+    db.refresh(db_proposal)
+
+    # Index the new proposal for future near-duplicate lookups
+    similarity_index.add(db_proposal.id, proposal_text)
+    return db_proposal
+
+def _proposal_response(db_proposal: DBProposal, ai_analysis: Dict[str, Any], similar_proposals: List[SimilarProposal],
+                       analysis_reused_from: Optional[int]):
+    return ProposalResponse(
+        id=db_proposal.id,
+        title=db_proposal.title,
+        ipfs_hash=db_proposal.ipfs_hash,
+        ipfs_url=get_ipfs_gateway_url(db_proposal.ipfs_hash),
+        summary=ai_analysis["summary"],
+        risk_score=ai_analysis["risk_score"],
+        category=ai_analysis["category"],
+        author_address=db_proposal.author_address,
+        created_at=db_proposal.created_at,
+        # These will be updated later by a background task
+        on_chain_id=None,
+        tx_hash=None,
+        similar_proposals=similar_proposals,
+        analysis_reused_from=analysis_reused_from,
+        analysis_truncated=ai_analysis["truncated"]
+    )
+
+async def _create_proposal(proposal: ProposalCreate, background_tasks: BackgroundTasks, db: Session):
     try:
-        # Store full proposal content on IPFS
-        proposal_data = {
-            "title": proposal.title,
-            "description": proposal.description,
-            "author": proposal.author_address,
-            "timestamp": datetime.now().isoformat()
-        }
-        ipfs_hash = await ipfs_service.add_json(proposal_data)
-        ipfs_url = get_ipfs_gateway_url(ipfs_hash)
-        
+        ipfs_hash = await _store_proposal_document(proposal)
+
+        # Look up near-duplicates, reusing the analysis of a near-identical one instead of calling the LLM again
+        proposal_text = indexed_text(proposal.title, proposal.description)
+        similar_proposals = _similar_proposals(db, proposal_text)
+        ai_analysis, analysis_reused_from = _reusable_analysis(db, similar_proposals)
+
         # Perform AI analysis
-        ai_analysis = await ai_service.analyze_proposal(proposal.title, proposal.description)
-        
-        # Create database entry
-        db_proposal = DBProposal(
-            title=proposal.title,
-            ipfs_hash=ipfs_hash,
-            author_address=proposal.author_address
-        )
-        db.add(db_proposal)
-        db.flush()  # Get the ID without committing
-        
-        # Add analysis
-        analysis = ProposalAnalysis(
-            proposal_id=db_proposal.id,
-            summary=ai_analysis["summary"],
-            risk_score=ai_analysis["risk_score"],
-            category=ai_analysis["category"],
-            explanation=ai_analysis["explanation"]
-        )
-        db.add(analysis)
-        db.commit()
-        db.refresh(db_proposal)
-        
+        if ai_analysis is None:
+            ai_analysis = await ai_service.analyze_proposal(proposal_text)
+
+        db_proposal = _store_proposal(db, proposal, ipfs_hash, ai_analysis, proposal_text)
+
         # Submit to blockchain in background to avoid blocking
         background_tasks.add_task(
             blockchain_service.submit_proposal,
@@ -155,37 +333,332 @@ async def create_proposal(
             ai_analysis["category"],
             proposal.author_address
         )
-        
-        # Return response
-        return ProposalResponse(
-            id=db_proposal.id,
-            title=db_proposal.title,
-            ipfs_hash=ipfs_hash,
-            ipfs_url=ipfs_url,
-            summary=ai_analysis["summary"],
-            risk_score=ai_analysis["risk_score"],
-            category=ai_analysis["category"],
-            author_address=db_proposal.author_address,
-            created_at=db_proposal.created_at,
-            # These will be updated later by a background task
-            on_chain_id=None,
-            tx_hash=None
-        )
+
+        return _proposal_response(db_proposal, ai_analysis, similar_proposals, analysis_reused_from)
     except Exception as e:
         db.rollback()
         logger.error(f"Error creating proposal: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create proposal: {str(e)}")
 
 
+def sse_event(event, data):
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/proposals/stream")
+async def create_proposal_stream(
+    proposal: ProposalCreate,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Create a proposal, streaming the AI summary over SSE as it is generated.
+
+    Events: ``summary`` (text deltas), ``summary_reset`` (replaces the text
+    streamed so far when the summary failed partway), ``analysis`` (risk,
+    category, explanation, truncated), ``done`` (the stored proposal, as
+    returned by POST /proposals) or ``error``. A retry with the same
+    Idempotency-Key gets the events of the first request replayed instead of
+    a second proposal.
+    """
+    proposal_text = indexed_text(proposal.title, proposal.description)
+    on_chain = {}
+    client = client_key(request)
+
+    async def create(emit):
+        """Create the proposal, calling emit(event, data) as results arrive; returns what a replay sends"""
+        # The request-scoped session may be closed before the stream finishes, so use our own
+        db = write_session(client)
+        assessment = None
+        try:
+            ipfs_hash = await _store_proposal_document(proposal)
+            similar_proposals = _similar_proposals(db, proposal_text)
+            ai_analysis, analysis_reused_from = _reusable_analysis(db, similar_proposals)
+
+            if ai_analysis is not None:
+                emit("summary", {"text": ai_analysis["summary"]})
+            elif estimate_tokens(proposal_text) > AI_CHUNK_THRESHOLD_TOKENS:
+                # Long proposals go through the chunked analysis; there is no single prompt to stream
+                ai_analysis = await ai_service.analyze_proposal(proposal_text)
+                emit("summary", {"text": ai_analysis["summary"]})
+            else:
+                # Score the proposal while the summary streams
+                assessment = asyncio.create_task(ai_service.assess_proposal(proposal_text))
+                parts = []
+                summary_failed = False
+                try:
+                    async for text in ai_service.stream_summary(proposal_text):
+                        parts.append(text)
+                        emit("summary", {"text": text})
+                    summary = "".join(parts).strip()
+                except Exception as e:
+                    logger.error(f"Error streaming proposal summary: {str(e)}")
+                    summary = "Failed to generate summary."
+                    summary_failed = True
+                    # The client replaces the partial text with what is stored
+                    emit("summary_reset", {"text": summary})
+                ai_analysis = {"summary": summary, **(await assessment)}
+                if summary_failed:
+                    # Like the fallback analysis, leave the version unset so reanalyze.py repairs the row
+                    ai_analysis.update(prompt_version=None, model=None)
+
+            analysis = {
+                "risk_score": ai_analysis["risk_score"],
+                "category": ai_analysis["category"],
+                "explanation": ai_analysis["explanation"],
+                "truncated": ai_analysis["truncated"]
+            }
+            emit("analysis", analysis)
+
+            # Persist once the stream has finished
+            db_proposal = _store_proposal(db, proposal, ipfs_hash, ai_analysis, proposal_text)
+            on_chain.update(
+                proposal_id=db_proposal.id,
+                ipfs_hash=ipfs_hash,
+                summary=ai_analysis["summary"],
+                risk_score=ai_analysis["risk_score"],
+                category=ai_analysis["category"]
+            )
+            done = jsonable_encoder(_proposal_response(db_proposal, ai_analysis, similar_proposals, analysis_reused_from))
+            emit("done", done)
+            return {"summary": ai_analysis["summary"], "analysis": analysis, "done": done}
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            if assessment and not assessment.done():
+                assessment.cancel()
+            db.close()
+
+    async def event_stream():
+        events = asyncio.Queue()
+        replay = Response()
+        creation = asyncio.create_task(run_idempotent(
+            "POST /proposals/stream", idempotency_key, proposal, replay,
+            lambda: create(lambda event, data: events.put_nowait(sse_event(event, data))),
+            status_code=200
+        ))
+        # None marks the end of the events
+        creation.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            try:
+                result = creation.result()
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+                return
+            except Exception as e:
+                logger.error(f"Error creating proposal: {str(e)}")
+                yield sse_event("error", {"detail": f"Failed to create proposal: {str(e)}"})
+                return
+            if replay.headers.get("Idempotent-Replayed"):
+                # The first request with this key created the proposal; send what it sent
+                yield sse_event("summary", {"text": result["summary"]})
+                yield sse_event("analysis", result["analysis"])
+                yield sse_event("done", result["done"])
+        finally:
+            # A client that disconnects abandons the proposal, as with any failed request
+            if not creation.done():
+                creation.cancel()
+
+    async def submit_on_chain():
+        # Runs after the stream completes; skipped if nothing was stored
+        if on_chain:
+            await blockchain_service.submit_proposal(
+                on_chain["proposal_id"],
+                on_chain["ipfs_hash"],
+                on_chain["summary"],
+                on_chain["risk_score"],
+                on_chain["category"],
+                proposal.author_address
+            )
+
+    background_tasks.add_task(submit_on_chain)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks
+    )
+
+
+@app.post("/proposal-revisions", status_code=201)
+async def create_proposal_revision(
+    revision: ProposalRevisionCreate,
+    response: Response,
+    db: Session = Depends(get_write_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        "POST /proposal-revisions", idempotency_key, revision, response,
+        lambda: _create_proposal_revision(revision, db)
+    )
+
+async def _create_proposal_revision(revision: ProposalRevisionCreate, db: Session):
+    proposal = db.query(DBProposal).filter(DBProposal.id == revision.proposal_id).first()
+    if not proposal:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    if proposal.author_address.lower() != revision.author_address.lower():
+        raise HTTPException(status_code=403, detail="Only the proposal's author can revise it")
+    # Votes already cast were cast on the current text
+    if proposal.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Cannot revise a {proposal.status} proposal")
+    if db.query(Vote.id).filter(Vote.proposal_id == proposal.id).first() is not None:
+        raise HTTPException(status_code=409, detail="Cannot revise a proposal that has votes")
+    
+    current_revision = db.query(func.max(ProposalRevision.revision)).filter(
+        ProposalRevision.proposal_id == proposal.id
+    ).scalar() or 1
+    if revision.base_revision is not None and revision.base_revision != current_revision:
+        raise HTTPException(status_code=409, detail=f"Proposal is at revision {current_revision}")
+    
+    title = revision.title or proposal.title
+    if title == proposal.title and revision.description == proposal.description:
+        raise HTTPException(status_code=400, detail="Revision does not change the proposal")
+    
+    current = db.query(ProposalAnalysis).filter(
+        ProposalAnalysis.proposal_id == proposal.id,
+        ProposalAnalysis.is_current == True
+    ).first()
+    if not current:
+        raise HTTPException(status_code=404, detail="Proposal analysis not found")
+    previous = db.query(ProposalRevision).filter(
+        ProposalRevision.proposal_id == proposal.id,
+        ProposalRevision.revision == current_revision
+    ).first()
+    
+    # Only sections without a summary in the previous revision go to the model
+    cached_summaries = {s["key"]: s["summary"] for s in json.loads(previous.sections)} if previous and previous.sections else {}
+    revised_text = indexed_text(title, revision.description)
+    ai_analysis = await ai_service.analyze_revision(revised_text, cached_summaries)
+    sections = ai_analysis.pop("sections")
+    summarized = ai_analysis.pop("summarized")
+    
+    # Revision documents link back to the one they replace
+    number = current_revision + 1
+    ipfs_hash = await ipfs_service.add_proposal({
+        "title": title,
+        "description": revision.description,
+        "author": revision.author_address,
+        "timestamp": datetime.now().isoformat(),
+        "proposal_id": proposal.id,
+        "revision": number,
+        "previous": proposal.ipfs_hash
+    })
+    if not ipfs_hash:
+        raise HTTPException(status_code=500, detail="Failed to store revision on IPFS")
+    
+    try:
+        if previous is None:
+            # First edit: record the original text as revision 1
+            db.add(ProposalRevision(
+                proposal_id=proposal.id,
+                revision=1,
+                title=proposal.title,
+                ipfs_hash=proposal.ipfs_hash,
+                author=proposal.author_address,
+                analysis_id=current.id,
+                created_at=proposal.created_at
+            ))
+        
+        db.query(ProposalAnalysis).filter(
+            ProposalAnalysis.id == current.id,
+            ProposalAnalysis.is_current == True
+        ).update({ProposalAnalysis.is_current: False}, synchronize_session=False)
+        analysis = ProposalAnalysis(proposal_id=proposal.id, is_current=True, **ai_analysis)
+        db.add(analysis)
+        db.flush()
+        db.add(ProposalRevision(
+            proposal_id=proposal.id,
+            revision=number,
+            title=title,
+            ipfs_hash=ipfs_hash,
+            author=revision.author_address,
+            analysis_id=analysis.id,
+            sections=json.dumps(sections),
+            summarized_sections=summarized,
+            reused_sections=len(sections) - summarized
+        ))
+        
+        proposal.title = title
+        proposal.description = revision.description
+        proposal.ipfs_hash = ipfs_hash
+        record_current_analysis(db, ai_analysis["category"], ai_analysis["risk_score"],
+                                previous=(current.category, current.risk_score))
+        db.commit()
+    except IntegrityError:
+        # Another edit of the same revision committed first
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Proposal is no longer at revision {current_revision}")
+    
+    # Near-duplicate lookups compare against the revised text from now on
+    similarity_index.add(proposal.id, revised_text)
+    
+    return {
+        "proposal_id": proposal.id,
+        "revision": number,
+        "ipfs_hash": ipfs_hash,
+        "ipfs_url": get_ipfs_gateway_url(ipfs_hash),
+        "summary": ai_analysis["summary"],
+        "risk_score": ai_analysis["risk_score"],
+        "category": ai_analysis["category"],
+        "explanation": ai_analysis["explanation"],
+        "previous_risk_score": current.risk_score,
+        "previous_category": current.category,
+        "sections": len(sections),
+        "summarized_sections": summarized,
+        "reused_sections": len(sections) - summarized
+    }
+
+@app.get("/proposal-revisions/{proposal_id}")
+async def list_proposal_revisions(proposal_id: int, db: Session = Depends(get_read_db)):
+    """Every revision of a proposal, oldest first, with the analysis of each"""
+    proposal = db.query(DBProposal).filter(DBProposal.id == proposal_id).first()
+    if not proposal:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    
+    rows = db.query(ProposalRevision, ProposalAnalysis).outerjoin(
+        ProposalAnalysis, ProposalAnalysis.id == ProposalRevision.analysis_id
+    ).filter(ProposalRevision.proposal_id == proposal_id).order_by(ProposalRevision.revision).all()
+    if not rows:
+        # Never edited: the proposal itself is the only revision
+        analysis = db.query(ProposalAnalysis).filter(
+            ProposalAnalysis.proposal_id == proposal_id,
+            ProposalAnalysis.is_current == True
+        ).first()
+        rows = [(ProposalRevision(revision=1, title=proposal.title, ipfs_hash=proposal.ipfs_hash,
+                                  author=proposal.author_address, created_at=proposal.created_at), analysis)]
+    
+    return {
+        "proposal_id": proposal_id,
+        "revisions": [{
+            "revision": rev.revision,
+            "title": rev.title,
+            "ipfs_hash": rev.ipfs_hash,
+            "ipfs_url": get_ipfs_gateway_url(rev.ipfs_hash),
+            "author_address": rev.author,
+            "created_at": rev.created_at,
+            "summary": analysis.summary if analysis else None,
+            "risk_score": analysis.risk_score if analysis else None,
+            "category": analysis.category if analysis else None,
+            "summarized_sections": rev.summarized_sections,
+            "reused_sections": rev.reused_sections
+        } for rev, analysis in rows]
+    }
+
 @app.get("/proposals/{proposal_id}", response_model=ProposalResponse)
-async def get_proposal(proposal_id: int, db: Session = Depends(get_db)):
+async def get_proposal(proposal_id: int, db: Session = Depends(get_read_db)):
     # Get proposal from database
     proposal = db.query(DBProposal).filter(DBProposal.id == proposal_id).first()
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
     # Get analysis
-    analysis = db.query(ProposalAnalysis).filter(ProposalAnalysis.proposal_id == proposal_id).first()
+    analysis = db.query(ProposalAnalysis).filter(
+        ProposalAnalysis.proposal_id == proposal_id,
+        ProposalAnalysis.is_current == True
+    ).first()
     if not analysis:
         raise HTTPException(status_code=404, detail="Proposal analysis not found")
     
@@ -212,54 +685,75 @@ async def get_proposal(proposal_id: int, db: Session = Depends(get_db)):
         author_address=proposal.author_address,
         created_at=proposal.created_at,
         on_chain_id=on_chain_id,
-        tx_hash=tx_hash
+        tx_hash=tx_hash,
+        analysis_truncated=analysis.truncated
     )
 
 @app.get("/proposals", response_model=List[ProposalResponse])
-async def list_proposals(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    # Get proposals from database
-    proposals = db.query(DBProposal).offset(skip).limit(limit).all()
+async def list_proposals(skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
+    # Project the response columns straight from SQL; proposals without an analysis are skipped
+    rows = db.query(
+        DBProposal.id,
+        DBProposal.title,
+        DBProposal.ipfs_hash,
+        ProposalAnalysis.summary,
+        ProposalAnalysis.risk_score,
+        ProposalAnalysis.category,
+        ProposalAnalysis.truncated,
+        DBProposal.proposer,
+        DBProposal.created_at
+    ).join(
+        ProposalAnalysis, (ProposalAnalysis.proposal_id == DBProposal.id) & (ProposalAnalysis.is_current == True)
+    ).order_by(DBProposal.id).offset(skip).limit(limit).all()
     
     # Build response
     result = []
-    for proposal in proposals:
-        analysis = db.query(ProposalAnalysis).filter(ProposalAnalysis.proposal_id == proposal.id).first()
-        if not analysis:
-            continue
-        
+    for id, title, ipfs_hash, summary, risk_score, category, truncated, author_address, created_at in rows:
         # Get blockchain data if available
         on_chain_id = None
         tx_hash = None
         try:
-            blockchain_data = await blockchain_service.get_proposal_data(proposal.id)
+            blockchain_data = await blockchain_service.get_proposal_data(id)
             if blockchain_data:
                 on_chain_id = blockchain_data.get("on_chain_id")
                 tx_hash = blockchain_data.get("tx_hash")
         except Exception as e:
-            logger.warning(f"Could not fetch blockchain data for proposal {proposal.id}: {str(e)}")
+            logger.warning(f"Could not fetch blockchain data for proposal {id}: {str(e)}")
         
-        result.append(ProposalResponse(
-            id=proposal.id,
-            title=proposal.title,
-            ipfs_hash=proposal.ipfs_hash,
-            ipfs_url=get_ipfs_gateway_url(proposal.ipfs_hash),
-            summary=analysis.summary,
-            risk_score=analysis.risk_score,
-            category=analysis.category,
-            author_address=proposal.author_address,
-            created_at=proposal.created_at,
-            on_chain_id=on_chain_id,
-            tx_hash=tx_hash
-        ))
+        # Plain dicts encoded by orjson; the rows already match ProposalResponse
+        result.append({
+            "id": id,
+            "title": title,
+            "ipfs_hash": ipfs_hash,
+            "ipfs_url": get_ipfs_gateway_url(ipfs_hash),
+            "summary": summary,
+            "risk_score": risk_score,
+            "category": category,
+            "author_address": author_address,
+            "created_at": created_at,
+            "on_chain_id": on_chain_id,
+            "tx_hash": tx_hash,
+            "similar_proposals": [],
+            "analysis_reused_from": None,
+            "analysis_truncated": truncated
+        })
     
-    return result
+    return FastJSONResponse(result)
 
 @app.post("/votes", status_code=201)
 async def create_vote(
     vote: VoteCreate, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_write_db),
+    idempotency_key: Optional[str] = Header(None)
 ):
+    return await run_idempotent(
+        "POST /votes", idempotency_key, vote, response,
+        lambda: _create_vote(vote, background_tasks, db)
+    )
+
+async def _create_vote(vote: VoteCreate, background_tasks: BackgroundTasks, db: Session):
     # Check if proposal exists
     proposal = db.query(DBProposal).filter(DBProposal.id == vote.proposal_id).first()
     if not proposal:
@@ -273,41 +767,12 @@ async def create_vote(
     
     if existing_vote:
         raise HTTPException(status_code=400, detail="User has already voted on this proposal")
+    if vote.vote is None and not vote.delegate_vote:
+        raise HTTPException(status_code=422, detail="vote is required unless delegate_vote is set")
     
-    # If it's a delegate vote, check if user has delegated
+    # If it's a delegate vote, use the AI delegate's recommendation
     if vote.delegate_vote:
-        # Check if user has delegate preferences
-        delegate_prefs = db.query(DelegatePreferences).filter(
-            DelegatePreferences.user_address == vote.voter_address
-        ).first()
-        
-        if not delegate_prefs:
-            raise HTTPException(status_code=400, detail="User has not set up delegate preferences")
-        
-        # Get AI recommendation
-        analysis = db.query(ProposalAnalysis).filter(ProposalAnalysis.proposal_id == vote.proposal_id).first()
-        if not analysis:
-            raise HTTPException(status_code=404, detail="Proposal analysis not found")
-        
-        # Get full proposal from IPFS
-        try:
-            proposal_data = await ipfs_service.get_json(proposal.ipfs_hash)
-            description = proposal_data.get("description", "")
-        except Exception as e:
-            logger.error(f"Error fetching proposal from IPFS: {str(e)}")
-            description = ""
-        
-        # Get AI recommendation
-        recommendation = await ai_service.get_delegate_recommendation(
-            proposal.title,
-            description,
-            analysis.summary,
-            analysis.risk_score,
-            analysis.category,
-            delegate_prefs.risk_tolerance,
-            delegate_prefs.category_preferences,
-            delegate_prefs.voting_strategy
-        )
+        recommendation, analysis = await _delegate_recommendation(db, proposal, vote.voter_address)
         
         # Use AI recommendation
         vote_value = recommendation["vote"]
@@ -317,42 +782,127 @@ async def create_vote(
         vote_value = vote.vote
         vote_explanation = "User manual vote"
     
-    # Create vote in database
-    db_vote = Vote(
-        proposal_id=vote.proposal_id,
-        voter_address=vote.voter_address,
-        vote=vote_value,
-        delegate_vote=vote.delegate_vote,
-        explanation=vote_explanation
-    )
-    db.add(db_vote)
-    db.commit()
+    if vote.delegate_vote:
+        category, risk_score = analysis.category, analysis.risk_score
+    
+    def write_vote(session: Session):
+        # Create vote in database, as the next leaf of the proposal's vote Merkle tree
+        merkle_index = append_vote(session, vote.proposal_id, vote.voter_address, vote_value, vote.delegate_vote)
+        session.add(Vote(
+            proposal_id=vote.proposal_id,
+            voter_address=vote.voter_address,
+            vote=vote_value,
+            delegate_vote=vote.delegate_vote,
+            explanation=vote_explanation,
+            merkle_index=merkle_index
+        ))
+        record_vote(session, vote.delegate_vote)
+        
+        # If it's a delegate vote, record in history; accuracy is only known when the user stated their own vote
+        if vote.delegate_vote:
+            match = None if vote.vote is None else vote.vote == vote_value
+            session.add(DelegateVotingHistory(
+                address=vote.voter_address,
+                proposal_id=vote.proposal_id,
+                user_vote=vote.vote,
+                ai_recommendation=vote_value,
+                match=match
+            ))
+            if match is not None:
+                record_delegate_outcome(session, vote.voter_address, category, risk_score, match)
     
-    # Submit to blockchain in background
+    if group_writer.running:
+        # Return this session's connection to the pool rather than hold it while waiting
+        db.rollback()
+        # Committed together with concurrent votes; returns once the batch is durable
+        await group_writer.submit(write_vote, client=db.info.get("client"))
+    else:
+        write_vote(db)
+        db.commit()
+    
+    # Submit to blockchain in background, batched with other votes on the proposal when enabled
     background_tasks.add_task(
-        blockchain_service.submit_vote,
+        vote_batcher.submit,
         vote.proposal_id,
         vote.voter_address,
         vote_value
     )
     
-    # If it's a delegate vote, record in history
-    if vote.delegate_vote:
-        history = DelegateVotingHistory(
-            user_address=vote.voter_address,
-            proposal_id=vote.proposal_id,
-            vote=vote_value,
-            explanation=vote_explanation
-        )
-        db.add(history)
-        db.commit()
-    
     return {"success": True, "vote": vote_value, "explanation": vote_explanation}
 
+@app.get("/proposals/{proposal_id}/votes/{voter_address}/proof")
+async def get_vote_proof(proposal_id: int, voter_address: str, db: Session = Depends(get_read_db)):
+    """Merkle inclusion proof of a vote against the proposal's current and last published vote root"""
+    try:
+        proof = get_inclusion_proof(db, proposal_id, voter_address)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Vote not found")
+    return proof
+
+async def _delegate_recommendation(db: Session, proposal: DBProposal, user_address: str, include_reasoning: bool = True):
+    """AI delegate recommendation for a user and the current analysis it was based on"""
+    # Check if user has delegate preferences
+    delegate_prefs = db.query(DelegatePreferences).filter(
+        DelegatePreferences.user_address == user_address
+    ).first()
+    
+    if not delegate_prefs:
+        raise HTTPException(status_code=400, detail="User has not set up delegate preferences")
+    
+    analysis = db.query(ProposalAnalysis).filter(
+        ProposalAnalysis.proposal_id == proposal.id,
+        ProposalAnalysis.is_current == True
+    ).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Proposal analysis not found")
+    
+    # Get full proposal from IPFS
+    try:
+        proposal_data = await ipfs_service.get_proposal(proposal.ipfs_hash) or {}
+        description = proposal_data.get("description", "")
+    except Exception as e:
+        logger.error(f"Error fetching proposal from IPFS: {str(e)}")
+        description = ""
+    
+    recommendation = await ai_service.get_delegate_recommendation(
+        proposal.title,
+        description,
+        analysis.summary,
+        analysis.risk_score,
+        analysis.category,
+        delegate_prefs.risk_tolerance,
+        delegate_prefs.category_preferences,
+        delegate_prefs.voting_strategy,
+        include_reasoning=include_reasoning
+    )
+    if recommendation["vote"] is None:
+        # A failed model call must not turn into a vote
+        raise HTTPException(status_code=503, detail="AI delegate is unavailable, please vote manually")
+    return recommendation, analysis
+
+@app.post("/delegate-recommendation")
+async def get_delegate_recommendation(request: DelegateRecommendationRequest, db: Session = Depends(get_read_db)):
+    """How the AI delegate would vote for a user, without casting the vote"""
+    proposal = db.query(DBProposal).filter(DBProposal.id == request.proposal_id).first()
+    if not proposal:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    
+    # Without reasoning the model stops after the vote and confidence
+    recommendation, _ = await _delegate_recommendation(db, proposal, request.voter_address, request.include_reasoning)
+    return {
+        "proposal_id": proposal.id,
+        "voter_address": request.voter_address,
+        "vote": recommendation["vote"],
+        "confidence": recommendation["confidence"],
+        "explanation": recommendation["explanation"]
+    }
+
 @app.post("/delegate-preferences", status_code=201)
 async def set_delegate_preferences(
     preferences: DelegatePreferencesCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_write_db)
 ):
     # Check if user already has preferences
     existing_prefs = db.query(DelegatePreferences).filter(
@@ -378,7 +928,7 @@ async def set_delegate_preferences(
     return {"success": True}
 
 @app.get("/delegate-preferences/{user_address}")
-async def get_delegate_preferences(user_address: str, db: Session = Depends(get_db)):
+async def get_delegate_preferences(user_address: str, db: Session = Depends(get_read_db)):
     prefs = db.query(DelegatePreferences).filter(
         DelegatePreferences.user_address == user_address
     ).first()
@@ -394,44 +944,93 @@ async def get_delegate_preferences(user_address: str, db: Session = Depends(get_
     }
 
 @app.get("/delegate-history/{user_address}")
-async def get_delegate_history(user_address: str, db: Session = Depends(get_db)):
-    history = db.query(DelegateVotingHistory).filter(
-        DelegateVotingHistory.user_address == user_address
-    ).all()
+async def get_delegate_history(
+    user_address: str,
+    limit: int = 20,
+    before_id: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    # Newest first, paginated by id so each page is an index range scan
+    limit = max(1, min(limit, 100))
+    query = db.query(
+        DelegateVotingHistory,
+        DBProposal.title,
+        ProposalAnalysis.category,
+        ProposalAnalysis.risk_score
+    ).join(
+        DBProposal, DBProposal.id == DelegateVotingHistory.proposal_id
+    ).outerjoin(
+        ProposalAnalysis, (ProposalAnalysis.proposal_id == DelegateVotingHistory.proposal_id) & (ProposalAnalysis.is_current == True)
+    ).filter(DelegateVotingHistory.address == user_address)
     
-    result = []
-    for entry in history:
-        proposal = db.query(DBProposal).filter(DBProposal.id == entry.proposal_id).first()
-        if not proposal:
-            continue
-            
-        result.append({
-            "proposal_id": entry.proposal_id,
-            "proposal_title": proposal.title,
-            "vote": entry.vote,
-            "explanation": entry.explanation,
-            "timestamp": entry.created_at
-        })
+    if before_id is not None:
+        query = query.filter(DelegateVotingHistory.id < before_id)
+    
+    rows = query.order_by(DelegateVotingHistory.id.desc()).limit(limit).all()
+    
+    history = [{
+        "id": entry.id,
+        "proposal_id": entry.proposal_id,
+        "proposal_title": title,
+        "category": category,
+        "risk_score": risk_score,
+        "user_vote": entry.user_vote,
+        "ai_recommendation": entry.ai_recommendation,
+        "match": entry.match,
+        "timestamp": entry.created_at
+    } for entry, title, category, risk_score in rows]
     
-    return result
+    return {
+        "history": history,
+        "next_before_id": history[-1]["id"] if len(history) == limit else None
+    }
+
+@app.get("/delegate-accuracy/{user_address}")
+async def get_delegate_accuracy_rollup(user_address: str, db: Session = Depends(get_read_db)):
+    # Served from rollups maintained on each delegate vote
+    return get_delegate_accuracy(db, user_address)
+
+@app.get("/stats")
+async def get_stats(days: int = 30, db: Session = Depends(get_read_db)):
+    # Dashboard aggregates served from rollups maintained on each write
+    return get_governance_stats(db, max(1, min(days, 365)))
+
+@app.get("/delegation/{user_address}")
+async def get_delegation(user_address: str):
+    # Direct and effective delegate and voting power, from the in-memory delegation graph
+    return delegation_graph.describe(user_address)
+
+@app.get("/delegation-power")
+async def get_delegation_power(limit: int = 20):
+    limit = max(1, min(limit, 100))
+    return {
+        "delegates": delegation_graph.top_delegates(limit),
+        "cycles": delegation_graph.cycles()[:100],
+        **delegation_graph.stats()
+    }
 
 @app.get("/proposal-full/{proposal_id}")
-async def get_full_proposal(proposal_id: int, db: Session = Depends(get_db)):
+async def get_full_proposal(proposal_id: int, db: Session = Depends(get_read_db)):
     # Get proposal from database
     proposal = db.query(DBProposal).filter(DBProposal.id == proposal_id).first()
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
     # Get analysis
-    analysis = db.query(ProposalAnalysis).filter(ProposalAnalysis.proposal_id == proposal_id).first()
+    analysis = db.query(ProposalAnalysis).filter(
+        ProposalAnalysis.proposal_id == proposal_id,
+        ProposalAnalysis.is_current == True
+    ).first()
     if not analysis:
         raise HTTPException(status_code=404, detail="Proposal analysis not found")
     
     # Get full proposal from IPFS
     try:
-        proposal_data = await ipfs_service.get_json(proposal.ipfs_hash)
+        proposal_data = await ipfs_service.get_proposal(proposal.ipfs_hash)
     except Exception as e:
         logger.error(f"Error fetching proposal from IPFS: {str(e)}")
+        proposal_data = None
+    if proposal_data is None:
         raise HTTPException(status_code=500, detail="Could not fetch proposal data from IPFS")
     
     # Get blockchain data if available
@@ -441,18 +1040,25 @@ async def get_full_proposal(proposal_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         logger.warning(f"Could not fetch blockchain data for proposal {proposal_id}: {str(e)}")
     
-    # Get votes
-    votes = db.query(Vote).filter(Vote.proposal_id == proposal_id).all()
+    # Get votes as plain rows; vote lists can be long
+    votes = db.query(
+        Vote.voter,
+        Vote.vote_type,
+        Vote.is_delegate_vote,
+        Vote.explanation,
+        Vote.created_at
+    ).filter(Vote.proposal_id == proposal_id).all()
     vote_data = [{
-        "voter_address": v.voter_address,
-        "vote": v.vote,
-        "delegate_vote": v.delegate_vote,
-        "explanation": v.explanation,
-        "timestamp": v.created_at
-    } for v in votes]
+        "voter_address": voter_address,
+        "vote": vote,
+        "delegate_vote": delegate_vote,
+        "explanation": explanation,
+        "timestamp": timestamp
+    } for voter_address, vote, delegate_vote, explanation, timestamp in votes]
+    yes_votes = sum(1 for v in vote_data if v["vote"])
     
     # Combine all data
-    return {
+    return FastJSONResponse({
         "id": proposal.id,
         "title": proposal.title,
         "author_address": proposal.author_address,
@@ -468,18 +1074,65 @@ async def get_full_proposal(proposal_id: int, db: Session = Depends(get_db)):
         },
         "blockchain": blockchain_data,
         "votes": {
-            "total": len(votes),
-            "yes": sum(1 for v in votes if v.vote),
-            "no": sum(1 for v in votes if not v.vote),
+            "total": len(vote_data),
+            "yes": yes_votes,
+            "no": len(vote_data) - yes_votes,
             "details": vote_data
         }
-    }
+    })
+
+@app.get("/export/{table}")
+async def export_table(table: str, request: Request, format: Optional[str] = None, since: Optional[str] = None):
+    """Stream one table for analytics as Parquet, Arrow IPC or gzip CSV.
+
+    Covers rows changed after ``since``; the X-Export-Watermark response
+    header is the ``since`` of the next incremental export.
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table; exportable tables: {', '.join(EXPORT_TABLES)}")
+    format = format or available_formats()[0]
+    if format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"Unsupported format; available: {', '.join(available_formats())}")
+    try:
+        since, until = export_window(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO 8601 timestamp")
+    media_type, extension = EXPORT_FORMATS[format]
+
+    def body():
+        # Opened here rather than as a dependency so it lives as long as the stream
+        db = read_session(client_key(request))
+        try:
+            yield from stream_export(db, table, format, since, until)
+        finally:
+            db.close()
+
+    return StreamingResponse(body(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{table}.{extension}"',
+        "X-Export-Watermark": until.isoformat()
+    })
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "version": app.version}
 
+@app.get("/metrics/backends")
+async def get_backend_metrics():
+    # Call counts, latency percentiles and breaker states for IPFS, RPC and LLM calls in this worker
+    return backend_metrics()
+
+@app.get("/metrics/ipfs")
+async def get_ipfs_metrics():
+    # Spooled content waiting to be pinned, and content the node stored under a CID other than ours
+    mismatches = await asyncio.to_thread(ipfs_service.pin_mismatches)
+    return {"pending_pins": await asyncio.to_thread(ipfs_service.pending_pins), "cid_mismatches": mismatches}
+
+@app.get("/metrics/models")
+async def get_model_metrics():
+    # Calls, escalations, latency percentiles, tokens and estimated cost per model tier in this worker
+    return tier_metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
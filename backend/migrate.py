@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+AI-Gov Schema Migrations
+
+Applies the versioned migrations in migrations/ that have not yet been
+recorded in the schema_migrations table, each in its own transaction.
+
+Usage:
+    python migrate.py           # apply pending migrations
+    python migrate.py status    # list applied and pending migrations
+"""
+
+import os
+import re
+import sys
+import importlib
+from sqlalchemy import text
+
+from database import engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+_MIGRATION_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+def discover():
+    """All migrations as (version, name) pairs, in order"""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _MIGRATION_RE.match(filename)
+        if match:
+            found.append((match.group(1), match.group(2)))
+    return sorted(found)
+
+
+def applied_versions(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(4) PRIMARY KEY, name VARCHAR(100) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(bind=engine):
+    """Apply pending migrations and return the versions applied"""
+    with bind.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name in discover():
+        if version in done:
+            continue
+        module = importlib.import_module(f"migrations.{version}_{name}")
+        with bind.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name}
+            )
+        print(f"Applied migration {version}_{name}")
+        applied.append(version)
+    return applied
+
+
+def status(bind=engine):
+    with bind.begin() as conn:
+        done = applied_versions(conn)
+    for version, name in discover():
+        print(f"{'applied' if version in done else 'pending'}  {version}_{name}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "upgrade":
+        if not upgrade():
+            print("Database is up to date")
+    elif command == "status":
+        status()
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
@@ -0,0 +1,89 @@
+"""Tables from the original schema.sql"""
+
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, CheckConstraint, func
+)
+from migrations import create_table
+
+
+def tables(conn):
+    metadata = MetaData()
+    return [
+        Table(
+            "users", metadata,
+            Column("address", String(42), primary_key=True, index=True),
+            Column("username", String(100)),
+            Column("email", String(255)),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+        ),
+        Table(
+            "delegate_preferences", metadata,
+            Column("address", String(42), ForeignKey("users.address"), primary_key=True),
+            Column("is_active", Boolean),
+            Column("risk_tolerance", Integer),
+            Column("prioritize_financial", Integer),
+            Column("prioritize_community", Integer),
+            Column("prioritize_protocol", Integer),
+            Column("voting_strategy", String(50)),
+            Column("custom_rules", Text),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+            CheckConstraint("risk_tolerance BETWEEN 1 AND 10", name="check_risk_tolerance_range"),
+            CheckConstraint("prioritize_financial BETWEEN 1 AND 5", name="check_financial_range"),
+            CheckConstraint("prioritize_community BETWEEN 1 AND 5", name="check_community_range"),
+            CheckConstraint("prioritize_protocol BETWEEN 1 AND 5", name="check_protocol_range"),
+            CheckConstraint("voting_strategy IN ('conservative', 'balanced', 'progressive')", name="check_voting_strategy"),
+        ),
+        Table(
+            "proposals", metadata,
+            Column("id", Integer, primary_key=True, index=True),
+            # 0004 lets this be NULL; SQLite cannot relax it in place, so it starts out nullable there
+            Column("proposal_id", Integer, nullable=conn.dialect.name == "sqlite"),
+            Column("title", String(255), nullable=False),
+            Column("description", Text, nullable=False),
+            Column("ipfs_hash", String(100), nullable=False),
+            Column("proposer", String(42), nullable=False, index=True),
+            Column("status", String(50)),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+            CheckConstraint("status IN ('pending', 'active', 'executed', 'rejected')", name="check_proposal_status"),
+        ),
+        Table(
+            "proposal_analysis", metadata,
+            Column("id", Integer, primary_key=True, index=True),
+            Column("proposal_id", Integer, ForeignKey("proposals.id")),
+            Column("summary", Text, nullable=False),
+            Column("category", String(100), nullable=False),
+            Column("risk_score", Integer),
+            Column("ai_explanation", Text),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+            CheckConstraint("risk_score BETWEEN 1 AND 10", name="check_risk_score_range"),
+        ),
+        Table(
+            "votes", metadata,
+            Column("id", Integer, primary_key=True, index=True),
+            Column("proposal_id", Integer, ForeignKey("proposals.id"), index=True),
+            Column("voter", String(42), ForeignKey("users.address"), index=True),
+            Column("vote_type", Boolean, nullable=False),
+            Column("is_delegate_vote", Boolean),
+            Column("transaction_hash", String(66)),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        ),
+        Table(
+            "delegate_voting_history", metadata,
+            Column("id", Integer, primary_key=True, index=True),
+            Column("address", String(42), ForeignKey("users.address"), index=True),
+            Column("proposal_id", Integer, ForeignKey("proposals.id")),
+            Column("user_vote", Boolean),
+            Column("ai_recommendation", Boolean),
+            Column("match", Boolean),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        ),
+    ]
+
+
+def upgrade(conn):
+    for table in tables(conn):
+        create_table(conn, table)
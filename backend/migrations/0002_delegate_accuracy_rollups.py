@@ -0,0 +1,17 @@
+"""Per-user delegate accuracy rollups and keyset index for delegate history"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, ForeignKey, func
+from migrations import create_table, create_index
+
+
+def upgrade(conn):
+    create_table(conn, Table(
+        "delegate_accuracy_rollups", MetaData(),
+        Column("address", String(42), ForeignKey("users.address"), primary_key=True),
+        Column("dimension", String(20), primary_key=True),
+        Column("bucket", String(100), primary_key=True),
+        Column("total", Integer, nullable=False),
+        Column("matches", Integer, nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    ))
+    create_index(conn, "idx_delegate_history_address_id", "delegate_voting_history", ["address", "id"])
@@ -0,0 +1,10 @@
+"""Prompt version, model and current-version flag on proposal analyses"""
+
+from migrations import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, "proposal_analysis", "prompt_version", "VARCHAR(20)")
+    add_column(conn, "proposal_analysis", "model", "VARCHAR(100)")
+    add_column(conn, "proposal_analysis", "is_current", "BOOLEAN NOT NULL DEFAULT TRUE")
+    create_index(conn, "idx_proposal_analysis_proposal_current", "proposal_analysis", ["proposal_id", "is_current"])
@@ -0,0 +1,10 @@
+"""Columns the API writes: vote explanations, and on-chain ids assigned after insert"""
+
+from migrations import add_column
+
+
+def upgrade(conn):
+    add_column(conn, "votes", "explanation", "TEXT")
+    # SQLite cannot relax constraints in place; 0001 creates the column nullable there
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("ALTER TABLE proposals ALTER COLUMN proposal_id DROP NOT NULL")
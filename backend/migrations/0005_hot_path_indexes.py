@@ -0,0 +1,8 @@
+"""Indexes for the duplicate-vote check and per-proposal vote reads"""
+
+from migrations import create_index
+
+
+def upgrade(conn):
+    # Fails if duplicate votes already exist; remove them before migrating
+    create_index(conn, "uq_votes_proposal_voter", "votes", ["proposal_id", "voter"], unique=True)
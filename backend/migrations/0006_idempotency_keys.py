@@ -0,0 +1,17 @@
+"""Stored results of requests sent with an Idempotency-Key"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, Float
+from migrations import create_table
+
+
+def upgrade(conn):
+    create_table(conn, Table(
+        "idempotency_keys", MetaData(),
+        Column("route", String(50), primary_key=True),
+        Column("key", String(255), primary_key=True),
+        Column("request_hash", String(64), nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("status_code", Integer),
+        Column("response", Text),
+        Column("expires_at", Float, nullable=False, index=True),
+    ))
@@ -0,0 +1,10 @@
+"""Indexes on the change columns read by incremental analytics exports"""
+
+from migrations import create_index
+
+
+def upgrade(conn):
+    create_index(conn, "idx_proposals_updated_id", "proposals", ["updated_at", "id"])
+    create_index(conn, "idx_proposal_analysis_updated_id", "proposal_analysis", ["updated_at", "id"])
+    create_index(conn, "idx_votes_created_id", "votes", ["created_at", "id"])
+    create_index(conn, "idx_delegate_history_created_id", "delegate_voting_history", ["created_at", "id"])
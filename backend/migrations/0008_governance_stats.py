@@ -0,0 +1,20 @@
+"""Dashboard statistics rollups"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String
+from migrations import create_table
+
+
+def upgrade(conn):
+    metadata = MetaData()
+    create_table(conn, Table(
+        "governance_stats", metadata,
+        Column("dimension", String(30), primary_key=True),
+        Column("bucket", String(100), primary_key=True),
+        Column("count", Integer, nullable=False),
+    ))
+    create_table(conn, Table(
+        "vote_participation_daily", metadata,
+        Column("day", String(10), primary_key=True),
+        Column("votes", Integer, nullable=False),
+        Column("delegate_votes", Integer, nullable=False),
+    ))
@@ -0,0 +1,27 @@
+"""Per-proposal vote Merkle trees; run `python vote_merkle.py rebuild` to add existing votes"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, ForeignKey, func
+from migrations import create_table, add_column
+
+
+def upgrade(conn):
+    add_column(conn, "votes", "merkle_index", "INTEGER")
+    metadata = MetaData()
+    create_table(conn, Table(
+        "vote_merkle_trees", metadata,
+        Column("proposal_id", Integer, ForeignKey("proposals.id"), primary_key=True),
+        Column("size", Integer, nullable=False),
+        Column("root", String(64)),
+        Column("published_size", Integer, nullable=False),
+        Column("published_root", String(64)),
+        Column("published_cid", String(100)),
+        Column("published_tx", String(66)),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    ))
+    create_table(conn, Table(
+        "vote_merkle_nodes", metadata,
+        Column("proposal_id", Integer, ForeignKey("proposals.id"), primary_key=True),
+        Column("level", Integer, primary_key=True),
+        Column("position", Integer, primary_key=True),
+        Column("hash", String(64), nullable=False),
+    ))
@@ -0,0 +1,22 @@
+"""Proposal revisions: edited proposal versions and the section summaries their analyses reuse"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, DateTime, ForeignKey, Index, func
+from migrations import create_table
+
+
+def upgrade(conn):
+    create_table(conn, Table(
+        "proposal_revisions", MetaData(),
+        Column("id", Integer, primary_key=True, index=True),
+        Column("proposal_id", Integer, ForeignKey("proposals.id"), nullable=False),
+        Column("revision", Integer, nullable=False),
+        Column("title", String(255), nullable=False),
+        Column("ipfs_hash", String(100), nullable=False),
+        Column("author", String(42), nullable=False),
+        Column("analysis_id", Integer, ForeignKey("proposal_analysis.id")),
+        Column("sections", Text),
+        Column("summarized_sections", Integer),
+        Column("reused_sections", Integer),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Index("uq_proposal_revisions_proposal_revision", "proposal_id", "revision", unique=True),
+    ))
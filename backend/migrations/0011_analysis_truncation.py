@@ -0,0 +1,7 @@
+"""Truncation flag on proposal analyses: the chunked analysis left part of the text out to stay in budget"""
+
+from migrations import add_column
+
+
+def upgrade(conn):
+    add_column(conn, "proposal_analysis", "truncated", "BOOLEAN NOT NULL DEFAULT FALSE")
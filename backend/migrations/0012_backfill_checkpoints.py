@@ -0,0 +1,16 @@
+"""Backfill progress, committed in the same transaction as each imported batch"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, func
+from migrations import create_table
+
+
+def upgrade(conn):
+    create_table(conn, Table(
+        "backfill_checkpoints", MetaData(),
+        Column("source", String(255), primary_key=True),
+        Column("records_read", Integer, nullable=False),
+        Column("imported", Integer, nullable=False),
+        Column("skipped", Integer, nullable=False),
+        Column("analysis_failures", Integer, nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    ))
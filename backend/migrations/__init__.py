@@ -0,0 +1,38 @@
+"""
+Versioned schema migrations, applied in order by migrate.py.
+
+Each NNNN_name.py module defines upgrade(conn). Operations are idempotent,
+so a database created from the current models by init_db() can be brought
+under migration control by simply running them all.
+"""
+
+from sqlalchemy import inspect
+
+
+def has_column(conn, table, column):
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table, column, ddl):
+    """Add a column unless it already exists"""
+    if not has_column(conn, table, column):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Create an index unless it already exists"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.exec_driver_sql(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def create_table(conn, table):
+    """Create a table (and its indexes) unless it already exists.
+
+    Migrations spell out their tables instead of using the models, so a
+    migration keeps creating the schema of its own version as the models
+    change. Tables its foreign keys point to are reflected from the database.
+    """
+    referenced = {fk.target_fullname.split(".")[0] for fk in table.foreign_keys} - set(table.metadata.tables)
+    if referenced:
+        table.metadata.reflect(conn, only=sorted(referenced))
+    table.create(conn, checkfirst=True)
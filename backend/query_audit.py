@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+AI-Gov Query Plan Audit
+
+Seeds a large dataset into a scratch database, migrates it, runs the API
+endpoints against it and asks the database how it would execute every
+statement they issued. The audit fails if a hot-path query reads one of the
+large tables sequentially instead of through an index.
+
+SQLite is used by default (EXPLAIN QUERY PLAN). Set AUDIT_DATABASE_URL to a
+scratch PostgreSQL database to audit EXPLAIN plans there; the database is
+seeded, so never point it at real data.
+
+Usage: python query_audit.py [--proposals 20000] [--users 5000]
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+from fastapi import BackgroundTasks, Response
+
+import main
+import migrate
+from database import (
+    Base, User, Proposal, ProposalAnalysis, Vote, DelegatePreferences,
+    DelegateVotingHistory, DelegateAccuracyRollup
+)
+from rollups import record_delegate_outcome, rebuild_governance_stats
+from vote_merkle import rebuild_vote_trees
+
+AUDIT_DATABASE_URL = os.getenv("AUDIT_DATABASE_URL", "sqlite:///query_audit.db")
+
+# Tables that grow with usage; a full scan of one of these is a violation
+HOT_TABLES = {"proposals", "proposal_analysis", "votes", "delegate_voting_history",
+              "delegate_preferences", "delegate_accuracy_rollups", "vote_participation_daily",
+              "vote_merkle_trees", "vote_merkle_nodes", "proposal_revisions"}
+
+# (endpoint, table) pairs where a scan is expected
+ALLOWED_SCANS = {
+    ("list_proposals", "proposals"),  # offset pagination walks the table in rowid order
+}
+
+CATEGORIES = ["Finance", "Community", "Protocol", "Other"]
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)")
+
+
+def address(n):
+    return "0x" + format(n, "040x")
+
+
+def seed(bind, proposals, users, rng):
+    """Insert a dataset shaped like production: several votes and analysis versions per proposal"""
+    now = datetime.now()
+    with bind.begin() as conn:
+        conn.execute(insert(User.__table__), [{"address": address(u)} for u in range(users)])
+        conn.execute(insert(DelegatePreferences.__table__), [{
+            "address": address(u), "is_active": True, "risk_tolerance": rng.randint(1, 10),
+            "prioritize_financial": rng.randint(1, 5), "prioritize_community": rng.randint(1, 5),
+            "prioritize_protocol": rng.randint(1, 5), "voting_strategy": "balanced"
+        } for u in range(0, users, 3)])
+        conn.execute(insert(Proposal.__table__), [{
+            "id": p, "proposal_id": p, "title": f"Proposal {p}", "description": "Seeded proposal",
+            "ipfs_hash": f"Qm{p:044d}", "proposer": address(p % users), "status": "active",
+            "created_at": now - timedelta(minutes=proposals - p)
+        } for p in range(1, proposals + 1)])
+
+        analyses = []
+        for p in range(1, proposals + 1):
+            versions = 2 if p % 4 == 0 else 1
+            for v in range(versions):
+                analyses.append({
+                    "proposal_id": p, "summary": "Seeded summary", "category": rng.choice(CATEGORIES),
+                    "risk_score": rng.randint(1, 10), "ai_explanation": "Seeded",
+                    "prompt_version": f"v{v + 1}", "model": "seed", "is_current": v == versions - 1
+                })
+        conn.execute(insert(ProposalAnalysis.__table__), analyses)
+
+        votes, history = [], []
+        for p in range(1, proposals + 1):
+            for u in rng.sample(range(users), min(users, 8)):
+                ai_vote, user_vote = rng.random() < 0.5, rng.random() < 0.5
+                delegate = u % 3 == 0
+                votes.append({"proposal_id": p, "voter": address(u), "vote_type": ai_vote if delegate else user_vote,
+                              "is_delegate_vote": delegate, "explanation": "Seeded",
+                              "created_at": now - timedelta(hours=proposals - p)})
+                if delegate:
+                    history.append({"address": address(u), "proposal_id": p, "user_vote": user_vote,
+                                    "ai_recommendation": ai_vote, "match": user_vote == ai_vote})
+        conn.execute(insert(Vote.__table__), votes)
+        conn.execute(insert(DelegateVotingHistory.__table__), history)
+
+
+def build_rollups(session):
+    for entry in session.query(DelegateVotingHistory).yield_per(1000):
+        record_delegate_outcome(session, entry.address, None, None, entry.match)
+    session.commit()
+    rebuild_governance_stats(session)
+    rebuild_vote_trees(session)
+
+
+def explain(conn, statement, parameters):
+    """Hot tables read sequentially by the statement's plan"""
+    if conn.dialect.name == "sqlite":
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [m.group(1) for row in plan if (m := _SQLITE_SCAN_RE.match(row[-1]))]
+
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    scanned, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan":
+            scanned.append(node.get("Relation Name"))
+        nodes.extend(node.get("Plans", []))
+    return scanned
+
+
+async def capture(endpoint, Session, *args, **kwargs):
+    """Run one endpoint against the audit database and return the statements it issued"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    bind = Session.kw["bind"]
+    event.listen(bind, "before_cursor_execute", record)
+    db = Session()
+    try:
+        await getattr(main, endpoint)(*args, db=db, **kwargs)
+    except Exception as e:
+        # Queries issued before the failure are still audited
+        print(f"  note: {endpoint} raised {type(e).__name__}: {e}")
+    finally:
+        db.close()
+        event.remove(bind, "before_cursor_execute", record)
+    return statements
+
+
+async def audit(bind, proposals, users):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    voter = address(0)
+    delegate = address(3)
+    new_voter = address(users)
+    with bind.begin() as conn:
+        conn.execute(insert(User.__table__), [{"address": new_voter}])
+
+    calls = [
+        ("get_proposal", (proposals // 2,), {}),
+        ("list_proposals", (), {"skip": proposals // 2, "limit": 10}),
+        ("get_full_proposal", (proposals // 2,), {}),
+        ("list_proposal_revisions", (proposals // 2,), {}),
+        ("get_delegate_history", (delegate,), {"limit": 20}),
+        ("get_delegate_history", (delegate,), {"limit": 20, "before_id": 1000}),
+        ("get_delegate_accuracy_rollup", (delegate,), {}),
+        ("get_stats", (), {"days": 30}),
+        ("get_delegate_preferences", (delegate,), {}),
+        ("create_vote", (main.VoteCreate(proposal_id=proposals // 2, voter_address=new_voter, vote=True),
+                         BackgroundTasks(), Response()), {"idempotency_key": None}),
+        ("create_vote", (main.VoteCreate(proposal_id=proposals // 2, voter_address=voter, vote=True),
+                         BackgroundTasks(), Response()), {"idempotency_key": None}),
+        ("get_vote_proof", (proposals // 2, new_voter), {}),
+    ]
+
+    violations = []
+    for endpoint, args, kwargs in calls:
+        print(f"{endpoint}{args[:1]}")
+        statements = await capture(endpoint, Session, *args, **kwargs)
+        with bind.connect() as conn:
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                for table in explain(conn, statement, parameters):
+                    if table in HOT_TABLES and (endpoint, table) not in ALLOWED_SCANS:
+                        violations.append((endpoint, table, " ".join(statement.split())))
+        print(f"  {len(statements)} statements")
+    return violations
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Fail on sequential scans of hot tables in endpoint queries")
+    parser.add_argument("--proposals", type=int, default=20000, help="Seeded proposals")
+    parser.add_argument("--users", type=int, default=5000, help="Seeded users")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    bind = create_engine(AUDIT_DATABASE_URL)
+    if bind.dialect.name == "sqlite" and bind.url.database not in (None, "", ":memory:"):
+        if os.path.exists(bind.url.database):
+            os.remove(bind.url.database)
+
+    # Same path as a deployed database: the models' tables, then the migrations
+    Base.metadata.drop_all(bind)
+    with bind.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    Base.metadata.create_all(bind)
+    migrate.upgrade(bind)
+
+    print(f"Seeding {args.proposals} proposals and {args.users} users into {bind.url.render_as_string(hide_password=True)}")
+    seed(bind, args.proposals, args.users, random.Random(args.seed))
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    session = Session()
+    try:
+        build_rollups(session)
+    finally:
+        session.close()
+    with bind.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    violations = asyncio.run(audit(bind, args.proposals, args.users))
+    if violations:
+        print(f"\n{len(violations)} sequential scans on hot paths:")
+        for endpoint, table, statement in violations:
+            print(f"  {endpoint}: {table}\n    {statement}")
+        sys.exit(1)
+    print("\nNo sequential scans on hot paths")
+
+
+if __name__ == "__main__":
+    main_cli()
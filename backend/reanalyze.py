@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+"""
+AI-Gov Re-analysis Runner
+
+Re-scores stored proposal analyses after a prompt or model change. Proposals
+whose current analysis came from a different prompt version or model are
+selected in id order, one batch at a time, and re-analyzed concurrently
+under a per-minute rate budget. Results are inserted as new analysis rows;
+the served version is switched in one short transaction per proposal, so
+readers are never blocked and an interrupted run simply continues where
+the stale rows remain.
+
+With --shadow the new versions are stored but not served, and a comparison
+with the current versions is printed. --promote then makes them current.
+
+Usage:
+    python reanalyze.py [--prompt-version v2] [--model gemini-1.5-pro] [--shadow]
+    python reanalyze.py --promote [--prompt-version v2] [--model gemini-1.5-pro]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+from database import SessionLocal, init_db, Proposal, ProposalAnalysis
+from rollups import record_current_analysis
+from ai_service import AIService, ANALYSIS_PROMPTS, PROMPT_VERSION, GEMINI_MODEL, routing_policy
+from ipfs_service import get_ipfs_service
+
+
+class RateLimiter:
+    """Spaces out acquisitions to at most rate_per_minute"""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute
+        self.next_slot = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def select_stale(db, prompt_version, model, after_id, limit):
+    """Current analyses not produced by (prompt_version, model) and without a stored version from it"""
+    target = aliased(ProposalAnalysis)
+    has_target = db.query(target.id).filter(
+        target.proposal_id == ProposalAnalysis.proposal_id,
+        target.prompt_version == prompt_version,
+        target.model == model
+    ).exists()
+
+    return db.query(ProposalAnalysis, Proposal).join(
+        Proposal, Proposal.id == ProposalAnalysis.proposal_id
+    ).filter(
+        ProposalAnalysis.is_current == True,
+        ProposalAnalysis.id > after_id,
+        or_(
+            ProposalAnalysis.prompt_version.is_(None),
+            ProposalAnalysis.prompt_version != prompt_version,
+            ProposalAnalysis.model.is_(None),
+            ProposalAnalysis.model != model
+        ),
+        ~has_target
+    ).order_by(ProposalAnalysis.id).limit(limit).all()
+
+
+async def proposal_text(proposal):
+    description = proposal.description
+    if not description:
+        proposal_data = await get_ipfs_service().get_proposal(proposal.ipfs_hash) or {}
+        description = proposal_data.get("description", "")
+    return f"{proposal.title}\n\n{description}"
+
+
+def store_version(db, current, analysis, shadow):
+    """Insert a new analysis version and, unless shadowing, make it the served one.
+
+    Returns whether the new version is served. If current stopped being the
+    served version meanwhile (e.g. a revision was analyzed), the new version
+    is kept as a shadow instead, so the proposal never has two.
+    """
+    new_version = ProposalAnalysis(
+        proposal_id=current.proposal_id,
+        summary=analysis["summary"],
+        category=analysis["category"],
+        risk_score=analysis["risk_score"],
+        ai_explanation=analysis["explanation"],
+        prompt_version=analysis["prompt_version"],
+        model=analysis["model"],
+        truncated=analysis["truncated"],
+        is_current=False
+    )
+    db.add(new_version)
+    served = False
+    if not shadow:
+        served = db.query(ProposalAnalysis).filter(
+            ProposalAnalysis.id == current.id,
+            ProposalAnalysis.is_current == True
+        ).update({ProposalAnalysis.is_current: False}, synchronize_session=False) == 1
+        if served:
+            new_version.is_current = True
+            record_current_analysis(db, analysis["category"], analysis["risk_score"],
+                                    previous=(current.category, current.risk_score))
+    db.commit()
+    return served
+
+
+async def reanalyze(prompt_version, model, shadow, batch_size, concurrency, rate_per_minute):
+    limiter = RateLimiter(rate_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    processed = failed = superseded = 0
+    comparisons = []
+    after_id = 0
+
+    async def run_one(current, proposal):
+        async with semaphore:
+            await limiter.acquire()
+            text = await proposal_text(proposal)
+            return await AIService.analyze_proposal(text, prompt_version=prompt_version, model=model)
+
+    while True:
+        db = SessionLocal()
+        try:
+            # Analyses record the routing of the model, not the model alone
+            batch = select_stale(db, prompt_version, routing_policy(model), after_id, batch_size)
+            if not batch:
+                break
+            after_id = batch[-1][0].id
+
+            results = await asyncio.gather(*(run_one(current, proposal) for current, proposal in batch))
+            for (current, _), analysis in zip(batch, results):
+                if analysis["prompt_version"] is None:
+                    # Analysis failed; keep serving the current version
+                    failed += 1
+                    continue
+                if not store_version(db, current, analysis, shadow) and not shadow:
+                    # Replaced while this one ran; stored as a shadow
+                    superseded += 1
+                processed += 1
+                comparisons.append((current.category, analysis["category"], current.risk_score, analysis["risk_score"]))
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"[reanalyze] {processed} stored, {superseded} superseded, {failed} failed, "
+              f"{processed / elapsed:.2f} proposals/s")
+
+    if shadow and comparisons:
+        agree = sum(1 for old, new, _, _ in comparisons if old == new)
+        deltas = [abs(new - old) for _, _, old, new in comparisons if old is not None]
+        print(f"[reanalyze] Shadow comparison over {len(comparisons)} proposals:")
+        print(f"  category agreement: {agree / len(comparisons):.1%}")
+        if deltas:
+            print(f"  mean |risk delta|: {sum(deltas) / len(deltas):.2f}, max: {max(deltas)}")
+        print("  Run with --promote to serve the new versions.")
+
+
+def promote(prompt_version, model, batch_size):
+    """Make stored (prompt_version, model) analyses the served versions"""
+    promoted = 0
+    after_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = db.query(ProposalAnalysis).filter(
+                ProposalAnalysis.prompt_version == prompt_version,
+                ProposalAnalysis.model == routing_policy(model),
+                ProposalAnalysis.is_current == False,
+                ProposalAnalysis.id > after_id
+            ).order_by(ProposalAnalysis.id).limit(batch_size).all()
+            if not batch:
+                break
+            after_id = batch[-1].id
+
+            for shadow_version in batch:
+                current = db.query(ProposalAnalysis).filter(
+                    ProposalAnalysis.proposal_id == shadow_version.proposal_id,
+                    ProposalAnalysis.is_current == True
+                ).first()
+                db.query(ProposalAnalysis).filter(
+                    ProposalAnalysis.proposal_id == shadow_version.proposal_id,
+                    ProposalAnalysis.is_current == True
+                ).update({ProposalAnalysis.is_current: False}, synchronize_session=False)
+                shadow_version.is_current = True
+                record_current_analysis(
+                    db, shadow_version.category, shadow_version.risk_score,
+                    previous=(current.category, current.risk_score) if current is not None else None
+                )
+            db.commit()
+            promoted += len(batch)
+    finally:
+        db.close()
+    print(f"[reanalyze] Promoted {promoted} analyses to {prompt_version}/{model}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-analyze proposals with a new prompt version or model")
+    parser.add_argument("--prompt-version", default=PROMPT_VERSION, help="Target prompt version")
+    parser.add_argument("--model", default=GEMINI_MODEL, help="Target model")
+    parser.add_argument("--shadow", action="store_true", help="Store new versions without serving them and compare")
+    parser.add_argument("--promote", action="store_true", help="Serve previously shadowed versions")
+    parser.add_argument("--batch-size", type=int, default=50, help="Proposals selected per batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent analyses")
+    parser.add_argument("--rate", type=float, default=30, help="Maximum analyses started per minute")
+    args = parser.parse_args()
+
+    if args.prompt_version not in ANALYSIS_PROMPTS:
+        print(f"Unknown prompt version: {args.prompt_version}")
+        sys.exit(1)
+
+    init_db()
+    if args.promote:
+        promote(args.prompt_version, args.model, args.batch_size)
+    else:
+        asyncio.run(reanalyze(args.prompt_version, args.model, args.shadow, args.batch_size, args.concurrency, args.rate))
+
+
+if __name__ == "__main__":
+    main()
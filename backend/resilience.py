@@ -0,0 +1,210 @@
+"""
+AI-Gov Resilience Layer
+
+Deadlines, circuit breakers, hedged requests and metrics for outbound calls
+to IPFS, the Ethereum RPC and the LLM.
+
+Every call to a backend runs under that backend's deadline. Each target (an
+RPC URL, an IPFS gateway, or "default" for single-endpoint backends) has its
+own circuit breaker: after a run of consecutive failures it opens and calls
+fail fast with CircuitOpenError until the reset timeout passes, then one
+trial call decides whether it closes again.
+
+Hedged reads start on the first healthy target and, if no answer arrives
+within the hedge delay, also start on the next one, and so on; the first
+good response wins and the rest are cancelled.
+
+Per-backend settings come from <NAME>_TIMEOUT and <NAME>_HEDGE_DELAY
+(seconds), for example RPC_TIMEOUT=5.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open a breaker
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds before an open breaker allows a trial call
+
+# Default deadline and hedge delay per backend (seconds)
+BACKEND_DEFAULTS = {
+    "ipfs": {"timeout": 10.0, "hedge_delay": 0.5},
+    "rpc": {"timeout": 5.0, "hedge_delay": 0.3},
+    "llm": {"timeout": 60.0, "hedge_delay": None},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a target whose breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Whether a call may go out now; half-open admits a single trial call"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Forget a trial call that was cancelled before it finished"""
+        self.trial_running = False
+
+
+class BackendMetrics:
+    def __init__(self, samples=1000):
+        self.counts = {"calls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+                       "short_circuits": 0, "hedges": 0, "hedge_wins": 0}
+        self.latencies = deque(maxlen=samples)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(fraction):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1) if ordered else None
+
+        return {**self.counts, "p50_ms": percentile(0.5), "p99_ms": percentile(0.99)}
+
+
+class Backend:
+    def __init__(self, name, timeout, hedge_delay=None):
+        self.name = name
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.breakers = {}
+        self.metrics = BackendMetrics()
+
+    def breaker(self, target):
+        if target not in self.breakers:
+            self.breakers[target] = CircuitBreaker()
+        return self.breakers[target]
+
+    async def _attempt(self, target, call, timeout):
+        """One call to one target under its breaker"""
+        breaker = self.breaker(target)
+        if not breaker.allow():
+            self.metrics.counts["short_circuits"] += 1
+            raise CircuitOpenError(f"{self.name} backend {target} is unavailable")
+
+        self.metrics.counts["calls"] += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.counts["timeouts"] += 1
+            breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            self.metrics.counts["failures"] += 1
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        self.metrics.counts["successes"] += 1
+        self.metrics.latencies.append(time.monotonic() - start)
+        return result
+
+    async def call(self, call, timeout=None, target="default"):
+        """Run call() under the backend deadline and the target's breaker"""
+        return await self._attempt(target, call, timeout or self.timeout)
+
+    async def hedged(self, targets, timeout=None, hedge_delay=None):
+        """First good result of (target, call) pairs, starting a further target each hedge delay.
+
+        Targets whose breaker is open are skipped. Raises the last error if
+        every target fails, or asyncio.TimeoutError at the deadline.
+        """
+        timeout = timeout or self.timeout
+        hedge_delay = self.hedge_delay if hedge_delay is None else hedge_delay
+        deadline = time.monotonic() + timeout
+        pending_targets = [(target, call) for target, call in targets if self.breaker(target).state != "open"]
+        if not pending_targets:
+            self.metrics.counts["short_circuits"] += 1
+            raise CircuitOpenError(f"All {self.name} backends are unavailable")
+
+        running = {}
+        last_error = None
+        try:
+            while pending_targets or running:
+                if pending_targets and (not running or hedge_delay is not None):
+                    target, call = pending_targets.pop(0)
+                    if running:
+                        self.metrics.counts["hedges"] += 1
+                    task = asyncio.ensure_future(self._attempt(target, call, max(0.0, deadline - time.monotonic())))
+                    running[task] = len(running) > 0
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # Wait for an answer, or until it is time to hedge to the next target
+                wait = min(remaining, hedge_delay) if pending_targets and hedge_delay is not None else remaining
+                done, _ = await asyncio.wait(list(running), timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    was_hedge = running.pop(task)
+                    if task.exception() is None:
+                        if was_hedge:
+                            self.metrics.counts["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+
+
+_backends = {}
+
+def get_backend(name):
+    """Get the shared Backend for ipfs, rpc or llm"""
+    if name not in _backends:
+        defaults = BACKEND_DEFAULTS.get(name, {"timeout": 30.0, "hedge_delay": None})
+        timeout = float(os.getenv(f"{name.upper()}_TIMEOUT", defaults["timeout"]))
+        hedge_delay = os.getenv(f"{name.upper()}_HEDGE_DELAY", defaults["hedge_delay"])
+        _backends[name] = Backend(name, timeout, None if hedge_delay in (None, "") else float(hedge_delay))
+    return _backends[name]
+
+def backend_metrics():
+    """Metrics and breaker states of every backend used so far"""
+    return {
+        name: {
+            **backend.metrics.snapshot(),
+            "breakers": {target: breaker.state for target, breaker in backend.breakers.items()}
+        }
+        for name, backend in _backends.items()
+    }
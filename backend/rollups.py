@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""
+AI-Gov Rollups
+
+Aggregates that are maintained incrementally as proposals, analyses and
+votes are written, so the views that need them read a handful of rows
+instead of scanning history. The rebuild command recomputes all of them from
+the source tables, e.g. after migrating an existing database.
+
+Usage: python rollups.py rebuild
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from database import (
+    SessionLocal, DelegateAccuracyRollup, DelegateVotingHistory, GovernanceStat, VoteParticipationDaily,
+    Proposal, ProposalAnalysis, Vote
+)
+
+# Risk score bands used by the frontend risk badges
+RISK_BANDS = (("low", 1, 3), ("medium", 4, 6), ("high", 7, 10))
+
+
+def risk_band(risk_score):
+    """Map a 1-10 risk score to its band"""
+    for name, low, high in RISK_BANDS:
+        if risk_score is not None and low <= risk_score <= high:
+            return name
+    return "unknown"
+
+
+def _defer(db, kind, key, deltas):
+    """Add increments to the collection started by defer_rollups, if any; True when deferred"""
+    deferred = db.info.get("deferred_rollups")
+    if deferred is None:
+        return False
+    current = deferred.get((kind, key), (0,) * len(deltas))
+    deferred[(kind, key)] = tuple(a + b for a, b in zip(current, deltas))
+    return True
+
+
+def _increment(db, address, dimension, bucket, total=1, matches=0):
+    if _defer(db, "accuracy", (address, dimension, bucket), (total, matches)):
+        return
+    updated = db.query(DelegateAccuracyRollup).filter(
+        DelegateAccuracyRollup.address == address,
+        DelegateAccuracyRollup.dimension == dimension,
+        DelegateAccuracyRollup.bucket == bucket
+    ).update({
+        DelegateAccuracyRollup.total: DelegateAccuracyRollup.total + total,
+        DelegateAccuracyRollup.matches: DelegateAccuracyRollup.matches + matches
+    }, synchronize_session=False)
+    if updated:
+        return
+
+    # First outcome in this bucket; a concurrent writer may create it first
+    try:
+        with db.begin_nested():
+            db.add(DelegateAccuracyRollup(
+                address=address, dimension=dimension, bucket=bucket,
+                total=total, matches=matches
+            ))
+    except IntegrityError:
+        _increment(db, address, dimension, bucket, total, matches)
+
+
+def record_delegate_outcome(db, address, category, risk_score, match):
+    """Count one delegate vote outcome in the user's rollups (caller commits)"""
+    matches = 1 if match else 0
+    _increment(db, address, "overall", "all", 1, matches)
+    _increment(db, address, "category", category or "Other", 1, matches)
+    _increment(db, address, "risk_band", risk_band(risk_score), 1, matches)
+
+
+def get_delegate_accuracy(db, address):
+    """Match rates of a user's AI delegate, overall, by category and by risk band"""
+    rows = db.query(DelegateAccuracyRollup).filter(DelegateAccuracyRollup.address == address).all()
+
+    result = {"overall": {"total": 0, "matches": 0, "match_rate": None}, "by_category": {}, "by_risk_band": {}}
+    for row in rows:
+        entry = {
+            "total": row.total,
+            "matches": row.matches,
+            "match_rate": round(row.matches / row.total, 4) if row.total else None
+        }
+        if row.dimension == "overall":
+            result["overall"] = entry
+        elif row.dimension == "category":
+            result["by_category"][row.bucket] = entry
+        elif row.dimension == "risk_band":
+            result["by_risk_band"][row.bucket] = entry
+    return result
+
+
+def rebuild_delegate_accuracy(db):
+    """Recompute every user's rollups from delegate_voting_history"""
+    db.query(DelegateAccuracyRollup).delete(synchronize_session=False)
+    history = db.query(
+        DelegateVotingHistory.address,
+        DelegateVotingHistory.match,
+        ProposalAnalysis.category,
+        ProposalAnalysis.risk_score
+    ).outerjoin(
+        ProposalAnalysis,
+        (ProposalAnalysis.proposal_id == DelegateVotingHistory.proposal_id) & (ProposalAnalysis.is_current == True)
+    ).filter(
+        # Delegate votes of users who did not state their own vote have no outcome
+        DelegateVotingHistory.match.isnot(None)
+    ).yield_per(1000)
+
+    counts = {}
+    for address, match, category, risk_score in history:
+        for key in ((address, "overall", "all"),
+                    (address, "category", category or "Other"),
+                    (address, "risk_band", risk_band(risk_score))):
+            total, matches = counts.get(key, (0, 0))
+            counts[key] = (total + 1, matches + (1 if match else 0))
+
+    db.add_all(
+        DelegateAccuracyRollup(address=address, dimension=dimension, bucket=bucket, total=total, matches=matches)
+        for (address, dimension, bucket), (total, matches) in counts.items()
+    )
+    db.commit()
+    return len(counts)
+
+
+def _add_stat(db, dimension, bucket, delta=1):
+    if _defer(db, "stat", (dimension, bucket), (delta,)):
+        return
+    updated = db.query(GovernanceStat).filter(
+        GovernanceStat.dimension == dimension,
+        GovernanceStat.bucket == bucket
+    ).update({GovernanceStat.count: GovernanceStat.count + delta}, synchronize_session=False)
+    if updated:
+        return
+
+    # First entry in this bucket; a concurrent writer may create it first
+    try:
+        with db.begin_nested():
+            db.add(GovernanceStat(dimension=dimension, bucket=bucket, count=delta))
+    except IntegrityError:
+        _add_stat(db, dimension, bucket, delta)
+
+
+def record_current_analysis(db, category, risk_score, previous=None):
+    """Count a proposal's served analysis (caller commits).
+
+    previous is the (category, risk_score) of the analysis it replaces, or
+    None for a new proposal.
+    """
+    if previous is None:
+        _add_stat(db, "proposals", "all")
+    else:
+        old_category, old_risk_score = previous
+        _add_stat(db, "category", old_category or "Other", -1)
+        _add_stat(db, "risk_score", str(old_risk_score), -1)
+    _add_stat(db, "category", category or "Other")
+    _add_stat(db, "risk_score", str(risk_score))
+
+
+def _add_participation(db, day, votes=1, delegate_votes=0):
+    if _defer(db, "participation", (day,), (votes, delegate_votes)):
+        return
+    updated = db.query(VoteParticipationDaily).filter(VoteParticipationDaily.day == day).update({
+        VoteParticipationDaily.votes: VoteParticipationDaily.votes + votes,
+        VoteParticipationDaily.delegate_votes: VoteParticipationDaily.delegate_votes + delegate_votes
+    }, synchronize_session=False)
+    if updated:
+        return
+
+    # First vote of the day; a concurrent writer may create the row first
+    try:
+        with db.begin_nested():
+            db.add(VoteParticipationDaily(day=day, votes=votes, delegate_votes=delegate_votes))
+    except IntegrityError:
+        _add_participation(db, day, votes, delegate_votes)
+
+
+def record_vote(db, delegate_vote, day=None):
+    """Count one vote in the totals and its day's participation (caller commits)"""
+    _add_stat(db, "votes", "all")
+    if delegate_vote:
+        _add_stat(db, "delegate_votes", "all")
+    _add_participation(db, day or datetime.now(timezone.utc).date().isoformat(), 1, 1 if delegate_vote else 0)
+
+
+_ROLLUP_WRITERS = {"accuracy": _increment, "stat": _add_stat, "participation": _add_participation}
+
+
+def defer_rollups(db):
+    """Collect the increments recorded through db in the returned dict instead of writing them.
+
+    Many writes committed together then touch each rollup row once, through
+    apply_rollups.
+    """
+    deferred = db.info["deferred_rollups"] = {}
+    return deferred
+
+
+def apply_rollups(db):
+    """Write the increments collected since defer_rollups, summed per row (caller commits)"""
+    deferred = db.info.pop("deferred_rollups", None) or {}
+    # A fixed row order keeps concurrent batches from deadlocking on each other
+    for (kind, key), deltas in sorted(deferred.items()):
+        if any(deltas):
+            _ROLLUP_WRITERS[kind](db, *key, *deltas)
+
+
+def get_governance_stats(db, days=30):
+    """Dashboard statistics; reads a bounded number of rollup rows whatever the history size"""
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+    # A few dozen rows at most: one per category and risk score plus the totals
+    counts = {}
+    for row in db.query(GovernanceStat).all():
+        counts.setdefault(row.dimension, {})[row.bucket] = row.count
+    # Participation grows by a row a day; only the requested window is read
+    days_in_window = db.query(VoteParticipationDaily).filter(
+        VoteParticipationDaily.day >= since
+    ).order_by(VoteParticipationDaily.day).all()
+
+    votes = counts.get("votes", {}).get("all", 0)
+    delegate_votes = counts.get("delegate_votes", {}).get("all", 0)
+    return {
+        "proposals": counts.get("proposals", {}).get("all", 0),
+        "by_category": {category: count for category, count in counts.get("category", {}).items() if count},
+        "risk_distribution": {str(score): counts.get("risk_score", {}).get(str(score), 0) for score in range(1, 11)},
+        "votes": {
+            "total": votes,
+            "delegate": delegate_votes,
+            "delegate_share": round(delegate_votes / votes, 4) if votes else None
+        },
+        "participation": [
+            {"day": row.day, "votes": row.votes, "delegate_votes": row.delegate_votes} for row in days_in_window
+        ]
+    }
+
+
+def rebuild_governance_stats(db):
+    """Recompute the dashboard statistics from proposals, current analyses and votes"""
+    db.query(GovernanceStat).delete(synchronize_session=False)
+    db.query(VoteParticipationDaily).delete(synchronize_session=False)
+    counts = {("proposals", "all"): db.query(func.count(Proposal.id)).scalar()}
+
+    analyses = db.query(ProposalAnalysis.category, ProposalAnalysis.risk_score, func.count()).filter(
+        ProposalAnalysis.is_current == True
+    ).group_by(ProposalAnalysis.category, ProposalAnalysis.risk_score)
+    for category, risk_score, count in analyses:
+        for key in (("category", category or "Other"), ("risk_score", str(risk_score))):
+            counts[key] = counts.get(key, 0) + count
+
+    votes = db.query(func.date(Vote.created_at), Vote.is_delegate_vote, func.count()).group_by(
+        func.date(Vote.created_at), Vote.is_delegate_vote
+    )
+    participation = {}
+    for day, delegate_vote, count in votes:
+        total, delegate = participation.get(str(day), (0, 0))
+        participation[str(day)] = (total + count, delegate + (count if delegate_vote else 0))
+        counts[("votes", "all")] = counts.get(("votes", "all"), 0) + count
+        if delegate_vote:
+            counts[("delegate_votes", "all")] = counts.get(("delegate_votes", "all"), 0) + count
+
+    db.add_all(
+        GovernanceStat(dimension=dimension, bucket=bucket, count=count)
+        for (dimension, bucket), count in counts.items()
+    )
+    db.add_all(
+        VoteParticipationDaily(day=day, votes=total, delegate_votes=delegate)
+        for day, (total, delegate) in participation.items()
+    )
+    db.commit()
+    return len(counts) + len(participation)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        print(__doc__.strip())
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild_delegate_accuracy(db)} delegate accuracy rollup rows")
+        print(f"Rebuilt {rebuild_governance_stats(db)} governance statistics rows")
+    finally:
+        db.close()
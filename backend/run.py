@@ -4,6 +4,12 @@ AI-Gov Backend Server Runner
 
 This script starts the FastAPI backend server for the AI-Gov application.
 It handles environment variable loading and server configuration.
+
+Outside development the server runs one pre-forked worker process per CPU
+(override with WORKERS). Mock services and caches keep their state in a
+shared SQLite file (SHARED_STATE_PATH) so all workers see the same data.
+Send SIGHUP to the server process to restart the workers one at a time;
+SIGTERM/SIGINT drains in-flight requests for up to GRACEFUL_TIMEOUT seconds.
 """
 
 import os
@@ -17,22 +23,38 @@ load_dotenv()
 HOST = os.getenv("HOST", "localhost")
 PORT = int(os.getenv("PORT", "8000"))
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
 
 # Configure reload based on environment
 RELOAD = ENVIRONMENT.lower() == "development"
 
+# Auto-reload only works with a single process
+WORKERS = int(os.getenv("WORKERS", "0")) or (1 if RELOAD else os.cpu_count() or 1)
+if WORKERS > 1:
+    RELOAD = False
+
 if __name__ == "__main__":
     print(f"Starting AI-Gov backend server in {ENVIRONMENT} mode")
     print(f"Server running at http://{HOST}:{PORT}")
-    
+
     if RELOAD:
         print("Auto-reload is enabled. The server will restart on file changes.")
-    
+
+    if WORKERS > 1:
+        print(f"Running {WORKERS} worker processes. Send SIGHUP to restart them gracefully.")
+        # Workers inherit the environment; the database layer uses it to pick a shared fallback
+        os.environ["WORKERS"] = str(WORKERS)
+        # Create tables once here so workers don't race on schema creation
+        from database import init_db
+        init_db()
+
     # Start the server
     uvicorn.run(
         "main:app",
         host=HOST,
         port=PORT,
         reload=RELOAD,
+        workers=WORKERS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
         log_level="info"
-    )
\ No newline at end of file
+    )
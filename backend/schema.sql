@@ -1,4 +1,5 @@
 -- AI-Gov Database Schema
+-- Creates a fresh database. Upgrade existing databases with `python migrate.py`.
 
 -- Users table to store user profiles and preferences
 CREATE TABLE users (
@@ -26,7 +27,7 @@ CREATE TABLE delegate_preferences (
 -- Proposals table to store metadata about proposals
 CREATE TABLE proposals (
     id SERIAL PRIMARY KEY,
-    proposal_id INTEGER NOT NULL,  -- On-chain proposal ID
+    proposal_id INTEGER,  -- On-chain proposal ID, set once the submission is mined
     title VARCHAR(255) NOT NULL,
     description TEXT NOT NULL,
     ipfs_hash VARCHAR(100) NOT NULL,  -- IPFS hash for full proposal content
@@ -44,10 +45,29 @@ CREATE TABLE proposal_analysis (
     category VARCHAR(100) NOT NULL,  -- Finance, Community, Protocol, etc.
     risk_score INTEGER CHECK (risk_score BETWEEN 1 AND 10),
     ai_explanation TEXT,  -- Explanation for the risk score and category
+    prompt_version VARCHAR(20),  -- Prompt set that produced this analysis (NULL: unknown or failed)
+    model VARCHAR(100),  -- Model that produced this analysis
+    is_current BOOLEAN NOT NULL DEFAULT TRUE,  -- Whether this is the version served by the API
+    truncated BOOLEAN NOT NULL DEFAULT FALSE,  -- Part of the text was left out to stay in the token budget
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Edited versions of proposals; revision 1 is the original text
+CREATE TABLE proposal_revisions (
+    id SERIAL PRIMARY KEY,
+    proposal_id INTEGER NOT NULL REFERENCES proposals(id),
+    revision INTEGER NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    ipfs_hash VARCHAR(100) NOT NULL,  -- Revision document, linking to the previous one
+    author VARCHAR(42) NOT NULL,
+    analysis_id INTEGER REFERENCES proposal_analysis(id),  -- Analysis of this revision
+    sections TEXT,  -- JSON [{"key", "summary"}] reused by the next revision's analysis
+    summarized_sections INTEGER,  -- Sections sent to the model for this revision
+    reused_sections INTEGER,  -- Sections whose summaries came from the previous revision
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Votes cast by users
 CREATE TABLE votes (
     id SERIAL PRIMARY KEY,
@@ -55,7 +75,9 @@ CREATE TABLE votes (
     voter VARCHAR(42) NOT NULL,
     vote_type BOOLEAN NOT NULL,  -- TRUE for 'for', FALSE for 'against'
     is_delegate_vote BOOLEAN DEFAULT FALSE,  -- Whether this vote was cast by an AI delegate
+    explanation TEXT,  -- AI delegate reasoning, or a note for manual votes
     transaction_hash VARCHAR(66),  -- On-chain transaction hash
+    merkle_index INTEGER,  -- Leaf position in the proposal's vote Merkle tree
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -64,14 +86,93 @@ CREATE TABLE delegate_voting_history (
     id SERIAL PRIMARY KEY,
     address VARCHAR(42) REFERENCES users(address),
     proposal_id INTEGER REFERENCES proposals(id),
-    user_vote BOOLEAN,  -- User's actual vote (TRUE for 'for', FALSE for 'against')
+    user_vote BOOLEAN,  -- User's actual vote (TRUE for 'for', FALSE for 'against'), when they stated one
     ai_recommendation BOOLEAN,  -- AI's recommended vote
-    match BOOLEAN,  -- Whether the AI recommendation matched the user's vote
+    match BOOLEAN,  -- Whether the AI recommendation matched the user's vote; NULL without a user vote
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Per-user AI delegate accuracy, maintained incrementally with each delegate vote
+CREATE TABLE delegate_accuracy_rollups (
+    address VARCHAR(42) REFERENCES users(address),
+    dimension VARCHAR(20),  -- 'overall', 'category' or 'risk_band'
+    bucket VARCHAR(100),  -- 'all', category name or 'low'/'medium'/'high'
+    total INTEGER NOT NULL DEFAULT 0,
+    matches INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (address, dimension, bucket)
+);
+
+-- Dashboard statistics, maintained incrementally with each write
+CREATE TABLE governance_stats (
+    dimension VARCHAR(30),  -- 'proposals', 'category', 'risk_score', 'votes' or 'delegate_votes'
+    bucket VARCHAR(100),  -- Category name, risk score or 'all'
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- Votes per UTC day
+CREATE TABLE vote_participation_daily (
+    day VARCHAR(10) PRIMARY KEY,  -- YYYY-MM-DD
+    votes INTEGER NOT NULL DEFAULT 0,
+    delegate_votes INTEGER NOT NULL DEFAULT 0
+);
+
+-- Append-only Merkle tree over each proposal's votes (see vote_merkle.py)
+CREATE TABLE vote_merkle_trees (
+    proposal_id INTEGER PRIMARY KEY REFERENCES proposals(id),
+    size INTEGER NOT NULL DEFAULT 0,  -- Leaves, one per vote
+    root VARCHAR(64),  -- Hex SHA-256 root over every leaf
+    published_size INTEGER NOT NULL DEFAULT 0,  -- Size of the last published root
+    published_root VARCHAR(64),
+    published_cid VARCHAR(100),  -- IPFS document announcing the published root
+    published_tx VARCHAR(66),  -- Transaction storing it on-chain, if enabled
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Every node of the vote Merkle trees
+CREATE TABLE vote_merkle_nodes (
+    proposal_id INTEGER REFERENCES proposals(id),
+    level INTEGER,  -- 0 for leaves
+    position INTEGER,  -- Index within the level
+    hash VARCHAR(64) NOT NULL,
+    PRIMARY KEY (proposal_id, level, position)
+);
+
+-- Results of requests sent with an Idempotency-Key, replayed on retries
+CREATE TABLE idempotency_keys (
+    route VARCHAR(50),  -- e.g. 'POST /proposals'
+    key VARCHAR(255),  -- Client-chosen Idempotency-Key header
+    request_hash VARCHAR(64) NOT NULL,  -- SHA-256 of the request body
+    status VARCHAR(20) NOT NULL,  -- 'in_progress' or 'completed'
+    status_code INTEGER,
+    response TEXT,  -- JSON response body of the first request
+    expires_at DOUBLE PRECISION NOT NULL,  -- Unix time; an in-progress lease, then the key's expiry
+    PRIMARY KEY (route, key)
+);
+
+-- Progress of backfill.py imports, committed with each imported batch
+CREATE TABLE backfill_checkpoints (
+    source VARCHAR(255) PRIMARY KEY,  -- Input file of backfill.py, or the name given with --checkpoint
+    records_read INTEGER NOT NULL DEFAULT 0,  -- Input records committed or skipped; a resumed run starts here
+    imported INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,  -- Records without a title or description
+    analysis_failures INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Indexes for performance
 CREATE INDEX idx_proposals_proposer ON proposals(proposer);
+CREATE INDEX idx_proposal_analysis_proposal_current ON proposal_analysis(proposal_id, is_current);
 CREATE INDEX idx_votes_proposal_id ON votes(proposal_id);
 CREATE INDEX idx_votes_voter ON votes(voter);
-CREATE INDEX idx_delegate_history_address ON delegate_voting_history(address);
\ No newline at end of file
+CREATE UNIQUE INDEX uq_votes_proposal_voter ON votes(proposal_id, voter);
+CREATE INDEX idx_delegate_history_address ON delegate_voting_history(address);
+CREATE INDEX idx_delegate_history_address_id ON delegate_voting_history(address, id);
+CREATE INDEX ix_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+-- Change columns read by incremental analytics exports
+CREATE INDEX idx_proposals_updated_id ON proposals(updated_at, id);
+CREATE INDEX idx_proposal_analysis_updated_id ON proposal_analysis(updated_at, id);
+CREATE INDEX idx_votes_created_id ON votes(created_at, id);
+CREATE INDEX idx_delegate_history_created_id ON delegate_voting_history(created_at, id);
+CREATE UNIQUE INDEX uq_proposal_revisions_proposal_revision ON proposal_revisions(proposal_id, revision);
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# File shared by every worker process on this machine
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+SHARED_STATE_PURGE_INTERVAL = float(os.getenv("SHARED_STATE_PURGE_INTERVAL", "300"))  # Seconds between deletions of expired entries
+
+
+class SharedStore:
+    """SQLite-backed key/value store shared between worker processes.
+
+    Values are JSON encoded and grouped by namespace. WAL mode lets readers
+    proceed while another process writes.
+    """
+
+    def __init__(self, path=SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self.purger = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, default=None):
+        """Get a value, or default if it is missing or expired"""
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store a value, optionally expiring after ttl seconds"""
+        expires_at = time.time() + ttl if ttl else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, namespace, key):
+        """Remove a value"""
+        self._connect().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def keys(self, namespace):
+        """List the live keys of a namespace"""
+        rows = self._connect().execute(
+            "SELECT key FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        """Delete expired entries in every namespace"""
+        self._connect().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    async def run_purger(self, interval=SHARED_STATE_PURGE_INTERVAL):
+        """Delete expired entries every interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.purge_expired)
+            except Exception as e:
+                print(f"Error purging shared state: {str(e)}")
+
+    def start_purger(self):
+        """Purge expired entries in the background of the running event loop"""
+        if self.purger is None:
+            self.purger = asyncio.get_running_loop().create_task(self.run_purger())
+
+    async def stop_purger(self):
+        if self.purger is not None:
+            self.purger.cancel()
+            try:
+                await self.purger
+            except asyncio.CancelledError:
+                pass
+            self.purger = None
+
+    @contextmanager
+    def lock(self):
+        """Hold the database write lock, serializing read-modify-write sequences across processes"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class SharedDict(MutableMapping):
+    """Dict view over one namespace of a SharedStore.
+
+    Keys keep their JSON type, so integer keys round-trip as integers. Values
+    are copies: mutate them by assigning the updated value back.
+    """
+
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.store.get(self.namespace, json.dumps(key), missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.store.set(self.namespace, json.dumps(key), value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.store.delete(self.namespace, json.dumps(key))
+
+    def __iter__(self):
+        return (json.loads(key) for key in self.store.keys(self.namespace))
+
+    def __len__(self):
+        return len(self.store.keys(self.namespace))
+
+# Create a singleton instance
+shared_store = SharedStore()
+
+def get_shared_store():
+    """Get the store shared between worker processes"""
+    return shared_store
+
+def shared_dict(namespace):
+    """Get a dict backed by the shared store"""
+    return SharedDict(shared_store, namespace)
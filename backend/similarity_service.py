@@ -0,0 +1,287 @@
+import os
+import re
+import zlib
+import hashlib
+import numpy as np
+from dotenv import load_dotenv
+from shared_state import get_shared_store
+from database import SessionLocal, Proposal
+
+# Load environment variables
+load_dotenv()
+
+# Similarity index configuration
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "similarity_index.log")
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.5"))
+SIMILARITY_REUSE_THRESHOLD = float(os.getenv("SIMILARITY_REUSE_THRESHOLD", "0.9"))
+
+# MinHash parameters: NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+NUM_BANDS = 32
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+SHINGLE_SIZE = 3
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SEED = 1337
+
+_WORD_RE = re.compile(r"\w+")
+
+# Index log record: proposal id, sha256 of the indexed text and MinHash signature
+_RECORD = np.dtype([("id", "<i8"), ("digest", "u1", (32,)), ("signature", "<u4", (NUM_PERM,))])
+_REMOVED = bytes(32)  # Digest of a record that removes its id
+COMPACT_MIN_RECORDS = 1000  # The log is compacted once it holds twice as many records as entries, and at least this many
+
+
+def shingles(text):
+    """Split text into a set of hashed word n-grams"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.array(sorted({zlib.crc32(g.encode("utf-8")) for g in grams}), dtype=np.uint64)
+
+
+def proposal_text(title, description):
+    """Text of a proposal as it is indexed"""
+    return f"{title}\n\n{description}"
+
+
+def content_hash(text):
+    """Hex digest identifying the exact text an entry was computed from"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MinHashLSH:
+    """MinHash signatures with banded LSH buckets for near-duplicate lookup.
+
+    Entries are keyed by proposal id: adding an id again replaces its entry.
+    The index is persisted as an append-only log of fixed-size records, so
+    an add writes one record and other processes read only the records
+    appended since their last refresh. A record with an all-zero digest
+    removes its id. The log is compacted once most of it is superseded.
+    """
+
+    def __init__(self, path=SIMILARITY_INDEX_PATH):
+        self.path = path
+        rng = np.random.RandomState(_SEED)
+        # Keep a and b below 2**29 so that a * x + b never overflows uint64
+        self.a = rng.randint(1, 1 << 29, size=NUM_PERM).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 29, size=NUM_PERM).astype(np.uint64)
+        self.entries = {}  # proposal id -> (signature, content hash)
+        self.buckets = [dict() for _ in range(NUM_BANDS)]
+        self._file_id = None
+        self._offset = 0
+        self._records = 0
+        self.load()
+
+    def signature(self, text):
+        """Compute the MinHash signature of a text"""
+        hashed = shingles(text)
+        if hashed.size == 0:
+            return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+        # (NUM_PERM, n_shingles) matrix of permuted hashes, reduced to the row minimum
+        permuted = (np.outer(self.a, hashed) + self.b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        bands = signature.reshape(NUM_BANDS, ROWS_PER_BAND)
+        return [band.tobytes() for band in bands]
+
+    def _remove(self, proposal_id):
+        entry = self.entries.pop(proposal_id, None)
+        if entry is None:
+            return
+        for band, key in enumerate(self._band_keys(entry[0])):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(proposal_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    def _put(self, proposal_id, signature, digest):
+        self._remove(proposal_id)
+        self.entries[proposal_id] = (signature, digest)
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(key, set()).add(proposal_id)
+
+    def _apply(self, records):
+        for record in records:
+            digest = record["digest"].tobytes()
+            if digest == _REMOVED:
+                self._remove(int(record["id"]))
+            else:
+                self._put(int(record["id"]), record["signature"].copy(), digest.hex())
+        self._records += len(records)
+
+    def _write(self, changes):
+        """Apply (proposal_id, signature, content hash) changes and append them to the log; the caller holds the lock.
+
+        A signature of None removes the id.
+        """
+        records = np.zeros(len(changes), dtype=_RECORD)
+        for record, (proposal_id, signature, digest) in zip(records, changes):
+            record["id"] = proposal_id
+            if signature is not None:
+                record["signature"] = signature
+                record["digest"] = np.frombuffer(bytes.fromhex(digest), dtype=np.uint8)
+        self._apply(records)
+        if not self.path:
+            return
+        if self._records > 2 * max(len(self.entries), COMPACT_MIN_RECORDS):
+            self.save()
+            return
+        try:
+            with open(self.path, "ab") as f:
+                f.write(records.tobytes())
+            self._file_id, self._offset = self._stat()
+        except Exception as e:
+            print(f"Error saving similarity index: {str(e)}")
+
+    def add(self, proposal_id, text):
+        """Add or replace a proposal's entry and persist it"""
+        signature = self.signature(text)
+        # Other worker processes may have added proposals since we last loaded
+        with get_shared_store().lock():
+            self.refresh()
+            self._write([(proposal_id, signature, content_hash(text))])
+        return signature
+
+    def add_many(self, items):
+        """Add or replace (proposal_id, text) pairs, persisting them with one write"""
+        changes = [(proposal_id, self.signature(text), content_hash(text)) for proposal_id, text in items]
+        with get_shared_store().lock():
+            self.refresh()
+            self._write(changes)
+
+    def reconcile(self, items):
+        """Make the index match (proposal_id, text) pairs of every stored proposal.
+
+        Entries whose content hash differs are recomputed, missing ones are
+        added and entries of ids not listed are removed, so an index file
+        that outlived its database cannot match proposals that no longer
+        exist. Returns the number of entries changed.
+        """
+        self.refresh()
+        # Entries other workers write meanwhile are theirs to keep: only entries seen now are changed
+        known = {proposal_id: entry[1] for proposal_id, entry in self.entries.items()}
+        seen = set()
+        changes = []
+        for proposal_id, text in items:
+            seen.add(proposal_id)
+            digest = content_hash(text)
+            if known.get(proposal_id) != digest:
+                changes.append((proposal_id, self.signature(text), digest))
+        changes.extend((proposal_id, None, None) for proposal_id in set(known) - seen)
+        if changes:
+            with get_shared_store().lock():
+                self.refresh()
+                changes = [
+                    change for change in changes
+                    if self.entries.get(change[0], (None, None))[1] == known.get(change[0])
+                ]
+                if changes:
+                    self._write(changes)
+        return len(changes)
+
+    def query(self, text, threshold=SIMILARITY_THRESHOLD, limit=5):
+        """Find indexed proposals whose estimated Jaccard similarity passes the threshold"""
+        self.refresh()
+        signature = self.signature(text)
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+        if not candidates:
+            return []
+
+        ids = list(candidates)
+        scores = (np.stack([self.entries[i][0] for i in ids]) == signature).mean(axis=1)
+        order = np.argsort(-scores)
+        matches = []
+        for i in order[:limit]:
+            if scores[i] < threshold:
+                break
+            matches.append({
+                "id": ids[i],
+                "similarity": round(float(scores[i]), 3),
+                "content_hash": self.entries[ids[i]][1]
+            })
+        return matches
+
+    def save(self):
+        """Rewrite the log with one record per entry"""
+        if not self.path:
+            return
+        try:
+            records = np.zeros(len(self.entries), dtype=_RECORD)
+            for record, (proposal_id, (signature, digest)) in zip(records, self.entries.items()):
+                record["id"] = proposal_id
+                record["signature"] = signature
+                record["digest"] = np.frombuffer(bytes.fromhex(digest), dtype=np.uint8)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(records.tobytes())
+            os.replace(tmp_path, self.path)
+            self._records = len(records)
+            self._file_id, self._offset = self._stat()
+        except Exception as e:
+            print(f"Error saving similarity index: {str(e)}")
+
+    def _stat(self):
+        """(file identity, size) of the log, or (None, 0) if it does not exist"""
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_dev, stat.st_ino), stat.st_size
+        except OSError:
+            return None, 0
+
+    def refresh(self):
+        """Apply records other processes appended, or reload if the log was replaced"""
+        if not self.path:
+            return
+        file_id, size = self._stat()
+        if file_id != self._file_id or size < self._offset:
+            self.load()
+        elif size - self._offset >= _RECORD.itemsize:
+            self._read(self._offset, size)
+
+    def _read(self, start, size):
+        # A trailing partial record is being written; it is read on a later refresh
+        count = (size - start) // _RECORD.itemsize
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                records = np.frombuffer(f.read(count * _RECORD.itemsize), dtype=_RECORD)
+            self._apply(records)
+            self._offset = start + len(records) * _RECORD.itemsize
+        except Exception as e:
+            print(f"Error loading similarity index: {str(e)}")
+
+    def load(self):
+        """Load the log from disk and rebuild the LSH buckets"""
+        self.entries = {}
+        self.buckets = [dict() for _ in range(NUM_BANDS)]
+        self._records = 0
+        self._offset = 0
+        self._file_id, size = self._stat() if self.path else (None, 0)
+        if self._file_id is not None:
+            self._read(0, size)
+
+
+# Create a singleton instance
+similarity_index = MinHashLSH()
+
+def get_similarity_index():
+    """Get the shared proposal similarity index"""
+    return similarity_index
+
+def reconcile_similarity_index():
+    """Bring the index in line with the proposals table; returns the number of entries changed"""
+    db = SessionLocal()
+    try:
+        rows = db.query(Proposal.id, Proposal.title, Proposal.description).yield_per(1000)
+        return similarity_index.reconcile((row.id, proposal_text(row.title, row.description)) for row in rows)
+    finally:
+        db.close()
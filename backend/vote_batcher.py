@@ -0,0 +1,169 @@
+"""
+Batched on-chain votes
+
+Every recorded vote is cast on-chain by the service wallet with
+delegateVote, one transaction per vote. With CHAIN_VOTE_BATCHING=true,
+votes are queued instead and cast with AIGov.batchDelegateVote: a
+proposal's pending votes are sent together once CHAIN_VOTE_BATCH_SIZE of
+them are waiting, or once the oldest has waited CHAIN_VOTE_BATCH_WAIT
+seconds, so a burst of delegate votes on one proposal costs a few
+transactions instead of hundreds.
+
+The queue lives in the shared state store, so queued votes survive a
+restart and any worker can flush them. Batches are leased while in flight
+and retried with backoff if the transaction fails. The transaction hash is
+recorded on each vote the contract counted.
+"""
+
+import os
+import time
+import asyncio
+from dotenv import load_dotenv
+from sqlalchemy import update
+
+from database import SessionLocal, Vote
+from shared_state import get_shared_store
+
+# Load environment variables
+load_dotenv()
+
+CHAIN_VOTE_BATCHING = os.getenv("CHAIN_VOTE_BATCHING", "false").lower() == "true"
+CHAIN_VOTE_BATCH_SIZE = int(os.getenv("CHAIN_VOTE_BATCH_SIZE", "100"))  # Votes per transaction at most
+CHAIN_VOTE_BATCH_WAIT = float(os.getenv("CHAIN_VOTE_BATCH_WAIT", "5"))  # Longest a vote waits for others on its proposal
+CHAIN_VOTE_FLUSH_INTERVAL = float(os.getenv("CHAIN_VOTE_FLUSH_INTERVAL", "1"))  # Seconds between queue polls
+CHAIN_VOTE_LEASE = float(os.getenv("CHAIN_VOTE_LEASE", "300"))  # Seconds a claimed batch is hidden from other workers
+CHAIN_VOTE_MAX_BACKOFF = float(os.getenv("CHAIN_VOTE_MAX_BACKOFF", "300"))  # Cap on the retry delay
+
+VOTE_QUEUE = "chain_vote_queue"
+
+
+class ChainVoteBatcher:
+    def __init__(self, blockchain_service, batch_size=CHAIN_VOTE_BATCH_SIZE, max_wait=CHAIN_VOTE_BATCH_WAIT,
+                 enabled=CHAIN_VOTE_BATCHING):
+        self.blockchain_service = blockchain_service
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self.store = get_shared_store()
+        self.task = None
+        self.stats = {"batches": 0, "votes": 0, "skipped_votes": 0, "failed_batches": 0}
+
+    async def submit(self, proposal_id, voter, vote):
+        """Cast a vote on-chain: queued for the next batch, or alone when batching is off"""
+        if not self.enabled:
+            tx_hash = await self.blockchain_service.submit_vote(proposal_id, voter, vote)
+            if tx_hash:
+                await asyncio.to_thread(record_transaction, proposal_id, [voter], tx_hash)
+            return tx_hash
+        self.enqueue(proposal_id, voter, vote)
+        return None
+
+    def enqueue(self, proposal_id, voter, vote):
+        now = time.time()
+        key = f"{proposal_id}:{voter.lower()}"
+        with self.store.lock():
+            if self.store.get(VOTE_QUEUE, key) is None:
+                self.store.set(VOTE_QUEUE, key, {
+                    "proposal_id": proposal_id, "voter": voter, "vote": vote,
+                    "queued_at": now, "attempts": 0, "next_attempt": now
+                })
+
+    def claim_ready(self):
+        """Claim a batch from every proposal whose queue is full or whose oldest vote has waited long enough"""
+        now = time.time()
+        pending = {}
+        with self.store.lock():
+            for key in self.store.keys(VOTE_QUEUE):
+                entry = self.store.get(VOTE_QUEUE, key)
+                if entry is not None and entry["next_attempt"] <= now:
+                    pending.setdefault(entry["proposal_id"], []).append((key, entry))
+
+            claimed = []
+            for proposal_id, entries in pending.items():
+                entries.sort(key=lambda item: item[1]["queued_at"])
+                for start in range(0, len(entries), self.batch_size):
+                    batch = entries[start:start + self.batch_size]
+                    # A partial batch waits for company unless its oldest vote is due or being retried
+                    ready = (len(batch) == self.batch_size or batch[0][1]["attempts"] > 0
+                             or batch[0][1]["queued_at"] <= now - self.max_wait)
+                    if not ready:
+                        break
+                    for key, entry in batch:
+                        entry["next_attempt"] = now + CHAIN_VOTE_LEASE
+                        self.store.set(VOTE_QUEUE, key, entry)
+                    claimed.append((proposal_id, batch))
+        return claimed
+
+    async def flush_batch(self, proposal_id, batch):
+        result = await self.blockchain_service.submit_votes(
+            proposal_id, [(entry["voter"], entry["vote"]) for _, entry in batch]
+        )
+        if result is None:
+            attempts = max(entry["attempts"] for _, entry in batch) + 1
+            delay = min(CHAIN_VOTE_MAX_BACKOFF, CHAIN_VOTE_FLUSH_INTERVAL * 2 ** attempts)
+            for key, entry in batch:
+                entry["attempts"] = attempts
+                entry["next_attempt"] = time.time() + delay
+                self.store.set(VOTE_QUEUE, key, entry)
+            self.stats["failed_batches"] += 1
+            print(f"Error casting {len(batch)} votes on proposal {proposal_id} (attempt {attempts}, retrying in {delay:.0f}s)")
+            return False
+
+        for key, _ in batch:
+            self.store.delete(VOTE_QUEUE, key)
+        if result["voters"]:
+            await asyncio.to_thread(record_transaction, proposal_id, result["voters"], result["tx_hash"])
+        self.stats["batches"] += 1
+        self.stats["votes"] += len(result["voters"])
+        self.stats["skipped_votes"] += len(batch) - len(result["voters"])
+        return True
+
+    async def flush_ready(self):
+        """Send every batch that is ready; returns the number of batches sent"""
+        sent = 0
+        for proposal_id, batch in await asyncio.to_thread(self.claim_ready):
+            sent += await self.flush_batch(proposal_id, batch)
+        return sent
+
+    async def run(self):
+        """Flush ready batches until cancelled"""
+        while True:
+            try:
+                await self.flush_ready()
+            except Exception as e:
+                print(f"Error in chain vote queue: {str(e)}")
+            await asyncio.sleep(CHAIN_VOTE_FLUSH_INTERVAL)
+
+    def start(self):
+        """Flush batches in the background of the running event loop, when enabled"""
+        if self.enabled and self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def pending_votes(self):
+        """Number of votes waiting to be cast on-chain"""
+        return len(self.store.keys(VOTE_QUEUE))
+
+
+def record_transaction(proposal_id, voters, tx_hash):
+    """Store the transaction that cast the voters' votes on a proposal"""
+    db = SessionLocal()
+    try:
+        db.execute(update(Vote).where(
+            Vote.proposal_id == proposal_id,
+            Vote.voter.in_(voters)
+        ).values(transaction_hash=tx_hash))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error recording transaction {tx_hash} for proposal {proposal_id}: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+"""
+AI-Gov Vote Merkle Trees
+
+Every proposal's votes are the leaves of an append-only Merkle tree, added
+in the order they are recorded, so a client can check that its vote was
+counted with an O(log n) inclusion proof instead of downloading every vote.
+
+    leaf = sha256(0x00 || voter_address || vote || delegate_vote)
+    node = sha256(0x01 || left || right)
+
+voter_address is the lower-cased 0x address as ASCII and vote and
+delegate_vote are one byte each, 0x01 or 0x00. A node without a right
+sibling (the last one of a level with an odd count) is promoted unchanged
+to the next level. Every node is stored, so appending a vote rewrites the
+O(log n) nodes on its path and a proof is read with one query.
+
+Roots are published in the background every VOTE_ROOT_PUBLISH_INTERVAL
+seconds as a JSON document on IPFS, and stored in the contract when
+VOTE_ROOT_ONCHAIN is set.
+
+Usage: python vote_merkle.py rebuild
+"""
+
+import os
+import sys
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+from sqlalchemy import select, insert, update, delete, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal, VoteMerkleTree, VoteMerkleNode, Vote
+
+# Load environment variables
+load_dotenv()
+
+VOTE_ROOT_PUBLISH_INTERVAL = float(os.getenv("VOTE_ROOT_PUBLISH_INTERVAL", "60"))  # Seconds between publishing rounds
+VOTE_ROOT_ONCHAIN = os.getenv("VOTE_ROOT_ONCHAIN", "false").lower() == "true"  # Also store roots in the contract
+VOTE_ROOT_PUBLISH_BATCH = 100  # Trees published per round at most
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+_nodes = VoteMerkleNode.__table__
+_trees = VoteMerkleTree.__table__
+
+
+def leaf_hash(voter_address, vote, delegate_vote):
+    """Hex hash of one vote's leaf"""
+    data = voter_address.lower().encode("ascii") + (b"\x01" if vote else b"\x00") + (b"\x01" if delegate_vote else b"\x00")
+    return hashlib.sha256(LEAF_PREFIX + data).hexdigest()
+
+
+def node_hash(left, right):
+    """Hex hash of an inner node from its children's hex hashes"""
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _top_level(size):
+    """Level of the root of a tree with size leaves"""
+    return (size - 1).bit_length()
+
+
+def proof_path(index, size):
+    """(level, position, side) of each sibling hashed with leaf index on its way to the root"""
+    path = []
+    position = index
+    for level in range(_top_level(size)):
+        last = (size - 1) >> level
+        sibling = position ^ 1
+        if sibling <= last:
+            path.append((level, sibling, "left" if sibling < position else "right"))
+        position >>= 1
+    return path
+
+
+def verify_proof(leaf, proof, root):
+    """Whether a leaf hash and its proof ([{"hash", "side"}], leaf to root) fold to root"""
+    node = leaf
+    for step in proof:
+        node = node_hash(step["hash"], node) if step["side"] == "left" else node_hash(node, step["hash"])
+    return node == root
+
+
+def _claim_index(db, proposal_id):
+    """Grow the proposal's tree by one leaf and return the new leaf's index"""
+    updated = db.execute(
+        update(_trees).where(_trees.c.proposal_id == proposal_id).values(size=_trees.c.size + 1)
+    ).rowcount
+    if updated:
+        return db.execute(select(_trees.c.size).where(_trees.c.proposal_id == proposal_id)).scalar() - 1
+
+    # First vote on this proposal; a concurrent writer may create the tree first
+    try:
+        with db.begin_nested():
+            db.execute(insert(_trees).values(proposal_id=proposal_id, size=1, published_size=0))
+        return 0
+    except IntegrityError:
+        return _claim_index(db, proposal_id)
+
+
+def append_vote(db, proposal_id, voter_address, vote, delegate_vote):
+    """Add a vote's leaf to its proposal's tree and return the leaf index (caller commits).
+
+    Appends to the same proposal are serialized by the lock on its tree row.
+    """
+    index = _claim_index(db, proposal_id)
+    size = index + 1
+    node = leaf_hash(voter_address, vote, delegate_vote)
+    db.execute(insert(_nodes).values(proposal_id=proposal_id, level=0, position=index, hash=node))
+
+    position = index
+    for level in range(_top_level(size)):
+        if position % 2:
+            left = db.execute(select(_nodes.c.hash).where(
+                _nodes.c.proposal_id == proposal_id, _nodes.c.level == level, _nodes.c.position == position - 1
+            )).scalar()
+            node = node_hash(left, node)
+        # Otherwise the node is the last of its level and is promoted as it is
+        position >>= 1
+        # The parent already exists unless this leaf starts its range or the tree just grew a level
+        existed = size > 1 and level + 1 <= _top_level(size - 1) and position == (size - 2) >> (level + 1)
+        if existed:
+            db.execute(update(_nodes).where(
+                _nodes.c.proposal_id == proposal_id, _nodes.c.level == level + 1, _nodes.c.position == position
+            ).values(hash=node))
+        else:
+            db.execute(insert(_nodes).values(proposal_id=proposal_id, level=level + 1, position=position, hash=node))
+
+    db.execute(update(_trees).where(_trees.c.proposal_id == proposal_id).values(root=node))
+    return index
+
+
+def _read_proof(db, proposal_id, index):
+    tree = db.execute(select(_trees.c.size, _trees.c.root).where(_trees.c.proposal_id == proposal_id)).first()
+    if tree is None or index >= tree.size:
+        return None
+    path = proof_path(index, tree.size)
+    wanted = [(0, index)] + [(level, position) for level, position, _ in path]
+    hashes = {
+        (level, position): node
+        for level, position, node in db.execute(select(_nodes.c.level, _nodes.c.position, _nodes.c.hash).where(
+            _nodes.c.proposal_id == proposal_id,
+            tuple_(_nodes.c.level, _nodes.c.position).in_(wanted)
+        ))
+    }
+    return {
+        "leaf": hashes.get((0, index)),
+        "proof": [{"hash": hashes.get((level, position)), "side": side} for level, position, side in path],
+        "tree_size": tree.size,
+        "root": tree.root
+    }
+
+
+def get_inclusion_proof(db, proposal_id, voter_address, attempts=3):
+    """Inclusion proof of a voter's vote against the current root, or None if they have not voted"""
+    vote = db.query(Vote.vote_type, Vote.is_delegate_vote, Vote.merkle_index).filter(
+        Vote.proposal_id == proposal_id,
+        Vote.voter == voter_address
+    ).first()
+    if vote is None or vote.merkle_index is None:
+        return None
+
+    for _ in range(attempts):
+        result = _read_proof(db, proposal_id, vote.merkle_index)
+        # Votes appended between the tree and node reads change the root; read again
+        if result and verify_proof(result["leaf"], result["proof"], result["root"]):
+            break
+        db.rollback()
+    else:
+        raise RuntimeError(f"Could not read a consistent vote tree for proposal {proposal_id}")
+
+    tree = db.get(VoteMerkleTree, proposal_id)
+    return {
+        "proposal_id": proposal_id,
+        "voter_address": voter_address,
+        "vote": vote.vote_type,
+        "delegate_vote": vote.is_delegate_vote,
+        "leaf_index": vote.merkle_index,
+        **result,
+        "published": {
+            "tree_size": tree.published_size,
+            "root": tree.published_root,
+            "ipfs_hash": tree.published_cid,
+            "tx_hash": tree.published_tx
+        } if tree.published_size else None
+    }
+
+
+def root_document(proposal_id, size, root, on_chain_id=None):
+    """IPFS document announcing a root; identical for the same tree, so republishing is harmless"""
+    return {
+        "type": "aigov-vote-root",
+        "proposal_id": proposal_id,
+        "on_chain_id": on_chain_id,
+        "tree_size": size,
+        "root": root,
+        "hash": "sha256",
+        "leaf": "sha256(0x00 || lower-case voter address as ASCII || vote byte || delegate_vote byte)",
+        "node": "sha256(0x01 || left || right); a node without a right sibling is promoted unchanged"
+    }
+
+
+class VoteRootPublisher:
+    def __init__(self, ipfs_service, blockchain_service, interval=VOTE_ROOT_PUBLISH_INTERVAL, onchain=VOTE_ROOT_ONCHAIN):
+        self.ipfs_service = ipfs_service
+        self.blockchain_service = blockchain_service
+        self.interval = interval
+        self.onchain = onchain
+        self.task = None
+
+    async def publish_pending(self):
+        """Publish the current root of every tree that grew since its last publication"""
+        db = SessionLocal()
+        try:
+            trees = db.execute(select(_trees).where(
+                _trees.c.size > _trees.c.published_size
+            ).limit(VOTE_ROOT_PUBLISH_BATCH)).all()
+            published = 0
+            for tree in trees:
+                proposal_id, size, root = tree.proposal_id, tree.size, tree.root
+                # Claim this snapshot so concurrent workers do not publish it twice
+                claimed = db.execute(update(_trees).where(
+                    _trees.c.proposal_id == proposal_id, _trees.c.published_size < size
+                ).values(published_size=size, published_root=root, published_cid=None, published_tx=None)).rowcount
+                db.commit()
+                if not claimed:
+                    continue
+
+                def release():
+                    # Restore the previous publication so the next round retries this tree
+                    db.execute(update(_trees).where(
+                        _trees.c.proposal_id == proposal_id, _trees.c.published_size == size
+                    ).values(published_size=tree.published_size, published_root=tree.published_root,
+                             published_cid=tree.published_cid, published_tx=tree.published_tx))
+                    db.commit()
+
+                submission = getattr(self.blockchain_service, "submissions", {}).get(proposal_id) or {}
+                try:
+                    cid = await self.ipfs_service.add_json(root_document(proposal_id, size, root, submission.get("on_chain_id")))
+                    tx_hash = None
+                    if cid is not None and self.onchain:
+                        tx_hash = await self.blockchain_service.publish_vote_root(proposal_id, root, size)
+                except Exception:
+                    release()
+                    raise
+                # The root document is identical for the same tree, so pinning it again on retry is harmless
+                if cid is None or (self.onchain and tx_hash is None):
+                    release()
+                    continue
+                db.execute(update(_trees).where(
+                    _trees.c.proposal_id == proposal_id, _trees.c.published_size == size
+                ).values(published_cid=cid, published_tx=tx_hash))
+                db.commit()
+                published += 1
+            return published
+        finally:
+            db.close()
+
+    async def run_publisher(self):
+        while True:
+            try:
+                await self.publish_pending()
+            except Exception as e:
+                print(f"Error publishing vote roots: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start_publisher(self):
+        """Publish roots in the background of the running event loop"""
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run_publisher())
+
+    async def stop_publisher(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+def build_levels(leaves):
+    """Every level of the tree over leaf hashes, leaves first"""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        below = levels[-1]
+        levels.append([
+            node_hash(below[i], below[i + 1]) if i + 1 < len(below) else below[i]
+            for i in range(0, len(below), 2)
+        ])
+    return levels
+
+
+def rebuild_vote_trees(db):
+    """Rebuild every proposal's tree from its votes in recording order"""
+    db.execute(delete(_nodes))
+    db.execute(delete(_trees))
+    votes = db.query(Vote.id, Vote.proposal_id, Vote.voter, Vote.vote_type, Vote.is_delegate_vote).order_by(
+        Vote.proposal_id, Vote.id
+    ).all()
+
+    by_proposal = {}
+    for vote in votes:
+        by_proposal.setdefault(vote.proposal_id, []).append(vote)
+    for proposal_id, proposal_votes in by_proposal.items():
+        levels = build_levels([leaf_hash(v.voter, v.vote_type, v.is_delegate_vote) for v in proposal_votes])
+        db.execute(insert(_nodes), [
+            {"proposal_id": proposal_id, "level": level, "position": position, "hash": node}
+            for level, nodes in enumerate(levels) for position, node in enumerate(nodes)
+        ])
+        db.execute(insert(_trees).values(
+            proposal_id=proposal_id, size=len(proposal_votes), root=levels[-1][0], published_size=0
+        ))
+        db.execute(update(Vote), [
+            {"id": v.id, "merkle_index": index} for index, v in enumerate(proposal_votes)
+        ])
+    db.commit()
+    return len(by_proposal)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        print(__doc__.strip())
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt vote Merkle trees of {rebuild_vote_trees(db)} proposals")
+    finally:
+        db.close()
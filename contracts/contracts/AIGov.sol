@@ -21,10 +21,13 @@ contract AIGov is Ownable {
     mapping(uint => Proposal) public proposals;
     uint public proposalCount;
     mapping(address => address) public delegates; // User to delegate mapping
+    mapping(uint => bytes32) public voteRoots; // Merkle root over a proposal's votes, published off-chain first
+    mapping(uint => uint) public voteRootSizes; // Votes covered by voteRoots
 
     event ProposalSubmitted(uint id, address proposer, string ipfsHash);
     event Voted(uint proposalId, address voter, bool support);
     event DelegateSet(address user, address delegate);
+    event VoteRootPublished(uint proposalId, bytes32 root, uint voteCount);
 
     constructor() Ownable(msg.sender) {}
 
@@ -81,6 +84,48 @@ contract AIGov is Ownable {
         emit Voted(_proposalId, _user, _support);
     }
 
+    // Delegate votes of many users on one proposal in a single transaction.
+    // Users who no longer delegate to the sender or have already voted are skipped
+    // rather than failing the batch; a Voted event is emitted for each vote cast.
+    function batchDelegateVote(uint _proposalId, address[] calldata _users, bool[] calldata _supports) public returns (uint cast) {
+        require(_users.length == _supports.length, "Length mismatch");
+        Proposal storage p = proposals[_proposalId];
+        require(!p.executed, "Proposal already executed");
+
+        uint votesFor;
+        uint votesAgainst;
+        for (uint i = 0; i < _users.length; i++) {
+            address user = _users[i];
+            if (delegates[user] != msg.sender || p.voted[user]) {
+                continue;
+            }
+
+            p.voted[user] = true;
+            if (_supports[i]) {
+                votesFor++;
+            } else {
+                votesAgainst++;
+            }
+
+            emit Voted(_proposalId, user, _supports[i]);
+        }
+
+        // Tallies are written once per batch instead of once per vote
+        p.votesFor += votesFor;
+        p.votesAgainst += votesAgainst;
+        return votesFor + votesAgainst;
+    }
+
+    // Anchor the backend's vote Merkle root so inclusion proofs can be checked against the chain
+    function publishVoteRoot(uint _proposalId, bytes32 _root, uint _voteCount) public onlyOwner {
+        require(_voteCount >= voteRootSizes[_proposalId], "Vote count cannot decrease");
+
+        voteRoots[_proposalId] = _root;
+        voteRootSizes[_proposalId] = _voteCount;
+
+        emit VoteRootPublished(_proposalId, _root, _voteCount);
+    }
+
     // Execute proposal if votesFor > votesAgainst (simple majority)
     function executeProposal(uint _proposalId) public onlyOwner {
         Proposal storage p = proposals[_proposalId];
@@ -0,0 +1,89 @@
+// AI-Gov Delegate Voting Gas Benchmark
+//
+// Casts the same delegated votes one transaction per vote with delegateVote,
+// then in batches with batchDelegateVote, on a fresh AIGov on the in-process
+// Hardhat network, and reports gas per vote, votes per block and throughput.
+//
+// Usage: npx hardhat run scripts/bench_batch_vote.js
+//        BENCH_VOTES=400 BENCH_BATCH_SIZES=10,50,100,200 npx hardhat run scripts/bench_batch_vote.js
+
+const hre = require("hardhat");
+
+const VOTES = parseInt(process.env.BENCH_VOTES || "400", 10);
+const BATCH_SIZES = (process.env.BENCH_BATCH_SIZES || "10,50,100,200").split(",").map((size) => parseInt(size, 10));
+
+async function newProposal(aiGov) {
+  await (await aiGov.submitProposal("QmBenchmark", "Benchmark proposal", 5, "Other")).wait();
+  return await aiGov.proposalCount();
+}
+
+async function createDelegators(aiGov, delegate, count) {
+  // Funded throwaway accounts, each delegating to the service wallet
+  const users = [];
+  for (let i = 0; i < count; i++) {
+    const wallet = hre.ethers.Wallet.createRandom().connect(hre.ethers.provider);
+    await hre.network.provider.send("hardhat_setBalance", [wallet.address, "0x56BC75E2D63100000"]);
+    await (await aiGov.connect(wallet).setDelegate(delegate.address)).wait();
+    users.push(wallet.address);
+  }
+  return users;
+}
+
+async function run(label, users, castChunk, chunkSize) {
+  let gas = 0n;
+  let transactions = 0;
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < users.length; i += chunkSize) {
+    const receipt = await (await castChunk(users.slice(i, i + chunkSize))).wait();
+    gas += receipt.gasUsed;
+    transactions++;
+  }
+  const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+  return { label, gasPerVote: Number(gas) / users.length, transactions, votesPerSecond: users.length / seconds };
+}
+
+async function main() {
+  const [owner] = await hre.ethers.getSigners();
+  const AIGov = await hre.ethers.getContractFactory("AIGov");
+  const aiGov = await AIGov.deploy();
+  await aiGov.waitForDeployment();
+
+  console.log(`Creating ${VOTES} delegators...`);
+  const users = await createDelegators(aiGov, owner, VOTES);
+  const blockGasLimit = (await hre.ethers.provider.getBlock("latest")).gasLimit;
+
+  const results = [];
+  let proposalId = await newProposal(aiGov);
+  results.push(await run("delegateVote", users, ([user]) => aiGov.delegateVote(proposalId, true, user), 1));
+
+  for (const size of BATCH_SIZES) {
+    proposalId = await newProposal(aiGov);
+    const supports = (chunk) => chunk.map((_, i) => i % 2 === 0);
+    results.push(await run(
+      `batchDelegateVote x${size}`,
+      users,
+      (chunk) => aiGov.batchDelegateVote(proposalId, chunk, supports(chunk)),
+      size
+    ));
+  }
+
+  const baseline = results[0].gasPerVote;
+  console.log(`\n${"method".padEnd(24)} ${"gas/vote".padStart(9)} ${"saving".padStart(7)} ${"txs".padStart(5)} ${"votes/block".padStart(11)} ${"votes/s".padStart(8)}`);
+  console.log("-".repeat(69));
+  for (const r of results) {
+    const saving = `${((1 - r.gasPerVote / baseline) * 100).toFixed(0)}%`;
+    const votesPerBlock = Math.floor(Number(blockGasLimit) / r.gasPerVote);
+    console.log(
+      `${r.label.padEnd(24)} ${r.gasPerVote.toFixed(0).padStart(9)} ${saving.padStart(7)} ${String(r.transactions).padStart(5)} ` +
+      `${String(votesPerBlock).padStart(11)} ${r.votesPerSecond.toFixed(0).padStart(8)}`
+    );
+  }
+  console.log(`\nBlock gas limit ${blockGasLimit}; votes/block is how many votes of each kind fit in one block.`);
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error("Benchmark failed:", error);
+    process.exit(1);
+  });
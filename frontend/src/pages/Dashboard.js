@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAccount } from 'wagmi';
 import axios from 'axios';
+import api from '../services/api';
 
 const Dashboard = () => {
   const { address, isConnected } = useAccount();
@@ -19,9 +20,10 @@ const Dashboard = () => {
     const fetchDashboardData = async () => {
       try {
         setLoading(true);
-        // Mock data for now
+        const { data: governanceStats } = await api.stats.get();
+        // Remaining figures are mock data for now
         setStats({
-          totalProposals: 12,
+          totalProposals: governanceStats.proposals,
           activeProposals: 5,
           yourProposals: isConnected ? 2 : 0,
           yourVotes: isConnected ? 8 : 0,
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAccount } from 'wagmi';
+import api from '../services/api';
 
 const DelegateSetup = () => {
   const { address, isConnected } = useAccount();
@@ -23,6 +24,16 @@ const DelegateSetup = () => {
   // Voting history for training
   const [votingHistory, setVotingHistory] = useState([]);
   
+  // Match rates served from the backend rollups
+  const [accuracy, setAccuracy] = useState(null);
+  
+  useEffect(() => {
+    if (!isConnected || !address) return;
+    api.delegates.getAccuracy(address)
+      .then((response) => setAccuracy(response.data))
+      .catch((err) => console.error('Error fetching delegate accuracy:', err));
+  }, [isConnected, address]);
+  
   useEffect(() => {
     const fetchDelegateData = async () => {
       if (!isConnected) {
@@ -162,6 +173,9 @@ const DelegateSetup = () => {
   };
 
   const getMatchRate = () => {
+    if (accuracy && accuracy.overall.match_rate !== null) {
+      return Math.round(accuracy.overall.match_rate * 100);
+    }
     if (votingHistory.length === 0) return 0;
     const matches = votingHistory.filter(vote => vote.match).length;
     return Math.round((matches / votingHistory.length) * 100);
@@ -1,7 +1,9 @@
 import React, { useState } from 'react';
-import { useNavigate } from 'react-router-dom';
+import { Link, useNavigate } from 'react-router-dom';
 import { useAccount } from 'wagmi';
-import axios from 'axios';
+import api from '../services/api';
+
+const newIdempotencyKey = () => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
 
 const SubmitProposal = () => {
   const { address, isConnected } = useAccount();
@@ -15,7 +17,11 @@ const SubmitProposal = () => {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [error, setError] = useState('');
   const [aiAnalysis, setAiAnalysis] = useState(null);
+  const [analyzedData, setAnalyzedData] = useState(null); // The text aiAnalysis belongs to
+  const [confirmation, setConfirmation] = useState(null);
   const [step, setStep] = useState(1); // 1: Form, 2: AI Analysis, 3: Confirmation
+  // One key per proposal text: a retry after a dropped connection does not create it twice
+  const [idempotencyKey, setIdempotencyKey] = useState(newIdempotencyKey);
 
   const handleChange = (e) => {
     const { name, value } = e.target;
@@ -23,6 +29,7 @@ const SubmitProposal = () => {
       ...formData,
       [name]: value,
     });
+    setIdempotencyKey(newIdempotencyKey());
   };
 
   const handleSubmit = async (e) => {
@@ -38,27 +45,55 @@ const SubmitProposal = () => {
       return;
     }
     
+    // Once the proposal is stored, "Edit Proposal" revises it instead of creating another
+    if (aiAnalysis && aiAnalysis.id) {
+      await handleRevise();
+      return;
+    }
+    
     try {
       setIsSubmitting(true);
       setError('');
+      setAiAnalysis(null);
+      setAnalyzedData({ ...formData });
       
-      // In a real app, this would call your backend API
-      // For now, we'll simulate the AI analysis
-      setTimeout(() => {
-        setAiAnalysis({
-          summary: 'This proposal aims to improve community engagement through regular events and workshops.',
-          riskScore: 2,
-          category: 'Community',
-          explanation: 'The proposal has a low risk score because it focuses on community building without significant financial implications. The main category is Community based on the focus on engagement and events.',
-        });
-        setStep(2);
-        setIsSubmitting(false);
-      }, 2000);
-      
-      // Actual API call would look like this:
-      // const response = await axios.post('http://localhost:8000/submit_proposal', formData);
-      // setAiAnalysis(response.data);
-      // setStep(2);
+      // Stream the analysis: the summary fills in as it is generated,
+      // followed by the risk score, category and explanation
+      let failed = false;
+      await api.proposals.createStream(
+        { ...formData, author_address: address },
+        (event, data) => {
+          if (event === 'summary') {
+            setAiAnalysis((prev) => ({ ...(prev || {}), summary: ((prev && prev.summary) || '') + data.text }));
+            setStep(2);
+          } else if (event === 'summary_reset') {
+            // The summary failed partway; show what was stored instead of the partial text
+            setAiAnalysis((prev) => ({ ...(prev || {}), summary: data.text }));
+            setStep(2);
+          } else if (event === 'analysis') {
+            setAiAnalysis((prev) => ({
+              ...(prev || {}),
+              riskScore: data.risk_score,
+              category: data.category,
+              explanation: data.explanation,
+            }));
+          } else if (event === 'done') {
+            setAiAnalysis((prev) => ({
+              ...(prev || {}),
+              id: data.id,
+              ipfsUrl: data.ipfs_url,
+              similarProposals: data.similar_proposals,
+            }));
+          } else if (event === 'error') {
+            failed = true;
+            setError(data.detail);
+            setStep(1);
+          }
+        },
+        idempotencyKey
+      );
+      if (failed) setAiAnalysis(null);
+      setIsSubmitting(false);
       
     } catch (error) {
       console.error('Error submitting proposal:', error);
@@ -67,23 +102,57 @@ const SubmitProposal = () => {
     }
   };
 
+  const handleRevise = async () => {
+    // Nothing changed since the analysis shown: go back to it
+    if (analyzedData && formData.title === analyzedData.title && formData.description === analyzedData.description) {
+      setError('');
+      setStep(2);
+      return;
+    }
+    
+    try {
+      setIsSubmitting(true);
+      setError('');
+      const response = await api.proposals.revise({
+        proposal_id: aiAnalysis.id,
+        title: formData.title,
+        description: formData.description,
+        author_address: address,
+      });
+      setAiAnalysis((prev) => ({
+        ...prev,
+        summary: response.data.summary,
+        riskScore: response.data.risk_score,
+        category: response.data.category,
+        explanation: response.data.explanation,
+        ipfsUrl: response.data.ipfs_url,
+      }));
+      setAnalyzedData({ ...formData });
+      setStep(2);
+    } catch (error) {
+      console.error('Error revising proposal:', error);
+      setError((error.response && error.response.data && error.response.data.detail) ||
+        'Failed to update proposal. Please try again.');
+    } finally {
+      setIsSubmitting(false);
+    }
+  };
+
   const handleConfirmSubmission = async () => {
     try {
       setIsSubmitting(true);
+      setError('');
       
-      // In a real app, this would submit to the blockchain via your backend
-      // For now, we'll simulate the submission
-      setTimeout(() => {
-        setStep(3);
-        setIsSubmitting(false);
-      }, 2000);
-      
-      // Actual submission would look like this:
-      // const response = await axios.post('http://localhost:8000/confirm_proposal', {
-      //   ...formData,
-      //   aiAnalysis,
-      //   walletAddress: address,
-      // });
+      // The proposal was stored with the analysis and queued for the chain; check what the backend holds
+      const response = await api.proposals.getById(aiAnalysis.id);
+      setConfirmation({
+        id: response.data.id,
+        ipfsUrl: response.data.ipfs_url,
+        onChainId: response.data.on_chain_id,
+        txHash: response.data.tx_hash,
+      });
+      setStep(3);
+      setIsSubmitting(false);
       
     } catch (error) {
       console.error('Error confirming proposal:', error);
@@ -159,7 +228,9 @@ const SubmitProposal = () => {
                 className="btn-primary"
                 disabled={!isConnected || isSubmitting}
               >
-                {isSubmitting ? 'Analyzing...' : 'Submit for AI Analysis'}
+                {aiAnalysis && aiAnalysis.id
+                  ? (isSubmitting ? 'Updating...' : 'Update Proposal')
+                  : (isSubmitting ? 'Analyzing...' : 'Submit for AI Analysis')}
               </button>
             </div>
           </form>
@@ -178,21 +249,21 @@ const SubmitProposal = () => {
             
             <div>
               <h3 className="text-sm text-gray-400 mb-1">AI Summary (TL;DR)</h3>
-              <p>{aiAnalysis.summary}</p>
+              <p>{aiAnalysis.summary || 'Generating summary...'}</p>
             </div>
             
             <div className="flex flex-wrap gap-4">
               <div>
                 <h3 className="text-sm text-gray-400 mb-1">Risk Score</h3>
                 <span className={`${getRiskBadgeClass(aiAnalysis.riskScore)} text-sm px-3 py-1`}>
-                  {aiAnalysis.riskScore}/10
+                  {aiAnalysis.riskScore ? `${aiAnalysis.riskScore}/10` : '...'}
                 </span>
               </div>
               
               <div>
                 <h3 className="text-sm text-gray-400 mb-1">Category</h3>
                 <span className="badge bg-background text-gray-300 border border-gray-700">
-                  {aiAnalysis.category}
+                  {aiAnalysis.category || '...'}
                 </span>
               </div>
             </div>
@@ -200,11 +271,31 @@ const SubmitProposal = () => {
             <div>
               <h3 className="text-sm text-gray-400 mb-1">AI Explanation</h3>
               <div className="bg-background p-3 rounded-md border border-gray-800">
-                <p className="text-sm">{aiAnalysis.explanation}</p>
+                <p className="text-sm">{aiAnalysis.explanation || 'Analyzing...'}</p>
               </div>
             </div>
+            
+            {aiAnalysis.similarProposals && aiAnalysis.similarProposals.length > 0 && (
+              <div>
+                <h3 className="text-sm text-gray-400 mb-1">Similar Proposals</h3>
+                <ul className="text-sm space-y-1">
+                  {aiAnalysis.similarProposals.map((similar) => (
+                    <li key={similar.id}>
+                      <Link to={`/proposal/${similar.id}`} className="text-primary hover:underline">{similar.title}</Link>
+                      <span className="text-gray-500"> ({Math.round(similar.similarity * 100)}% similar)</span>
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
           </div>
           
+          {error && (
+            <div className="mb-4 p-3 bg-red-900/50 border border-red-500 rounded-md text-red-200">
+              {error}
+            </div>
+          )}
+          
           <div className="flex justify-between">
             <button
               onClick={() => setStep(1)}
@@ -217,9 +308,9 @@ const SubmitProposal = () => {
             <button
               onClick={handleConfirmSubmission}
               className="btn-primary"
-              disabled={isSubmitting}
+              disabled={isSubmitting || !aiAnalysis.id}
             >
-              {isSubmitting ? 'Submitting...' : 'Confirm & Submit to Blockchain'}
+              {isSubmitting ? 'Confirming...' : 'Confirm Proposal'}
             </button>
           </div>
         </div>
@@ -236,8 +327,15 @@ const SubmitProposal = () => {
             
             <h2 className="text-2xl font-bold mb-2">Proposal Submitted Successfully!</h2>
             <p className="text-gray-400 mb-4">
-              Your proposal has been submitted to the blockchain and is now available for voting.
+              {confirmation && confirmation.txHash
+                ? `Your proposal is on the blockchain (transaction ${confirmation.txHash}) and is now available for voting.`
+                : 'Your proposal is stored and available for voting; its on-chain submission is in progress.'}
             </p>
+            {confirmation && (
+              <a href={confirmation.ipfsUrl} target="_blank" rel="noopener noreferrer" className="text-primary hover:underline">
+                View on IPFS
+              </a>
+            )}
           </div>
           
           <div className="flex justify-center space-x-4">
@@ -252,6 +350,9 @@ const SubmitProposal = () => {
               onClick={() => {
                 setFormData({ title: '', description: '' });
                 setAiAnalysis(null);
+                setAnalyzedData(null);
+                setConfirmation(null);
+                setIdempotencyKey(newIdempotencyKey());
                 setStep(1);
               }}
               className="btn-outline"
@@ -6,11 +6,22 @@
 
 import axios from 'axios';
 
+// Stable per-browser id; the backend routes this client's reads to the primary right after it writes
+const getClientId = () => {
+  let clientId = localStorage.getItem('aigovClientId');
+  if (!clientId) {
+    clientId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    localStorage.setItem('aigovClientId', clientId);
+  }
+  return clientId;
+};
+
 // Create axios instance with base URL from environment variables
 const apiClient = axios.create({
   baseURL: process.env.REACT_APP_API_URL || 'http://localhost:8000',
   headers: {
     'Content-Type': 'application/json',
+    'X-Client-Id': getClientId(),
   },
 });
 
@@ -23,6 +34,41 @@ apiClient.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// POST a request and dispatch the server-sent events of the response as they arrive.
+// EventSource only supports GET, so the stream is read and parsed with fetch.
+const streamEvents = async (path, data, onEvent, headers = {}) => {
+  const response = await fetch(`${apiClient.defaults.baseURL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream', 'X-Client-Id': getClientId(), ...headers },
+    body: JSON.stringify(data),
+  });
+  if (!response.ok) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let payload = '';
+      raw.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) payload += line.slice(6);
+      });
+      onEvent(event, payload ? JSON.parse(payload) : null);
+    }
+  }
+};
+
 // API endpoints
 const api = {
   // Proposal endpoints
@@ -31,24 +77,61 @@ const api = {
     getById: (id) => apiClient.get(`/proposals/${id}`),
     getFullProposal: (id) => apiClient.get(`/proposal-full/${id}`),
     create: (data) => apiClient.post('/proposals', data),
+    // Retries of one submission send the same key, so the backend creates the proposal once
+    createStream: (data, onEvent, idempotencyKey) =>
+      streamEvents('/proposals/stream', data, onEvent, idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+    revise: (data) => apiClient.post('/proposal-revisions', data),
+    getRevisions: (id) => apiClient.get(`/proposal-revisions/${id}`),
   },
   
   // Voting endpoints
   votes: {
     create: (data) => apiClient.post('/votes', data),
+    getProof: (proposalId, address) => apiClient.get(`/proposals/${proposalId}/votes/${address}/proof`),
   },
   
   // Delegate endpoints
   delegates: {
     getPreferences: (address) => apiClient.get(`/delegate-preferences/${address}`),
     setPreferences: (data) => apiClient.post('/delegate-preferences', data),
-    getHistory: (address) => apiClient.get(`/delegate-history/${address}`),
+    getHistory: (address, params) => apiClient.get(`/delegate-history/${address}`, { params }),
+    getAccuracy: (address) => apiClient.get(`/delegate-accuracy/${address}`),
+    getRecommendation: (data) => apiClient.post('/delegate-recommendation', data),
+  },
+  
+  // Dashboard aggregates
+  stats: {
+    get: (params) => apiClient.get('/stats', { params }),
   },
   
   // Health check
   health: () => apiClient.get('/health'),
 };
 
+// Check a vote inclusion proof in the browser: the vote's leaf, folded with the
+// proof's sibling hashes, must give the root (hashing as in backend/vote_merkle.py)
+const hexToBytes = (hex) => Uint8Array.from(hex.match(/../g).map((byte) => parseInt(byte, 16)));
+
+const sha256Hex = async (...parts) => {
+  const data = new Uint8Array(parts.reduce((length, part) => length + part.length, 0));
+  parts.reduce((offset, part) => { data.set(part, offset); return offset + part.length; }, 0);
+  const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', data));
+  return Array.from(digest, (byte) => byte.toString(16).padStart(2, '0')).join('');
+};
+
+export const verifyVoteProof = async ({ voter_address, vote, delegate_vote, proof, root }) => {
+  let node = await sha256Hex(
+    new Uint8Array([0]),
+    new TextEncoder().encode(voter_address.toLowerCase()),
+    new Uint8Array([vote ? 1 : 0, delegate_vote ? 1 : 0])
+  );
+  for (const step of proof) {
+    const [left, right] = step.side === 'left' ? [step.hash, node] : [node, step.hash];
+    node = await sha256Hex(new Uint8Array([1]), hexToBytes(left), hexToBytes(right));
+  }
+  return node === root;
+};
+
 // Helper function to format IPFS URLs
 export const getIpfsUrl = (hash) => {
   const gateway = process.env.REACT_APP_IPFS_GATEWAY || 'http://localhost:8080/ipfs/';